@@ -0,0 +1,281 @@
+# bot/analytics/performance.py
+from __future__ import annotations
+import csv
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from bot.utils.trade_logger import journal_paths, open_journal
+
+# note 内の "key=value" （Strategy01.generate_signal の note 形式）
+_KV = re.compile(r"(\w+)=(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)")
+FEATURE_KEYS = ("rsi", "depth", "taker", "spread_bps", "mom1", "mom5", "vol", "slope", "liq")
+
+
+class Journal:
+    """
+    RAW ジャーナル（trades_raw_*.csv / 圧縮済み .csv.gz）を列ごとの NumPy 配列として一度だけ読み込んだもの。
+      ts:           エポック秒（UTC, int64）
+      hour_jst:     JST の時（0-23）
+      qty/price/fee/realized_pnl/balance: float64
+      is_close:     クローズ行（realized_pnl を持つ行）
+      features:     クローズ行に対応するエントリー時のシグナル特徴量 {name: float64 配列(NaN=欠損)}
+      trace_id/ref_price/slip_bps/t_data/t_signal/t_send/t_ack: レイテンシ追跡列（旧ファイルは空欄 / NaN）
+    """
+
+    def __init__(self, columns: Dict[str, List[str]]):
+        n = len(columns.get("ts", []))
+        self.n = n
+        self.symbol = np.asarray(columns.get("symbol", [""] * n))
+        self.side = np.asarray(columns.get("side", [""] * n))
+        self.qty = _floats(columns.get("qty", []), n)
+        self.price = _floats(columns.get("price", []), n)
+        self.fee = _floats(columns.get("fee", []), n)
+        self.realized_pnl = _floats(columns.get("realized_pnl", []), n)
+        self.balance = _floats(columns.get("balance", []), n)
+        notes = columns.get("note", [""] * n)
+
+        # レイテンシ追跡（bot/utils/trace.py。t_* は monotonic 秒）
+        self.trace_id = np.asarray(columns.get("trace_id", [""] * n))
+        self.ref_price = _floats(columns.get("ref_price", []), n)
+        self.slip_bps = _floats(columns.get("slip_bps", []), n)
+        self.t_data = _floats(columns.get("t_data", []), n)
+        self.t_signal = _floats(columns.get("t_signal", []), n)
+        self.t_send = _floats(columns.get("t_send", []), n)
+        self.t_ack = _floats(columns.get("t_ack", []), n)
+
+        self.ts, offset = _parse_ts(columns.get("ts", []))
+        self.hour_jst = ((self.ts + 9 * 3600) // 3600) % 24
+
+        is_open = np.fromiter((s.startswith("OPEN") for s in notes), dtype=bool, count=n)
+        self.is_close = ~is_open & (np.isfinite(self.realized_pnl))
+
+        # エントリー note の特徴量 → 直後のクローズ行へ対応付け
+        open_idx = np.where(is_open, np.arange(n), -1)
+        last_open = np.maximum.accumulate(open_idx) if n else open_idx
+        feats = {k: np.full(n, np.nan) for k in FEATURE_KEYS}
+        for i in np.flatnonzero(is_open):
+            for k, v in _KV.findall(notes[i]):
+                if k in feats:
+                    feats[k][i] = float(v)
+        close_rows = np.flatnonzero(self.is_close)
+        src = last_open[close_rows]
+        self.features = {}
+        for k, arr in feats.items():
+            vals = np.full(len(close_rows), np.nan)
+            ok = src >= 0
+            vals[ok] = arr[src[ok]]
+            self.features[k] = vals
+
+    @classmethod
+    def load(cls, paths: Iterable[str]) -> "Journal":
+        cols: Dict[str, List[str]] = {}
+        total = 0
+        for path in sorted(paths):
+            with open_journal(path) as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if not header:
+                    continue
+                rows = list(reader)
+                for j, name in enumerate(header):
+                    # 途中のファイルで初めて出てきた列（ヘッダ拡張前の日）はそれまでの行を空で埋める
+                    cols.setdefault(name, [""] * total).extend(r[j] if j < len(r) else "" for r in rows)
+                for name in set(cols) - set(header):
+                    cols[name].extend([""] * len(rows))
+                total += len(rows)
+        return cls(cols)
+
+    @classmethod
+    def from_dir(cls, logs_dir: str = "logs") -> "Journal":
+        return cls.load(journal_paths(logs_dir, "raw"))
+
+
+def _floats(values: List[str], n: int) -> np.ndarray:
+    if not values:
+        return np.full(n, np.nan)
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except ValueError:
+        out = np.full(n, np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                pass
+        return out
+
+
+def _parse_ts(values: List[str]):
+    """ISO8601（+HH:MM 付き）→ UTC エポック秒。先頭19文字を datetime64 で一括変換し、オフセットを引く"""
+    if not values:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    local = np.array([v[:19] for v in values], dtype="datetime64[s]").astype(np.int64)
+    suffix = np.array([v[19:] for v in values])
+    offset = np.zeros(len(values), dtype=np.int64)
+    for s in np.unique(suffix):
+        m = re.fullmatch(r"([+-])(\d{2}):?(\d{2})", s)
+        if m:
+            sec = int(m.group(2)) * 3600 + int(m.group(3)) * 60
+            offset[suffix == s] = sec if m.group(1) == "+" else -sec
+    return local - offset, offset
+
+
+# ---- 指標 ----------------------------------------------------------------
+def _ratio(mean: float, dev: float, periods: float) -> float:
+    return float(mean / dev * np.sqrt(periods)) if dev > 0 else 0.0
+
+
+def compute_metrics(j: Journal, starting_balance: Optional[float] = None,
+                    periods_per_year: float = 365.0, n_buckets: int = 5) -> Dict[str, Any]:
+    """
+    クローズ行ベースで以下をベクトル演算:
+      equity/drawdown 系列、Sharpe/Sortino（日次）、勝率・PF、手数料負担、
+      時間帯別 PnL（JST）、シグナル特徴量の分位バケット別 PnL
+    """
+    c = j.is_close
+    pnl = np.nan_to_num(j.realized_pnl[c])
+    fee = np.nan_to_num(j.fee[c])
+    ts = j.ts[c]
+    n = len(pnl)
+
+    if starting_balance is None:
+        first_bal = j.balance[np.isfinite(j.balance)]
+        starting_balance = float(first_bal[0]) - (pnl[0] if n and c[0] else 0.0) if len(first_bal) else 0.0
+
+    equity = starting_balance + np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.concatenate(([starting_balance], equity)))[1:] if n else equity
+    drawdown = equity - peak
+    dd_pct = np.divide(drawdown, peak, out=np.zeros_like(drawdown), where=peak > 0)
+
+    # 日次 PnL（UTC日）
+    if n:
+        day = ts // 86400
+        d0 = day.min()
+        daily = np.bincount(day - d0, weights=pnl)
+        day_start_eq = starting_balance + np.concatenate(([0.0], np.cumsum(daily)[:-1]))
+        rets = np.divide(daily, day_start_eq, out=np.zeros_like(daily), where=day_start_eq > 0)
+    else:
+        daily = rets = np.empty(0)
+    downside = rets[rets < 0]
+    sharpe = _ratio(rets.mean(), rets.std(ddof=1), periods_per_year) if len(rets) > 1 else 0.0
+    sortino = (
+        _ratio(rets.mean(), float(np.sqrt((downside ** 2).sum() / len(rets))), periods_per_year)
+        if len(rets) > 1 else 0.0
+    )
+
+    wins = pnl > 0
+    gross = pnl + fee
+    gross_profit = float(pnl[wins].sum())
+    gross_loss = float(-pnl[~wins].sum())
+
+    hour_pnl = np.bincount(j.hour_jst[c], weights=pnl, minlength=24)
+    hour_cnt = np.bincount(j.hour_jst[c], minlength=24)
+
+    buckets: Dict[str, Dict[str, Any]] = {}
+    for k, vals in j.features.items():
+        ok = np.isfinite(vals)
+        if ok.sum() < n_buckets:
+            continue
+        edges = np.unique(np.quantile(vals[ok], np.linspace(0, 1, n_buckets + 1)))
+        if len(edges) < 2:
+            continue
+        idx = np.clip(np.digitize(vals[ok], edges[1:-1]), 0, len(edges) - 2)
+        m = len(edges) - 1
+        buckets[k] = {
+            "edges": edges,
+            "pnl": np.bincount(idx, weights=pnl[ok], minlength=m),
+            "count": np.bincount(idx, minlength=m),
+            "win_rate": np.divide(np.bincount(idx, weights=wins[ok].astype(float), minlength=m),
+                                  np.maximum(np.bincount(idx, minlength=m), 1)),
+        }
+
+    return {
+        "trades": n,
+        "starting_balance": starting_balance,
+        "final_equity": float(equity[-1]) if n else starting_balance,
+        "total_pnl": float(pnl.sum()),
+        "gross_pnl": float(gross.sum()),
+        "fees": float(fee.sum()),
+        "fee_drag": float(fee.sum() / np.abs(gross).sum()) if n and np.abs(gross).sum() > 0 else 0.0,
+        "win_rate": float(wins.mean()) if n else 0.0,
+        "avg_win": float(pnl[wins].mean()) if wins.any() else 0.0,
+        "avg_loss": float(pnl[~wins].mean()) if (~wins).any() else 0.0,
+        "profit_factor": gross_profit / gross_loss if gross_loss > 0 else float("inf") if gross_profit > 0 else 0.0,
+        "max_drawdown": float(drawdown.min()) if n else 0.0,
+        "max_drawdown_pct": float(dd_pct.min()) if n else 0.0,
+        "sharpe": sharpe,
+        "sortino": sortino,
+        "days": len(daily),
+        "ts": ts,
+        "equity": equity,
+        "drawdown": drawdown,
+        "daily_pnl": daily,
+        "hour_pnl": hour_pnl,
+        "hour_count": hour_cnt,
+        "feature_buckets": buckets,
+    }
+
+
+LATENCY_STAGES = (
+    ("data_to_signal", "t_data", "t_signal"),
+    ("signal_to_send", "t_signal", "t_send"),
+    ("send_to_ack", "t_send", "t_ack"),
+    ("data_to_ack", "t_data", "t_ack"),
+)
+
+
+def compute_latency(j: Journal, n_buckets: int = 5) -> Dict[str, Any]:
+    """
+    約定行（send/ack を持つ行）ごとのレイテンシ（ms）と実現スリッページ（bps）を集計:
+      段ごとの分位（p50/p95/p99/最大）、data→ack の分位バケット別の平均スリッページ、
+      slip_bps を data→ack に回帰した傾き（bps/ms）と相関
+    """
+    rows = np.isfinite(j.t_send) & np.isfinite(j.t_ack)
+    stages: Dict[str, Dict[str, float]] = {}
+    for name, a, b in LATENCY_STAGES:
+        d = (getattr(j, b) - getattr(j, a))[rows] * 1e3
+        d = d[np.isfinite(d)]
+        stages[name] = {
+            "count": int(len(d)),
+            "p50": float(np.percentile(d, 50)) if len(d) else float("nan"),
+            "p95": float(np.percentile(d, 95)) if len(d) else float("nan"),
+            "p99": float(np.percentile(d, 99)) if len(d) else float("nan"),
+            "max": float(d.max()) if len(d) else float("nan"),
+        }
+
+    lat = ((j.t_ack - j.t_data) * 1e3)[rows]
+    slip = j.slip_bps[rows]
+    ok = np.isfinite(lat) & np.isfinite(slip)
+    lat, slip = lat[ok], slip[ok]
+
+    buckets: Dict[str, Any] = {}
+    if len(lat) >= n_buckets:
+        edges = np.unique(np.quantile(lat, np.linspace(0, 1, n_buckets + 1)))
+        if len(edges) >= 2:
+            idx = np.clip(np.digitize(lat, edges[1:-1]), 0, len(edges) - 2)
+            m = len(edges) - 1
+            cnt = np.bincount(idx, minlength=m)
+            buckets = {
+                "edges": edges,
+                "count": cnt,
+                "slip_bps_mean": np.divide(np.bincount(idx, weights=slip, minlength=m), np.maximum(cnt, 1)),
+                "latency_ms_mean": np.divide(np.bincount(idx, weights=lat, minlength=m), np.maximum(cnt, 1)),
+            }
+
+    slope = corr = float("nan")
+    if len(lat) >= 3 and lat.std() > 0:
+        slope = float(np.polyfit(lat, slip, 1)[0])
+        corr = float(np.corrcoef(lat, slip)[0, 1]) if slip.std() > 0 else 0.0
+
+    return {
+        "fills": int(rows.sum()),
+        "with_slippage": int(len(slip)),
+        "stages": stages,
+        "slip_bps_mean": float(slip.mean()) if len(slip) else float("nan"),
+        "slip_bps_p95": float(np.percentile(slip, 95)) if len(slip) else float("nan"),
+        "slip_per_ms": slope,
+        "corr": corr,
+        "buckets": buckets,
+    }
@@ -0,0 +1,153 @@
+# bot/analytics/report.py
+from __future__ import annotations
+import base64
+import html
+import io
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+except Exception:
+    plt = None
+    PdfPages = None
+
+# 描画点数の上限（数百万トレードでも描画コストを一定に）
+MAX_PLOT_POINTS = 5000
+
+SUMMARY_ROWS = [
+    ("trades", "トレード数", "{:d}"),
+    ("starting_balance", "開始残高", "{:.4f}"),
+    ("final_equity", "最終残高", "{:.4f}"),
+    ("total_pnl", "純損益", "{:.6f}"),
+    ("gross_pnl", "手数料前損益", "{:.6f}"),
+    ("fees", "手数料合計", "{:.6f}"),
+    ("fee_drag", "手数料負担率", "{:.2%}"),
+    ("win_rate", "勝率", "{:.2%}"),
+    ("avg_win", "平均利益", "{:.6f}"),
+    ("avg_loss", "平均損失", "{:.6f}"),
+    ("profit_factor", "PF", "{:.3f}"),
+    ("max_drawdown", "最大DD", "{:.6f}"),
+    ("max_drawdown_pct", "最大DD率", "{:.2%}"),
+    ("sharpe", "Sharpe（日次・年率）", "{:.3f}"),
+    ("sortino", "Sortino（日次・年率）", "{:.3f}"),
+    ("days", "日数", "{:d}"),
+]
+
+
+def _thin(x: np.ndarray) -> np.ndarray:
+    if len(x) <= MAX_PLOT_POINTS:
+        return np.arange(len(x))
+    return np.linspace(0, len(x) - 1, MAX_PLOT_POINTS).astype(np.int64)
+
+
+def _figures(m: Dict[str, Any]) -> List[Any]:
+    if plt is None:
+        return []
+    figs = []
+    if m["trades"]:
+        idx = _thin(m["equity"])
+        t = m["ts"][idx].astype("datetime64[s]")
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 6), sharex=True,
+                                       gridspec_kw={"height_ratios": [3, 1]})
+        ax1.plot(t, m["equity"][idx], lw=1)
+        ax1.set_title("Equity")
+        ax2.fill_between(t, m["drawdown"][idx], 0, color="tab:red", alpha=0.4)
+        ax2.set_title("Drawdown")
+        fig.tight_layout()
+        figs.append(fig)
+
+    fig, ax = plt.subplots(figsize=(10, 3))
+    ax.bar(np.arange(24), m["hour_pnl"], color=np.where(m["hour_pnl"] >= 0, "tab:green", "tab:red"))
+    ax.set_xticks(np.arange(24))
+    ax.set_title("PnL by hour (JST)")
+    fig.tight_layout()
+    figs.append(fig)
+    return figs
+
+
+def _fig_to_b64(fig) -> str:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    plt.close(fig)
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _summary_table(m: Dict[str, Any]) -> List[tuple]:
+    rows = []
+    for key, label, fmt in SUMMARY_ROWS:
+        v = m.get(key)
+        try:
+            rows.append((label, fmt.format(v)))
+        except (TypeError, ValueError):
+            rows.append((label, str(v)))
+    return rows
+
+
+def _bucket_rows(m: Dict[str, Any]) -> List[tuple]:
+    rows = []
+    for name, b in m["feature_buckets"].items():
+        edges = b["edges"]
+        for i in range(len(b["pnl"])):
+            rows.append((name, f"{edges[i]:.4g} – {edges[i + 1]:.4g}", int(b["count"][i]),
+                         f"{b['pnl'][i]:.6f}", f"{b['win_rate'][i]:.2%}"))
+    return rows
+
+
+def render_html(m: Dict[str, Any], path: str, title: str = "DOGE BOT パフォーマンスレポート") -> str:
+    """指標を単一の HTML（画像は base64 埋め込み）に出力。オフラインで閲覧可"""
+    esc = html.escape
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    parts = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        f"<title>{esc(title)}</title>",
+        "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}th{background:#f4f4f4}</style>",
+        "</head><body>",
+        f"<h1>{esc(title)}</h1><p>generated: {now}</p>",
+        "<h2>サマリ</h2><table>",
+    ]
+    parts += [f"<tr><th>{esc(k)}</th><td>{esc(v)}</td></tr>" for k, v in _summary_table(m)]
+    parts.append("</table>")
+    for fig in _figures(m):
+        parts.append(f"<p><img src='data:image/png;base64,{_fig_to_b64(fig)}'></p>")
+
+    parts.append("<h2>時間帯別 PnL（JST）</h2><table><tr><th>hour</th><th>trades</th><th>pnl</th></tr>")
+    for h in range(24):
+        parts.append(f"<tr><td>{h:02d}</td><td>{int(m['hour_count'][h])}</td><td>{m['hour_pnl'][h]:.6f}</td></tr>")
+    parts.append("</table>")
+
+    parts.append("<h2>シグナル特徴量バケット別 PnL</h2><table>"
+                 "<tr><th>feature</th><th>range</th><th>trades</th><th>pnl</th><th>win</th></tr>")
+    for r in _bucket_rows(m):
+        parts.append("<tr>" + "".join(f"<td>{esc(str(x))}</td>" for x in r) + "</tr>")
+    parts.append("</table></body></html>")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+    return path
+
+
+def render_pdf(m: Dict[str, Any], path: str, title: str = "DOGE BOT Performance Report") -> Optional[str]:
+    """matplotlib の PdfPages で PDF 出力（matplotlib が無ければ None）"""
+    if PdfPages is None:
+        return None
+    with PdfPages(path) as pdf:
+        fig, ax = plt.subplots(figsize=(8.27, 11.69))
+        ax.axis("off")
+        ax.set_title(title, loc="left", fontsize=14)
+        # PDF は日本語フォントが無い環境もあるためキー名で出力
+        rows = [(key, fmt.format(m[key]) if m.get(key) is not None else "") for key, _, fmt in SUMMARY_ROWS]
+        table = ax.table(cellText=rows, colLabels=["metric", "value"], loc="upper left", cellLoc="right")
+        table.scale(1, 1.4)
+        pdf.savefig(fig)
+        plt.close(fig)
+        for fig in _figures(m):
+            pdf.savefig(fig)
+            plt.close(fig)
+    return path
@@ -0,0 +1,424 @@
+# bot/config.py
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+try:
+    from dotenv import dotenv_values
+except Exception:
+    dotenv_values = None
+
+
+class ConfigError(ValueError):
+    """設定値の型変換・検証エラー（ロード時にまとめて送出）"""
+
+
+class Field:
+    """
+    設定スキーマ1項目。
+      type:    bool / int / float / str
+      default: 未設定時の値（デフォルトはここ一箇所だけで管理）
+      check:   値の妥当性チェック（True で OK）
+      hot:     ホットリロード対象（戦略しきい値など、再起動不要なもの）
+      aliases: 旧キー名（互換用）
+    """
+    __slots__ = ("name", "type", "default", "check", "hot", "aliases", "doc")
+
+    def __init__(self, name: str, type_: type, default: Any,
+                 check: Optional[Callable[[Any], bool]] = None, hot: bool = False,
+                 aliases: Iterable[str] = (), doc: str = ""):
+        self.name = name
+        self.type = type_
+        self.default = default
+        self.check = check
+        self.hot = hot
+        self.aliases = tuple(aliases)
+        self.doc = doc
+
+
+def _pos(v) -> bool:
+    return v > 0
+
+
+def _nonneg(v) -> bool:
+    return v >= 0
+
+
+def _pct100(v) -> bool:
+    return 0 <= v <= 100
+
+
+def _unit(v) -> bool:
+    return -1.0 <= v <= 1.0
+
+
+SCHEMA: tuple[Field, ...] = (
+    # --- 基本 ---
+    Field("SYMBOL", str, "DOGEUSDT", lambda v: bool(v)),
+    Field("DRY_RUN", bool, True),
+    Field("POLL_SEC", float, 15.0, _nonneg),
+    Field("LOG_LEVEL", str, "INFO",
+          lambda v: v.upper() in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")),
+    # ログは QueueHandler 経由でバックグラウンド出力（コンソール: テキスト / ファイル: JSON Lines）
+    Field("LOG_CONSOLE", bool, True),
+    Field("LOG_JSON_FILE", str, "logs/bot.jsonl"),
+    Field("LOG_FILE_MAX_MB", float, 100.0, _pos),
+    Field("LOG_FILE_BACKUPS", int, 5, _nonneg),
+    Field("LOG_QUEUE_MAX", int, 10000, _pos),
+    # DEBUG は呼び出し箇所ごとに 件/秒・バーストで間引き（0 = 間引かない）
+    Field("LOG_DEBUG_RATE", float, 1.0, _nonneg),
+    Field("LOG_DEBUG_BURST", float, 5.0, _pos),
+    Field("INTERVAL", str, "1"),
+    Field("STRATEGY_NAME", str, "strategy01"),
+    Field("ORDER_SIZE", float, 100.0, _pos, hot=True),
+    Field("LEVERAGE", float, 50.0, _pos),
+    Field("SYNC_POS_FROM_EXCHANGE", bool, True),
+    Field("POSITION_STREAM", bool, True),
+    Field("POSITION_RECONCILE_SEC", float, 60.0, _pos),
+    Field("CONFIG_HOT_RELOAD", bool, True),
+    Field("CONFIG_RELOAD_SEC", float, 2.0, _pos),
+
+    # --- 適応ポーリング（ボラ・値動き・スプレッド・RSI の近さで間隔を伸縮。POLL_SEC は初期値） ---
+    Field("POLL_ADAPTIVE", bool, True),
+    Field("POLL_MIN_SEC", float, 2.0, _pos, hot=True),
+    Field("POLL_MAX_SEC", float, 30.0, _pos, hot=True),
+    Field("POLL_BACKOFF", float, 1.5, lambda v: v >= 1, hot=True),
+    Field("POLL_VOL_HIGH", float, 2.0, lambda v: v > 1, hot=True),
+    Field("POLL_MOVE_BPS", float, 10.0, _pos, hot=True),
+    Field("POLL_SPREAD_BPS", float, 10.0, _pos, hot=True),
+    Field("POLL_RSI_BAND", float, 5.0, _nonneg, hot=True),
+    # REST の予算（1秒あたり。リクエストスケジューラとポーリング間隔の下限計算で共有）
+    Field("API_RATE_LIMIT_PER_SEC", float, 10.0, _pos),
+
+    # --- リクエストスケジューラ（発注 > ポジション > 市場データ） ---
+    Field("API_SCHEDULER", bool, True),
+    Field("API_RATE_BURST", float, 10.0, _pos),
+    Field("API_ORDER_RESERVE", int, 2, _nonneg),
+    Field("API_MARKET_MAX_WAIT_SEC", float, 2.0, _nonneg),
+    Field("API_MARKET_MAX_QUEUE", int, 8, _pos),
+
+    # --- 発注の作り置き（シグナルが近いときに注文リクエスト・署名状態・接続を準備しておく） ---
+    Field("ORDER_PREARM", bool, True, hot=True),
+    Field("ORDER_PREARM_RSI_BAND", float, 3.0, _nonneg, hot=True),
+    Field("ORDER_WARM_SEC", float, 10.0, _nonneg),
+
+    # --- ウォームリスタート用チェックポイント ---
+    Field("CHECKPOINT_ENABLED", bool, True),
+    Field("CHECKPOINT_PATH", str, "logs/checkpoint.bin"),
+    Field("CHECKPOINT_EVERY_SEC", float, 30.0, _nonneg),
+    Field("CHECKPOINT_MAX_AGE_SEC", float, 300.0, _nonneg),
+
+    # --- 認証・通知 ---
+    Field("BYBIT_API_KEY", str, ""),
+    Field("BYBIT_API_SECRET", str, ""),
+    # 空ならダミー取引所。testnet / ローカル fake サーバもここを差し替えるだけ
+    Field("BYBIT_BASE_URL", str, ""),
+    Field("BYBIT_WS_PRIVATE_URL", str, ""),
+    # public WS（tickers / publicTrade）。ExitEngine がティックごとに TP/SL を評価する
+    Field("BYBIT_WS_PUBLIC_URL", str, ""),
+    Field("BYBIT_CATEGORY", str, "linear"),
+    Field("BYBIT_RECV_WINDOW", int, 5000, _pos),
+    Field("BYBIT_TIMEOUT_SEC", float, 5.0, _pos),
+    Field("DISCORD_WEBHOOK_URL", str, ""),
+    Field("DISCORD_PATCH_WEBHOOK", str, ""),
+    Field("DISCORD_COALESCE_SEC", float, 2.0, _nonneg),
+    Field("DISCORD_QUEUE_MAX", int, 1000, _pos),
+
+    # --- 合成マーケット（EXCHANGE_BACKEND=synthetic。ネットワークなし・シード固定の長時間/負荷試験用） ---
+    Field("EXCHANGE_BACKEND", str, "bybit", lambda v: v.lower() in ("bybit", "synthetic")),
+    Field("SYNTH_SEED", int, 0),
+    Field("SYNTH_CYCLE_SEC", float, 15.0, _pos),
+    Field("SYNTH_START_PRICE", float, 0.1, _pos),
+    Field("SYNTH_BOOK_LEVELS", int, 50, _pos),
+    Field("SYNTH_IMBALANCE", float, 0.5, lambda v: 0 <= v < 1),
+
+    # --- 手数料・ログ ---
+    Field("TAKER_FEE_PCT", float, 0.0006, _nonneg),
+    Field("MAKER_FEE_PCT", float, 0.0002, lambda v: v > -1),
+    Field("TRADE_LOG_DIR", str, "logs"),
+    Field("TRADE_LOG_COMPRESS", bool, True),
+    Field("VIRTUAL_BALANCE_USDT", float, 100.0, _nonneg),
+
+    # --- DRY_RUN 約定シミュレータ ---
+    Field("PAPER_MATCHING", bool, True),
+    Field("PAPER_LATENCY_MS", float, 0.0, _nonneg),
+    Field("PAPER_DEFAULT_LEVEL_QTY", float, 1e9, _pos),
+
+    # --- 暴走抑止・追撃・サーキットブレーカ ---
+    Field("MAX_OPEN_ORDERS", int, 3, _nonneg),
+    Field("POSITION_COOLDOWN_SEC", float, 30.0, _nonneg),
+    Field("ALLOW_PYRAMID", bool, False),
+    Field("NET_CAP", float, 2000.0, _nonneg),
+    Field("RETRY_UNFILLED_ORDER", int, 3, _nonneg),
+    Field("LIMIT_SLIPPAGE_PCT", float, 0.05, _nonneg),
+    Field("CB_THRESHOLD_PCT", float, 1.5, _nonneg),
+    Field("CB_LOOKBACK_SEC", float, 10.0, _nonneg),
+
+    # --- インジケータ ---
+    Field("RSI_PERIOD", int, 14, _pos),
+    Field("SMA_FAST", int, 9, _pos),
+    Field("SMA_SLOW", int, 21, _pos),
+    Field("BBANDS_PERIOD", int, 20, _pos, aliases=("BB_WINDOW",)),
+    Field("BBANDS_STDDEV", float, 2.0, _pos, aliases=("BB_STDDEV",)),
+    Field("ATR_PERIOD", int, 14, _pos),
+    # 追加で出す期間（カンマ区切り。rsi_{p} / sma_{p} / atr_{p} を indicators に足す。チューニング・アンサンブル用）
+    Field("INDICATOR_EXTRA_PERIODS", str, "",
+          lambda v: all(s.strip().isdigit() and int(s) > 0 for s in v.split(",") if s.strip())),
+    # ティック特徴量の窓（秒。ポーリング間隔によらず同じ長さ。mom_1s / mom_5s は 1秒・5秒固定）
+    Field("FEATURE_TICK_SEC", float, 300.0, _pos),
+    Field("FEATURE_VOL_SHORT_SEC", float, 300.0, _pos),
+    Field("FEATURE_VOL_LONG_SEC", float, 900.0, _pos),
+    Field("FEATURE_TREND_SEC", float, 450.0, _pos),
+    Field("FEATURE_HISTORY_MAX", int, 20000, lambda v: v >= 2),
+    # ティックからローカル生成するバー（カンマ区切り。"1m,5m,15m,1h" / Bybit表記 "1,5,15,60" 可）
+    Field("BAR_TIMEFRAMES", str, "1m,5m,15m,1h"),
+    Field("BAR_HISTORY", int, 1000, _pos),
+
+    # --- ローカル履歴データストア（確定足・板スナップショットを追記） ---
+    Field("MARKET_STORE_ENABLED", bool, False),
+    Field("MARKET_STORE_DIR", str, "logs/market"),
+
+    # --- リプレイ用の生データ録画 ---
+    Field("RECORDER_ENABLED", bool, False),
+    Field("RECORDER_DIR", str, "logs/recordings"),
+    Field("RECORDER_SEGMENT_MB", float, 64.0, _pos),
+
+    # --- マルチプロセス（市場データ1 + 戦略N。共有メモリのリングで受け渡し） ---
+    Field("MULTIPROCESS", bool, False),
+    Field("MP_STRATEGIES", str, "strategy01", lambda v: bool(v.strip())),
+    Field("MP_RING_SLOTS", int, 1024, _pos),
+    Field("MP_PIN_CPUS", bool, True),
+
+    # --- 戦略しきい値（ホットリロード対象） ---
+    Field("RSI_BUY_THRESHOLD", float, 20.0, _pct100, hot=True),
+    Field("RSI_SELL_THRESHOLD", float, 80.0, _pct100, hot=True),
+    Field("RSI_EXIT_LONG", float, 55.0, _pct100, hot=True),
+    Field("RSI_EXIT_SHORT", float, 45.0, _pct100, hot=True),
+    Field("DEPTH_IMB_THRESHOLD", float, 0.15, _unit, hot=True),
+    Field("TAKER_BIAS_THRESHOLD", float, 0.10, _unit, hot=True),
+
+    # --- 利確・損切（ExitEngine が価格更新ごとに評価。パーセント、0 = 無効） ---
+    Field("EXIT_ENGINE", bool, True),
+    Field("TP_PCT", float, 1.0, _nonneg, hot=True),
+    Field("SL_PCT", float, 0.8, lambda v: 0 <= v < 100, hot=True),
+    Field("TRAIL_PCT", float, 0.0, lambda v: 0 <= v < 100, hot=True),
+    # 比率（0.03 = 3%）での任意上書き。0 より大きければ TP_PCT / SL_PCT より優先
+    Field("TAKE_PROFIT_PCT", float, 0.0, _nonneg, hot=True),
+    Field("STOP_LOSS_PCT", float, 0.0, lambda v: 0 <= v < 1, hot=True),
+)
+
+FIELDS: Dict[str, Field] = {f.name: f for f in SCHEMA}
+HOT_KEYS = frozenset(f.name for f in SCHEMA if f.hot)
+
+_TRUE = ("true", "1", "yes", "on")
+_FALSE = ("false", "0", "no", "off")
+
+
+def _coerce(field: Field, raw: Any) -> Any:
+    if raw is None or (field.type is not str and isinstance(raw, str) and not raw.strip()):
+        return field.default
+    if field.type is bool:
+        if isinstance(raw, bool):
+            return raw
+        s = str(raw).strip().lower()
+        if s in _TRUE:
+            return True
+        if s in _FALSE:
+            return False
+        raise ValueError(f"not a bool: {raw!r}")
+    if field.type is int:
+        if isinstance(raw, bool):
+            raise ValueError(f"not an int: {raw!r}")
+        f = float(raw)
+        if not f.is_integer():
+            raise ValueError(f"not an int: {raw!r}")
+        return int(f)
+    if field.type is float:
+        if isinstance(raw, bool):
+            raise ValueError(f"not a float: {raw!r}")
+        return float(raw)
+    return str(raw).strip()
+
+
+class BotConfig:
+    """
+    型付き・不変の設定オブジェクト。
+      - 値は SCHEMA に従いロード時に一度だけ型変換・検証する
+      - 各コンポーネントは config.DRY_RUN のように属性で直接参照する（デフォルト値の重複禁止）
+      - スキーマ外のキーは文字列のまま extras に保持し、属性アクセスで参照可能
+      - 変更は replace() で新しいインスタンスを作る（ホットリロード用）
+    """
+    __slots__ = tuple(FIELDS) + ("_extras", "_source")
+
+    def __init__(self, values: Optional[Mapping[str, Any]] = None, source: Optional[str] = None):
+        values = dict(values or {})
+        errors = []
+        for f in SCHEMA:
+            raw = values.pop(f.name, None)
+            for alias in f.aliases:
+                alias_raw = values.pop(alias, None)
+                if raw is None:
+                    raw = alias_raw
+            try:
+                val = _coerce(f, raw)
+                if f.check is not None and not f.check(val):
+                    raise ValueError(f"out of range: {val!r}")
+            except (TypeError, ValueError) as e:
+                errors.append(f"{f.name}: {e}")
+                val = f.default
+            object.__setattr__(self, f.name, val)
+        object.__setattr__(self, "_extras", {k: v for k, v in values.items() if v is not None})
+        object.__setattr__(self, "_source", source)
+
+        errors.extend(self._cross_check())
+        if errors:
+            raise ConfigError("invalid config: " + "; ".join(errors))
+
+    def _cross_check(self) -> list:
+        errors = []
+        if self.RSI_BUY_THRESHOLD >= self.RSI_SELL_THRESHOLD:
+            errors.append("RSI_BUY_THRESHOLD must be < RSI_SELL_THRESHOLD")
+        if self.SMA_FAST > self.SMA_SLOW:
+            errors.append("SMA_FAST must be <= SMA_SLOW")
+        if self.FEATURE_VOL_SHORT_SEC > self.FEATURE_VOL_LONG_SEC:
+            errors.append("FEATURE_VOL_SHORT_SEC must be <= FEATURE_VOL_LONG_SEC")
+        return errors
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"BotConfig is frozen (tried to set {name})")
+
+    def __getattr__(self, name):
+        # スロットに無い属性のみここに来る → スキーマ外キー
+        try:
+            return object.__getattribute__(self, "_extras")[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        shown = {k: ("***" if ("SECRET" in k or "KEY" in k or "WEBHOOK" in k) and v else v)
+                 for k, v in self.as_dict().items()}
+        return f"BotConfig({shown})"
+
+    def __reduce__(self):
+        return (BotConfig, ({**self._extras, **self.as_dict()}, self._source))
+
+    @property
+    def source(self) -> Optional[str]:
+        return self._source
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in SCHEMA}
+
+    def replace(self, **changes) -> "BotConfig":
+        values = {**self._extras, **self.as_dict(), **changes}
+        return BotConfig(values, source=self._source)
+
+    @classmethod
+    def from_object(cls, obj) -> "BotConfig":
+        """旧 Config / 任意オブジェクト / dict から変換（互換用）"""
+        if isinstance(obj, BotConfig):
+            return obj
+        if obj is None:
+            return cls()
+        if isinstance(obj, Mapping):
+            return cls(obj)
+        return cls({k: v for k, v in vars(obj).items() if not k.startswith("_")})
+
+
+def ensure_config(obj) -> BotConfig:
+    return BotConfig.from_object(obj)
+
+
+def load_config(path: str = "env/.env") -> BotConfig:
+    """
+    .env を読み込み BotConfig を返す。ファイルが無ければ全てデフォルト。
+    不正値は ConfigError（起動時に即失敗させる）。
+    """
+    values: Dict[str, Any] = {}
+    if os.path.exists(path):
+        if dotenv_values is None:
+            raise ConfigError("python-dotenv is required to read .env files")
+        values = dict(dotenv_values(path))
+    return BotConfig(values, source=path)
+
+
+class ConfigWatcher:
+    """
+    .env の mtime をバックグラウンドで監視し、HOT_KEYS の変更だけを反映した
+    新しい BotConfig を保留する。適用はメインループ側で take() して行う
+    （トレードスレッド外で戦略の状態を書き換えないため）。
+    ホット対象外のキー変更は警告のみ（再起動が必要）。
+    """
+
+    def __init__(self, config: BotConfig, interval: Optional[float] = None, logger=None):
+        self.config = config
+        self.path = config.source
+        self.interval = float(interval if interval is not None else config.CONFIG_RELOAD_SEC)
+        self.logger = logger
+        self._pending: Optional[BotConfig] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._mtime = self._stat()
+
+    def _stat(self) -> float:
+        try:
+            return os.stat(self.path).st_mtime if self.path else 0.0
+        except OSError:
+            return 0.0
+
+    def start(self) -> "ConfigWatcher":
+        if self.path and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="config-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> bool:
+        """mtime が変わっていれば再読込。保留が作られたら True"""
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            fresh = load_config(self.path)
+        except ConfigError as e:
+            if self.logger:
+                self.logger.error(f"[Config] reload rejected: {e}")
+            return False
+
+        base = self.config
+        changed = {k: v for k, v in fresh.as_dict().items() if getattr(base, k) != v}
+        hot = {k: v for k, v in changed.items() if k in HOT_KEYS}
+        cold = sorted(set(changed) - HOT_KEYS)
+        if cold and self.logger:
+            self.logger.warning(f"[Config] restart required to apply: {', '.join(cold)}")
+        if not hot:
+            return False
+        try:
+            new_cfg = base.replace(**hot)
+        except ConfigError as e:
+            if self.logger:
+                self.logger.error(f"[Config] reload rejected: {e}")
+            return False
+        with self._lock:
+            self.config = new_cfg
+            self._pending = new_cfg
+        if self.logger:
+            self.logger.info(f"[Config] hot reload: {hot}")
+        return True
+
+    def take(self) -> Optional[BotConfig]:
+        """保留中の新設定を取り出す（無ければ None）"""
+        if self._pending is None:
+            return None
+        with self._lock:
+            cfg, self._pending = self._pending, None
+        return cfg
@@ -1,60 +1,243 @@
 # bot/core.py
 import time
+from bot.config import ConfigWatcher, ensure_config
 from bot.exchange.bybit import BybitExchange
+from bot.exchange.position_stream import PositionTracker
+from bot.exchange.synthetic import SyntheticExchange
+from bot.exchange.scheduler import RequestScheduler, ScheduledExchange
 from bot.strategies.strategy01 import Strategy01
+from bot.utils.exit_engine import ExitEngine
 from bot.utils.order_executor import OrderExecutor
 from bot.utils.position_handler import PositionHandler
 from bot.features.indicators import load_indicators_from_env
+from bot.features.features import feature_state, order_book
+from bot.features.resampler import BarResampler
+from bot.utils.checkpoint import Checkpoint
+from bot.data.store import MarketDataStore
+from bot.utils.recorder import MarketRecorder, RecordingExchange
+from bot.utils.notifier import DiscordNotifier
+from bot.utils.poll_scheduler import AdaptivePoller
+from bot.utils.trace import from_indicators as trace_from_indicators
 # from bot.features.features import compute_market_features  
 # ↑ 必要に応じて併用可能（現在はindicatorsに統合済み）
 
 class BotRunner:
-    def __init__(self, config, logger):
-        self.config = config
+    # False なら市場データ専用（取得・特徴量のみ。発注・ポジション・イグジットのオブジェクトも private stream も作らない）
+    TRADING = True
+
+    def __init__(self, config, logger, exchange=None):
+        self.config = config = ensure_config(config)
         self.logger = logger
+        self.poll_sec = config.POLL_SEC
 
-        self.exchange = BybitExchange(config, logger)
-        self.strategy = Strategy01(config, logger)
-        self.order_executor = OrderExecutor(self.exchange, config, logger)
-        self.position_handler = PositionHandler(self.exchange, config, logger)
+        # exchange を注入可能（リプレイ・負荷試験用）。未指定なら Bybit（EXCHANGE_BACKEND=synthetic なら合成マーケット）
+        if exchange is None and config.EXCHANGE_BACKEND.lower() == "synthetic":
+            exchange = SyntheticExchange.from_config(config, logger)
+        self.exchange = exchange if exchange is not None else BybitExchange(config, logger)
+
+        # API キー1本のレート予算を優先度付きで配分（発注 > ポジション > 市場データ）
+        self.api_scheduler = None
+        if config.API_SCHEDULER:
+            self.api_scheduler = RequestScheduler(
+                rate_per_sec=config.API_RATE_LIMIT_PER_SEC,
+                burst=config.API_RATE_BURST,
+                reserve=config.API_ORDER_RESERVE,
+                market_max_wait=config.API_MARKET_MAX_WAIT_SEC,
+                market_max_queue=config.API_MARKET_MAX_QUEUE,
+                logger=logger,
+            )
+            self.exchange = ScheduledExchange(self.exchange, self.api_scheduler)
+
+        # 生レスポンス録画（決定的リプレイ用）。記録はバックグラウンドスレッドで書き出し
+        self.recorder = None
+        if config.RECORDER_ENABLED:
+            self.recorder = MarketRecorder(
+                out_dir=config.RECORDER_DIR,
+                segment_bytes=int(config.RECORDER_SEGMENT_MB * 1024 * 1024),
+                logger=logger,
+            )
+            # 録画時のモードを先頭に書く（リプレイは同じ DRY_RUN / 約定シミュレータ設定で再生）
+            self.exchange = RecordingExchange(self.exchange, self.recorder, session={
+                "dry_run": config.DRY_RUN, "paper_matching": config.PAPER_MATCHING,
+            })
+        # Discord 通知（非ブロッキング・バースト集約・レート制限対応）
+        self.notifier = None
+        if config.DISCORD_WEBHOOK_URL:
+            self.notifier = DiscordNotifier(
+                config.DISCORD_WEBHOOK_URL,
+                coalesce_sec=config.DISCORD_COALESCE_SEC,
+                max_queue=config.DISCORD_QUEUE_MAX,
+                logger=logger,
+            )
+
+        # 売買側（戦略・発注・ポジション追跡・保護的イグジット）。市場データ専用なら作らない
+        self.strategy = self.order_executor = self.position_handler = None
+        self.position_tracker = self.exit_engine = None
+        self.last_position = None
+        if self.TRADING:
+            self._init_trading(config, logger)
+
+        # ポーリング間隔は相場に応じて伸縮（1サイクルの REST: ohlcv + 価格 + 板 [+ ポジ]）
+        polling = self.position_tracker is not None and not self.position_tracker.streaming
+        self.poller = AdaptivePoller(config, calls_per_cycle=4 if polling else 3)
 
         # インジケータ・パイプライン（features統合済み）
         self.indicators = load_indicators_from_env(config)
 
+        # 上位足はティックからローカル生成（タイムフレーム追加で REST は増えない）
+        self.resampler = BarResampler(
+            [tf for tf in config.BAR_TIMEFRAMES.split(",") if tf.strip()],
+            maxlen=config.BAR_HISTORY,
+        )
+
+        # 履歴データストア（ライブループから確定足・板を append-only で蓄積）
+        self.market_store = MarketDataStore(root=config.MARKET_STORE_DIR) if config.MARKET_STORE_ENABLED else None
+
+        # ウォームリスタート: 新鮮なチェックポイントがあれば特徴量バッファ等を復元
+        self.checkpoint = None
+        restored = False
+        if config.CHECKPOINT_ENABLED:
+            self.checkpoint = Checkpoint(
+                path=config.CHECKPOINT_PATH,
+                every_sec=config.CHECKPOINT_EVERY_SEC,
+                max_age_sec=config.CHECKPOINT_MAX_AGE_SEC,
+                logger=logger,
+            )
+            restored = self.checkpoint.restore(feature_state, self.position_handler, self.order_executor)
+
+        if self.TRADING:
+            self._sync_position(restored)
+
+        # 戦略しきい値のホットリロード（.env 監視。特徴量の状態は保持したまま）
+        self.config_watcher = None
+        if config.CONFIG_HOT_RELOAD and config.source:
+            self.config_watcher = ConfigWatcher(config, logger=logger).start()
+
+    def _init_trading(self, config, logger):
+        self.strategy = Strategy01(config, logger)
+        self.order_executor = OrderExecutor(self.exchange, config, logger, discord=self.notifier)
+        self.position_handler = PositionHandler(self.exchange, config, logger)
+
+        # ポジションは private stream のプッシュでキャッシュ（stream が無ければ REST ポーリング）
+        stream = self.exchange.open_private_stream() if config.POSITION_STREAM else None
+        self.position_tracker = PositionTracker(
+            self.exchange, stream=stream, symbol=config.SYMBOL,
+            reconcile_sec=config.POSITION_RECONCILE_SEC, logger=logger,
+            alert=self.notifier.alert if self.notifier else None,
+        ).start()
+
+        # 利確・損切・トレーリング（public WS のティックごとに評価。WS が無ければ毎サイクルの価格で）
+        public = self.exchange.open_public_stream() if config.EXIT_ENGINE else None
+        self.exit_engine = ExitEngine(
+            config, self.order_executor, self.position_handler,
+            tracker=self.position_tracker, stream=public, logger=logger,
+            alert=self.notifier.alert if self.notifier else None,
+        ).start()
+
+    def _sync_position(self, restored: bool):
         # ★ 起動時の一度だけ、実ポジから内部状態へ同期
+        # DRY_RUN でチェックポイント復元済みなら内部状態が正（ダミー取引所は常にflat）
+        config = self.config
+        self.position_tracker.reconcile(force=True)
+        boot_position = None
+        if not (restored and config.DRY_RUN):
+            boot_position = self.position_tracker.get()
+
+            # 再起動時の取り違え防止。flatでも“初回のみ”は反映させたいので force_flat=True
+            self.position_handler.sync_from_exchange(boot_position, force_flat=True)
+        if self.position_handler.in_position:
+            self.exit_engine.arm_from(self.order_executor.entry_snapshot, boot_position)
+
+    def _apply_config_reload(self):
+        new_cfg = self.config_watcher.take() if self.config_watcher else None
+        if new_cfg is not None:
+            self.config = new_cfg
+            self.poller.apply_config(new_cfg)
+            if self.TRADING:
+                self.strategy.apply_config(new_cfg)
+                self.exit_engine.apply_config(new_cfg)
+
+    def _save_checkpoint(self, force: bool = False):
+        if self.checkpoint is None or not (force or self.checkpoint.due()):
+            return
         try:
-            boot_position = self.exchange.get_current_position()
-        except Exception:
-            boot_position = {"is_open": False, "side": None, "size": 0.0, "entry_price": 0.0}
+            self.checkpoint.save(feature_state, self.position_handler, self.order_executor)
+        except Exception as e:
+            self.logger.warning(f"[Checkpoint] save failed: {e!r}")
 
-        # 再起動時の取り違え防止。flatでも“初回のみ”は反映させたいので force_flat=True
-        self.position_handler.sync_from_exchange(boot_position, force_flat=True)
+    def _store_market_data(self, ts_ms, closed_bars):
+        try:
+            for tf, bar in closed_bars:
+                self.market_store.append_kline(self.config.SYMBOL, bar, interval=tf)
+            if order_book.has_both:
+                self.market_store.append_book(self.config.SYMBOL, ts_ms, order_book)
+        except Exception as e:
+            self.logger.warning(f"[MarketDataStore] append failed: {e!r}")
 
-    def run(self):
+    def _collect_indicators(self):
         # 価格データの取得と特徴量計算
         price_data = self.exchange.fetch_ohlcv("1m", limit=100)
         indicators = self.indicators(price_data, exchange=self.exchange)
 
-        # 現在の実ポジ（戦略ロジック用に参照）
-        position = self.exchange.get_current_position()
+        # 今サイクルの価格ティックを全タイムフレームへ（strategy は indicators["bars"].bars("5m") で参照）
+        if len(feature_state):
+            ts_ms = int(feature_state.times[-1] * 1000)
+            closed_bars = self.resampler.on_price(ts_ms, float(feature_state.prices[-1]))
+            if self.market_store is not None:
+                self._store_market_data(ts_ms, closed_bars)
+        indicators["bars"] = self.resampler
+        return indicators
+
+    def _act(self, indicators):
+        # 今サイクルの価格でも TP/SL を評価（public WS が無い・途切れた場合の下限。発火すればここで決済済み）
+        fired = self.exit_engine.on_price(indicators.get("mid") or indicators.get("last_close") or 0.0)
+
+        # 現在の実ポジ（戦略ロジック用に参照。stream 有りならメモリから、低頻度で REST 突き合わせ）
+        self.position_tracker.reconcile()
+        position = self.last_position = self.position_tracker.get()
 
         # 先に開閉の判定を済ませてから、エッジ検出で一度だけ実行
         open_ok  = self.strategy.should_open_position(indicators, position)
         close_ok = self.strategy.should_close_position(indicators, position)
 
-        if open_ok:
-            signal = self.strategy.generate_signal(indicators, position)
-            side = signal.get("side")
-            if side in ("Buy", "Sell") and self.position_handler.entry_edge(True, side):
-                self.order_executor.execute(signal)
-                self.position_handler.mark_entered(side)
+        # 売買は ExitEngine と同じロックの中で（WS スレッドの決済と二重にならないよう）
+        traded = fired
+        with self.exit_engine.lock:
+            if open_ok:
+                signal = self.strategy.generate_signal(indicators, position)
+                side = signal.get("side")
+                if side in ("Buy", "Sell") and self.position_handler.entry_edge(True, side):
+                    self.order_executor.execute(signal)
+                    self.position_handler.mark_entered(side)
+                    self.exit_engine.arm_from(self.order_executor.entry_snapshot)
+                    traded = True
+
+            elif close_ok and self.position_handler.close_edge(True):
+                self.exit_engine.disarm()
+                if self.order_executor.close_position(position, reason="strategy",
+                                                      trace=trace_from_indicators(indicators)):
+                    self.position_handler.mark_closed()
+                    traded = True
+                else:
+                    # まだ保有中: 保護的イグジットを戻し、次サイクルの close_edge で再試行
+                    self.exit_engine.arm_from(self.order_executor.entry_snapshot, position)
 
-        elif close_ok and self.position_handler.close_edge(True):
-            self.order_executor.close_position(position, reason="strategy")
-            self.position_handler.mark_closed()
+        # エントリーが近ければ注文を作り置き（確定したら送るだけ）。遠ければ捨てる
+        if self.config.ORDER_PREARM and not traded and not self.position_handler.in_position:
+            self.order_executor.prepare(
+                self.strategy.pending_side(indicators, self.config.ORDER_PREARM_RSI_BAND),
+                self.strategy.order_size, ref_price=indicators.get("mid") or 0.0)
+
+        # 状態が変わった時は即時、それ以外は一定間隔でチェックポイント
+        self._save_checkpoint(force=traded)
+
+    def run(self):
+        self._apply_config_reload()
+        indicators = self._collect_indicators()
+        self._act(indicators)
 
-        # ポーリング間隔
-        time.sleep(int(getattr(self.config, "POLL_SEC", 15)))
+        # ポーリング間隔（動いている・シグナルが近い・保有中なら短く、静かなら長く）
+        time.sleep(self.poller.next_interval(indicators, self.last_position))
 
 # FIXME: Strategy02 / Strategy03 実装後に呼び出し追加
 # FIXME: CircuitBreakerV2 (Stage3) は拡張済みだが、WS特徴量との連携未実装
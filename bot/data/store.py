@@ -0,0 +1,183 @@
+# bot/data/store.py
+from __future__ import annotations
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DAY_MS = 86_400_000
+BOOK_LEVELS = 20
+
+KLINE_DTYPE = np.dtype([
+    ("ts", "<i8"),        # バー開始（エポックms, UTC）
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+
+def book_dtype(levels: int = BOOK_LEVELS) -> np.dtype:
+    """板スナップショット（固定レベル数。不足分は 0 埋め）"""
+    return np.dtype([
+        ("ts", "<i8"),
+        ("bid_px", "<f8", (levels,)),
+        ("bid_qty", "<f8", (levels,)),
+        ("ask_px", "<f8", (levels,)),
+        ("ask_qty", "<f8", (levels,)),
+    ])
+
+
+def _day_of(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms // 1000, tz=timezone.utc).strftime("%Y%m%d")
+
+
+def _day_start_ms(day: str) -> int:
+    dt = datetime.strptime(day, "%Y%m%d").replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) * 1000
+
+
+class MarketDataStore:
+    """
+    ローカルの履歴データストア（klines / 板スナップショット）。
+      レイアウト: {root}/{symbol}/{kind}/{YYYYMMDD}.bin
+        - kind: "kline_1m" 等 / "book"
+        - 中身は固定 dtype のレコードを連結しただけの生バイナリ（ヘッダ無し）
+          → np.memmap でそのまま配列として読める（CSV/JSON のパース無し）
+      索引: ファイル名（UTC日付）で日を絞り、日内は ts 列を searchsorted
+      追記: 時刻順の append-only。同一 ts の kline は最終行を上書き（未確定足の更新）
+    """
+
+    def __init__(self, root: str = "logs/market", book_levels: int = BOOK_LEVELS):
+        self.root = root
+        self.book_levels = int(book_levels)
+        self._book_dtype = book_dtype(self.book_levels)
+        # (symbol, kind, day) -> 最終 ts（追記順チェック用のキャッシュ）
+        self._last_ts: Dict[Tuple[str, str, str], int] = {}
+        self.dropped = 0
+
+    # ---- パス・索引 ----
+    def dtype_for(self, kind: str) -> np.dtype:
+        return self._book_dtype if kind == "book" else KLINE_DTYPE
+
+    def _dir(self, symbol: str, kind: str) -> str:
+        return os.path.join(self.root, symbol, kind)
+
+    def _path(self, symbol: str, kind: str, day: str) -> str:
+        return os.path.join(self._dir(symbol, kind), f"{day}.bin")
+
+    def days(self, symbol: str, kind: str) -> List[str]:
+        d = self._dir(symbol, kind)
+        if not os.path.isdir(d):
+            return []
+        return sorted(f[:-4] for f in os.listdir(d) if f.endswith(".bin") and len(f) == 12)
+
+    def _open_day(self, symbol: str, kind: str, day: str) -> np.ndarray:
+        path = self._path(symbol, kind, day)
+        dt = self.dtype_for(kind)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        n = size // dt.itemsize
+        if n == 0:
+            return np.empty(0, dtype=dt)
+        return np.memmap(path, dtype=dt, mode="r", shape=(n,))
+
+    # ---- 追記 ----
+    def _last_ts_of(self, symbol: str, kind: str, day: str) -> Optional[int]:
+        key = (symbol, kind, day)
+        if key not in self._last_ts:
+            arr = self._open_day(symbol, kind, day)
+            self._last_ts[key] = int(arr["ts"][-1]) if len(arr) else None
+        return self._last_ts[key]
+
+    def append(self, symbol: str, kind: str, records: np.ndarray) -> int:
+        """
+        構造化配列を日ごとのファイルへ追記する。時刻が巻き戻るレコードは捨てる。
+        return: 書き込んだ件数
+        """
+        dt = self.dtype_for(kind)
+        records = np.asarray(records, dtype=dt)
+        if not len(records):
+            return 0
+        written = 0
+        days = (records["ts"] // DAY_MS) * DAY_MS
+        for day_ms in np.unique(days):
+            chunk = records[days == day_ms]
+            day = _day_of(int(day_ms))
+            path = self._path(symbol, kind, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            last = self._last_ts_of(symbol, kind, day)
+            if last is not None:
+                if kind != "book" and int(chunk["ts"][0]) == last:
+                    # 同一バーの更新 → 最終レコードを上書き
+                    with open(path, "r+b") as f:
+                        f.seek(-dt.itemsize, os.SEEK_END)
+                        f.write(chunk[:1].tobytes())
+                    chunk = chunk[1:]
+                    written += 1
+                keep = chunk["ts"] > last
+                self.dropped += int((~keep).sum())
+                chunk = chunk[keep]
+            if not len(chunk):
+                continue
+            order_ok = np.all(np.diff(chunk["ts"]) > 0) if len(chunk) > 1 else True
+            if not order_ok:
+                chunk = np.sort(chunk, order="ts")
+                _, first = np.unique(chunk["ts"], return_index=True)
+                self.dropped += len(chunk) - len(first)
+                chunk = chunk[first]
+            with open(path, "ab") as f:
+                f.write(chunk.tobytes())
+            self._last_ts[(symbol, kind, day)] = int(chunk["ts"][-1])
+            written += len(chunk)
+        return written
+
+    def append_kline(self, symbol: str, bar: dict, interval: str = "1m") -> int:
+        rec = np.zeros(1, dtype=KLINE_DTYPE)
+        rec["ts"] = int(bar["start"])
+        for k in ("open", "high", "low", "close", "volume"):
+            rec[k] = float(bar.get(k, bar["close"]) or 0.0)
+        return self.append(symbol, f"kline_{interval}", rec)
+
+    def append_book(self, symbol: str, ts_ms: int, book) -> int:
+        """book: OrderBookArrays（bid_px/bid_qty/ask_px/ask_qty を持つもの）"""
+        n = self.book_levels
+        rec = np.zeros(1, dtype=self._book_dtype)
+        rec["ts"] = int(ts_ms)
+        for name in ("bid_px", "bid_qty", "ask_px", "ask_qty"):
+            src = np.asarray(getattr(book, name))[:n]
+            rec[name][0, :len(src)] = src
+        return self.append(symbol, "book", rec)
+
+    # ---- 読み出し ----
+    def segments(self, symbol: str, kind: str, start_ms: int, end_ms: int) -> Iterator[np.ndarray]:
+        """[start_ms, end_ms) に掛かる日ごとの memmap ビュー（コピー無し）"""
+        first_day = _day_of(int(start_ms))
+        last_day = _day_of(int(end_ms) - 1)
+        for day in self.days(symbol, kind):
+            if day < first_day or day > last_day:
+                continue
+            arr = self._open_day(symbol, kind, day)
+            if not len(arr):
+                continue
+            ts = arr["ts"]
+            lo = 0 if _day_start_ms(day) >= start_ms else int(np.searchsorted(ts, start_ms, "left"))
+            hi = int(np.searchsorted(ts, end_ms, "left"))
+            if hi > lo:
+                yield arr[lo:hi]
+
+    def load(self, symbol: str, kind: str, start_ms: int, end_ms: int) -> np.ndarray:
+        """
+        時間範囲を1つの配列で返す。1日に収まる場合は memmap のビューそのもの、
+        複数日に跨る場合のみ連結（1回のコピー）。
+        """
+        segs = list(self.segments(symbol, kind, start_ms, end_ms))
+        if not segs:
+            return np.empty(0, dtype=self.dtype_for(kind))
+        if len(segs) == 1:
+            return segs[0]
+        return np.concatenate(segs)
+
+    def load_klines(self, symbol: str, start_ms: int, end_ms: int, interval: str = "1m") -> np.ndarray:
+        return self.load(symbol, f"kline_{interval}", start_ms, end_ms)
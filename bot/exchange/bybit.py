@@ -1,89 +1,191 @@
 # bot/exchange/bybit.py
 from __future__ import annotations
 import time
-from typing import Dict, List, Any, Optional
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from bot.config import ensure_config
+from bot.exchange.bybit_rest import BybitAPIError, BybitPrivateStream, BybitPublicStream, BybitRestClient
+from bot.exchange.types import Bars, BookSide, OrderBook, Position
+from bot.features.resampler import timeframe_ms
+
+
+def _interval(timeframe: str) -> str:
+    """"1m" / "1h" / "1d" などを v5 kline の interval（"1","60","D","W"）へ"""
+    minutes = timeframe_ms(timeframe) // 60_000
+    return {1440: "D", 10080: "W"}.get(minutes, str(minutes))
 
 
 class BybitExchange:
     """
-    本番化の際は pybit 等の HTTP/WS クライアントを注入するだけでOKな形を維持。
-    インターフェイス:
+    BYBIT_BASE_URL が設定されていれば v5 REST（BybitRestClient）、未設定ならダミーで動く。
+    （testnet やローカルの fake サーバ: bot/testing/fake_bybit.py にも URL の差し替えだけで向けられる）
+    インターフェイス（型は bot.exchange.types。生レスポンスはここで一度だけ変換する）:
       - get_last_price()       -> float
-      - get_orderbook()        -> {"best_bid": float, "best_ask": float}
-                                  または {"bids":[[price,qty],...], "asks":[[price,qty],...]}
-      - get_current_position() -> {"is_open": bool, "side": "Buy"/"Sell"/None,
-                                   "size": float, "entry_price": float}
+      - get_orderbook()        -> OrderBook（bids/asks の価格・数量配列。best のみなら from_best）
+      - get_current_position() -> Position(is_open, side "Buy"/"Sell"/None, size, entry_price)
       - place_market_order(side, qty) -> 取引所レスポンス (dict)
-      - fetch_ohlcv(timeframe, limit) -> List[Dict[str, Any]]  # 互換のため残置（ダミー）
+      - prepare_market_order(side, qty) / send_prepared(order) -> 同上（作り置きして送るだけの高速経路）
+      - fetch_ohlcv(timeframe, limit) -> Bars（列指向）
+      - open_private_stream()  -> BybitPrivateStream | None（BYBIT_WS_PRIVATE_URL 設定時）
+      - open_public_stream()   -> BybitPublicStream | None（BYBIT_WS_PUBLIC_URL 設定時）
     """
     def __init__(self, config, logger):
-        self.config = config
+        self.config = config = ensure_config(config)
         self.logger = logger
-        self.symbol: str = getattr(config, "SYMBOL", "DOGEUSDT")
+        self.symbol: str = config.SYMBOL
 
         # ダミー内部価格（本番はAPIで更新）
         self._last_price: float = 0.1
 
-        # 実運用用のキー（保持だけ。使うのは本番実装時）
-        self.api_key: str = getattr(config, "BYBIT_API_KEY", "")
-        self.api_secret: str = getattr(config, "BYBIT_API_SECRET", "")
+        self.api_key: str = config.BYBIT_API_KEY
+        self.api_secret: str = config.BYBIT_API_SECRET
+        self.category: str = config.BYBIT_CATEGORY
+
+        # v5 REST（未設定ならダミー）
+        self.http = None
+        if config.BYBIT_BASE_URL:
+            self.http = BybitRestClient(
+                config.BYBIT_BASE_URL, self.api_key, self.api_secret,
+                recv_window=config.BYBIT_RECV_WINDOW, timeout=config.BYBIT_TIMEOUT_SEC,
+            )
 
-        # TODO: 本番化の際に pybit の HTTP/WS クライアントを初期化
-        # from pybit.unified_trading import HTTP
-        # self.http = HTTP(api_key=self.api_key, api_secret=self.api_secret, testnet=False)
+    def _params(self, **extra) -> Dict[str, Any]:
+        return {"category": self.category, "symbol": self.symbol, **extra}
 
-    # ---- 市場データ（ダミー / フォールバック） ----
+    # ---- 市場データ ----
     def get_last_price(self) -> float:
-        """
-        本番: v5/market/tickers 等から該当シンボルの lastPrice を取得して返す。
-        ここではダミー値を返す。
-        """
-        return float(self._last_price)
+        """v5/market/tickers の lastPrice（ダミーでは内部価格）"""
+        if self.http is None:
+            return float(self._last_price)
+        rows = self.http.get("/v5/market/tickers", self._params()).get("list") or []
+        if not rows:
+            raise BybitAPIError(f"no ticker for {self.symbol}")
+        return float(rows[0]["lastPrice"])
 
-    def get_orderbook(self) -> Dict[str, float]:
+    def get_orderbook(self) -> OrderBook:
         """
-        本番: v5/market/orderbook から best bid/ask を構築して返す。
-        ここでは last を中心に適当なスプレッドでダミー返却。
+        v5/market/orderbook の b/a（文字列の [[price, qty], ...]）を配列化して返す。
+        ダミーでは last を中心に適当なスプレッド（数量不明の板）。
         """
+        if self.http is not None:
+            res = self.http.get("/v5/market/orderbook", self._params(limit=50))
+            return OrderBook(BookSide.from_levels(res.get("b")), BookSide.from_levels(res.get("a")),
+                             ts=float(res.get("ts") or 0) / 1000.0)
         mid = self.get_last_price() or 0.1
         spread = max(mid * 0.0005, 0.0001)
-        return {"best_bid": mid - spread / 2, "best_ask": mid + spread / 2}
+        return OrderBook.from_best(mid - spread / 2, mid + spread / 2)
+
+    def get_current_position(self) -> Position:
+        """v5/position/list の self.symbol を Position に正規化（ダミーでは未保有）"""
+        if self.http is None:
+            return Position.flat()
+        rows = self.http.get("/v5/position/list", self._params(), auth=True).get("list") or []
+        for r in rows:
+            if r.get("symbol") == self.symbol and float(r.get("size") or 0) > 0:
+                return Position(True, r.get("side") or None, float(r["size"]), float(r.get("avgPrice") or 0))
+        return Position.flat()
+
+    def open_private_stream(self):
+        """
+        BYBIT_WS_PRIVATE_URL が設定されていれば private WS（position / execution）を返す。
+        未設定・websocket-client 無しなら None（PositionTracker は REST ポーリングで動作）。
+        """
+        url = self.config.BYBIT_WS_PRIVATE_URL
+        if not url:
+            return None
+        try:
+            return BybitPrivateStream(url, self.api_key, self.api_secret, logger=self.logger)
+        except Exception as e:
+            self.logger.warning(f"[EXCHANGE] private stream unavailable: {e!r}")
+            return None
 
-    def get_current_position(self) -> Dict[str, Any]:
+    def open_public_stream(self):
         """
-        本番: v5/position/list で self.symbol を抽出し、以下の形に正規化して返す:
-          { "is_open": bool, "side": "Buy"/"Sell"/None, "size": float, "entry_price": float }
-        ここでは未保有ダミー。
+        BYBIT_WS_PUBLIC_URL が設定されていれば public WS（tickers / publicTrade）を返す。
+        未設定・websocket-client 無しなら None（ExitEngine はポーリングごとの価格で評価）。
         """
-        return {"is_open": False, "side": None, "size": 0.0, "entry_price": 0.0}
+        url = self.config.BYBIT_WS_PUBLIC_URL
+        if not url:
+            return None
+        try:
+            return BybitPublicStream(url, self.symbol, logger=self.logger)
+        except Exception as e:
+            self.logger.warning(f"[EXCHANGE] public stream unavailable: {e!r}")
+            return None
 
     # ---- 取引（ダミー） ----
     def place_market_order(self, side: str, qty: float) -> Dict[str, Any]:
         """
-        本番: v5/order/create にて MARKET 注文を実行。
-        ここではログ出力と内部ダミー価格の微調整のみ行う。
+        v5/order/create にて MARKET 注文を実行。
+        ダミーではログ出力と内部ダミー価格の微調整のみ行う。
         """
         self.logger.info(f"[EXCHANGE] MARKET {side} {qty} {self.symbol}")
+        if self.http is not None:
+            res = self.http.post("/v5/order/create", self._params(
+                side=side, orderType="Market", qty=str(qty)))
+            # v5 は作成応答に約定価格を含まない（含む実装・fake サーバなら avg_price として返す）
+            return {"status": "ok", "side": side, "qty": qty, "symbol": self.symbol,
+                    "order_id": res.get("orderId"), "avg_price": float(res.get("avgPrice") or 0.0)}
         # ダミーで価格をわずかに動かす（約定で中立っぽく推移）
         factor = 0.0002 if side.lower() == "buy" else -0.0002
         self._last_price = (self._last_price or 0.1) * (1.0 + factor)
         return {"status": "ok", "side": side, "qty": qty, "symbol": self.symbol}
 
-    # ---- 互換：core/indicators 用のダミーOHLCV ----
-    def fetch_ohlcv(self, timeframe: str, limit: int = 100) -> List[Dict[str, Any]]:
+    def prepare_market_order(self, side: str, qty: float, warm_sec: float = 10.0) -> Dict[str, Any]:
+        """
+        place_market_order の作り置き（シグナルが近いときに呼ぶ）。
+        v5/order/create の本文・固定ヘッダ・署名の状態を作っておき、warm_connection(warm_sec) で接続を温めておく
+        （warm_sec < 0 なら温めない。ScheduledExchange はレート予算を通して別に温める）。
+        送信は send_prepared(order)。ダミーでは side/qty を持つだけ。
+        """
+        order = {"side": side, "qty": qty, "post": None}
+        if self.http is not None:
+            order["post"] = self.http.prepare_post("/v5/order/create", self._params(
+                side=side, orderType="Market", qty=str(qty)))
+            self.warm_connection(warm_sec)
+        return order
+
+    def warm_connection(self, warm_sec: float = 10.0, acquire: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        keep-alive の接続が warm_sec 以上使われていなければ tickers を1回叩いて温める。
+        acquire（レート予算を待たずに取る関数）が False を返したら叩かない。温めたら True。
+        """
+        if self.http is None or warm_sec < 0 or self.http.idle_sec <= warm_sec:
+            return False
+        if acquire is not None and not acquire():
+            return False
+        try:
+            self.http.get("/v5/market/tickers", self._params())
+        except Exception as e:
+            self.logger.debug("[EXCHANGE] warm-up failed: %r", e)
+            return False
+        return True
+
+    def send_prepared(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """prepare_market_order の注文を送る（応答は place_market_order と同じ形。ログは送信後）"""
+        side, qty = order["side"], order["qty"]
+        if order.get("post") is None:
+            return self.place_market_order(side, qty)
+        res = self.http.send(order["post"])
+        self.logger.info(f"[EXCHANGE] MARKET {side} {qty} {self.symbol} (prepared)")
+        return {"status": "ok", "side": side, "qty": qty, "symbol": self.symbol,
+                "order_id": res.get("orderId"), "avg_price": float(res.get("avgPrice") or 0.0)}
+
+    # ---- core/indicators 用のOHLCV ----
+    def fetch_ohlcv(self, timeframe: str, limit: int = 100) -> Bars:
         """
-        互換のため残置。インジ側が close/high/low/volume を読む前提のため、
-        ダミーで単調増加するクローズ配列を返す。
-        本番は v5/market/kline などに差し替え。
+        v5/market/kline の list（新しい順の [start, open, high, low, close, volume, turnover]）を
+        古い順の Bars に。ダミーでは単調増加するクローズ列を返す。
         """
+        if self.http is not None:
+            rows = self.http.get("/v5/market/kline", self._params(interval=_interval(timeframe), limit=limit)).get("list") or []
+            if not rows:
+                return Bars()
+            arr = np.asarray(rows, dtype=np.float64)[::-1, :6]
+            return Bars(*np.ascontiguousarray(arr.T))
         base = self._last_price or 0.1
-        out: List[Dict[str, Any]] = []
-        for i in range(limit):
-            close = base + i * 0.0005
-            out.append({
-                "close": close,
-                "high": close * 1.002,
-                "low": close * 0.998,
-                "volume": 10.0,
-            })
-        return out
+        close = base + np.arange(limit) * 0.0005
+        return Bars(high=close * 1.002, low=close * 0.998, close=close,
+                    volume=np.full(limit, 10.0))
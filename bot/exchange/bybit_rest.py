@@ -0,0 +1,213 @@
+# bot/exchange/bybit_rest.py
+from __future__ import annotations
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlencode
+
+import requests
+
+try:
+    import websocket  # websocket-client
+except Exception:
+    websocket = None
+
+
+class BybitAPIError(RuntimeError):
+    """Bybit v5 が retCode != 0 / HTTP エラーを返した"""
+
+    def __init__(self, message: str, ret_code: int = -1):
+        super().__init__(message)
+        self.ret_code = ret_code
+
+
+def _sign(secret: str, payload: str) -> str:
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+class PreparedPost:
+    """
+    prepare_post() の作り置き。本文（JSON）・URL・固定ヘッダ・プロキシ等の送信設定と、
+    署名の timestamp より後ろ（api_key + recv_window + body）のバイト列まで確定済み。
+    send() は timestamp と署名を刻んで送るだけ。
+    """
+    __slots__ = ("path", "raw", "request", "tail", "send_kwargs")
+
+    def __init__(self, path: str, raw: str, request, tail: bytes, send_kwargs: Dict[str, Any]):
+        self.path = path
+        self.raw = raw
+        self.request = request
+        self.tail = tail
+        self.send_kwargs = send_kwargs
+
+
+class BybitRestClient:
+    """
+    Bybit v5 REST の最小クライアント（requests.Session を使い回す）。
+      - get(path, params, auth) / post(path, body)  → result 部分の dict
+      - prepare_post(path, body) → PreparedPost / send(prepared): 発注の高速経路（本文・ヘッダは作り置き）
+      - 認証: X-BAPI-SIGN = HMAC_SHA256(secret, timestamp + api_key + recv_window + query|body)
+      - idle_sec: 最後のリクエストからの秒数（接続を温め直す判断用）
+    base_url を差し替えれば testnet・ローカルの fake サーバにもそのまま向けられる。
+    """
+
+    def __init__(self, base_url: str, api_key: str = "", api_secret: str = "",
+                 recv_window: int = 5000, timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.recv_window = str(int(recv_window))
+        self.timeout = float(timeout)
+        self.session = requests.Session()
+        # 鍵を流し込んだ HMAC の状態（send() は copy して timestamp 以降を足すだけ）
+        self._mac = hmac.new(api_secret.encode(), digestmod=hashlib.sha256)
+        self._last_used = 0.0
+
+    @property
+    def idle_sec(self) -> float:
+        return time.monotonic() - self._last_used
+
+    def _headers(self, payload: str) -> Dict[str, str]:
+        ts = str(int(time.time() * 1000))
+        return {
+            "X-BAPI-API-KEY": self.api_key,
+            "X-BAPI-TIMESTAMP": ts,
+            "X-BAPI-RECV-WINDOW": self.recv_window,
+            "X-BAPI-SIGN": _sign(self.api_secret, ts + self.api_key + self.recv_window + payload),
+        }
+
+    @staticmethod
+    def _result(resp) -> Dict[str, Any]:
+        try:
+            data = resp.json()
+        except ValueError:
+            raise BybitAPIError(f"HTTP {resp.status_code}: {resp.text[:200]}", resp.status_code) from None
+        if resp.status_code >= 400 or data.get("retCode", 0) != 0:
+            raise BybitAPIError(f"HTTP {resp.status_code} retCode={data.get('retCode')} {data.get('retMsg')}",
+                                int(data.get("retCode", resp.status_code)))
+        return data.get("result") or {}
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, auth: bool = False) -> Dict[str, Any]:
+        query = urlencode(params or {})
+        headers = self._headers(query) if auth else None
+        resp = self.session.get(f"{self.base_url}{path}", params=params, headers=headers, timeout=self.timeout)
+        self._last_used = time.monotonic()
+        return self._result(resp)
+
+    def post(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        raw = json.dumps(body, separators=(",", ":"))
+        headers = self._headers(raw)
+        headers["Content-Type"] = "application/json"
+        resp = self.session.post(f"{self.base_url}{path}", data=raw, headers=headers, timeout=self.timeout)
+        self._last_used = time.monotonic()
+        return self._result(resp)
+
+    def prepare_post(self, path: str, body: Dict[str, Any]) -> PreparedPost:
+        """post() の送信直前まで（本文・PreparedRequest・送信設定・署名の後半）を作っておく"""
+        raw = json.dumps(body, separators=(",", ":"))
+        url = f"{self.base_url}{path}"
+        request = self.session.prepare_request(requests.Request("POST", url, data=raw, headers={
+            "Content-Type": "application/json",
+            "X-BAPI-API-KEY": self.api_key,
+            "X-BAPI-RECV-WINDOW": self.recv_window,
+        }))
+        send_kwargs = self.session.merge_environment_settings(url, {}, None, None, None)
+        return PreparedPost(path, raw, request, (self.api_key + self.recv_window + raw).encode(), send_kwargs)
+
+    def send(self, prepared: PreparedPost) -> Dict[str, Any]:
+        """作り置きの POST に timestamp と署名だけ刻んで送る（何度でも送れる）"""
+        ts = str(int(time.time() * 1000))
+        mac = self._mac.copy()
+        mac.update(ts.encode())
+        mac.update(prepared.tail)
+        req = prepared.request.copy()
+        req.headers["X-BAPI-TIMESTAMP"] = ts
+        req.headers["X-BAPI-SIGN"] = mac.hexdigest()
+        resp = self.session.send(req, timeout=self.timeout, **prepared.send_kwargs)
+        self._last_used = time.monotonic()
+        return self._result(resp)
+
+
+class BybitPrivateStream:
+    """
+    Bybit v5 private WebSocket（position / execution 購読）。PositionTracker の stream として使う。
+      - recv(timeout) -> dict | None（topic 付きのメッセージのみ返す。op 応答・pong は読み捨て）
+      - 切断時は次の recv で再接続（認証・購読し直し）
+      - 20 秒ごとに ping
+    """
+    auth = True
+
+    def __init__(self, url: str, api_key: str = "", api_secret: str = "",
+                 topics: Iterable[str] = ("position", "execution"), logger=None):
+        if websocket is None:
+            raise RuntimeError("websocket-client is not installed")
+        self.url = url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.topics = list(topics)
+        self.logger = logger
+        self.closed = False
+        self._ws = None
+        self._last_ping = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        ws = websocket.create_connection(self.url, timeout=5)
+        if self.auth:
+            expires = int((time.time() + 10) * 1000)
+            ws.send(json.dumps({"op": "auth", "args": [
+                self.api_key, expires, _sign(self.api_secret, f"GET/realtime{expires}")]}))
+        ws.send(json.dumps({"op": "subscribe", "args": self.topics}))
+        self._ws = ws
+        self._last_ping = time.monotonic()
+
+    def recv(self, timeout: float = 0.5) -> Optional[dict]:
+        if self.closed:
+            return None
+        with self._lock:
+            if self._ws is None:
+                self._connect()
+            ws = self._ws
+        if time.monotonic() - self._last_ping >= 20.0:
+            ws.send(json.dumps({"op": "ping"}))
+            self._last_ping = time.monotonic()
+        ws.settimeout(timeout)
+        try:
+            raw = ws.recv()
+        except websocket.WebSocketTimeoutException:
+            return None
+        except Exception:
+            with self._lock:
+                self._ws = None
+            if self.closed:
+                return None
+            raise
+        try:
+            msg = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        return msg if isinstance(msg, dict) and msg.get("topic") else None
+
+    def close(self) -> None:
+        self.closed = True
+        with self._lock:
+            if self._ws is not None:
+                try:
+                    self._ws.close()
+                except Exception:
+                    pass
+                self._ws = None
+
+
+class BybitPublicStream(BybitPrivateStream):
+    """
+    Bybit v5 public WebSocket（tickers.{symbol} / publicTrade.{symbol}）。認証なし。
+    ExitEngine の価格フィードとして使う（再接続・ping は private と同じ）。
+    """
+    auth = False
+
+    def __init__(self, url: str, symbol: str, logger=None):
+        super().__init__(url, topics=(f"tickers.{symbol}", f"publicTrade.{symbol}"), logger=logger)
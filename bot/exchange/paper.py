@@ -0,0 +1,270 @@
+# bot/exchange/paper.py
+from __future__ import annotations
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from bot.exchange.types import OrderBook
+
+
+class _BookSide:
+    """
+    片側の板を価格/数量の配列で保持し、累積数量・累積約定代金を更新時に一度だけ計算する。
+    成行は searchsorted で O(log n) に約定価格を求め、消費量は used で板更新まで持ち越す。
+    """
+    __slots__ = ("px", "qty", "cum_qty", "cum_notional", "used")
+
+    def __init__(self):
+        self.px = np.empty(0, dtype=np.float64)
+        self.qty = np.empty(0, dtype=np.float64)
+        self.cum_qty = np.empty(0, dtype=np.float64)
+        self.cum_notional = np.empty(0, dtype=np.float64)
+        self.used = 0.0
+
+    def load(self, px: np.ndarray, qty: np.ndarray) -> None:
+        self.px = px
+        self.qty = qty
+        self.cum_qty = np.cumsum(qty)
+        self.cum_notional = np.cumsum(px * qty)
+        self.used = 0.0
+
+    @property
+    def depth(self) -> float:
+        return float(self.cum_qty[-1]) - self.used if len(self.cum_qty) else 0.0
+
+    @property
+    def best(self) -> float:
+        return float(self.px[0]) if len(self.px) else 0.0
+
+    def _notional_at(self, x: float) -> float:
+        """累積数量 x までを食った時の累積約定代金"""
+        if x <= 0:
+            return 0.0
+        # 全量を食った時の丸めで x が cum_qty[-1] をわずかに超えても最終レベルで評価
+        i = min(int(np.searchsorted(self.cum_qty, x, side="left")), len(self.px) - 1)
+        prev_q = float(self.cum_qty[i - 1]) if i > 0 else 0.0
+        prev_n = float(self.cum_notional[i - 1]) if i > 0 else 0.0
+        return prev_n + (x - prev_q) * float(self.px[i])
+
+    def take(self, qty: float) -> tuple[float, float, float]:
+        """
+        qty を板から消費する。
+        return: (約定数量, 平均約定価格, 最終約定レベル価格)
+        """
+        avail = self.depth
+        filled = min(qty, avail)
+        if filled <= 0:
+            return 0.0, 0.0, 0.0
+        start, end = self.used, min(self.used + filled, float(self.cum_qty[-1]))
+        notional = self._notional_at(end) - self._notional_at(start)
+        self.used = end
+        last_i = min(int(np.searchsorted(self.cum_qty, end, side="left")), len(self.px) - 1)
+        return filled, notional / filled, float(self.px[last_i])
+
+    def qty_at(self, price: float) -> float:
+        """指定価格レベルに並んでいる数量（キュー位置の初期値）"""
+        hit = np.nonzero(self.px == price)[0]
+        return float(self.qty[hit[0]]) if len(hit) else 0.0
+
+
+class PaperMatchingEngine:
+    """
+    DRY_RUN / バックテスト用のローカル約定シミュレータ。
+      - 成行: L2板のレベルを順に食って平均約定価格を算出（板厚不足なら部分約定）
+      - 指値: 発注時点の同値レベル数量を「前に並ぶ量」としてキュー位置を模擬
+      - レイテンシ: 発注から latency_ms 後に有効化（on_book/on_trade の時刻で判定）
+    板は exchange.get_orderbook() の OrderBook か旧 dict 形式を受け付ける:
+      {"bids": [[price, qty], ...], "asks": [[price, qty], ...]}
+      または {"best_bid": float, "best_ask": float}（数量不明の板。数量は default_level_qty とみなす）
+    約定結果は取引所レスポンス風の dict で返す。
+    """
+
+    def __init__(self, symbol: str = "DOGEUSDT", latency_ms: float = 0.0,
+                 default_level_qty: float = 1e9, logger=None):
+        self.symbol = symbol
+        self.latency = max(float(latency_ms), 0.0) / 1000.0
+        self.default_level_qty = float(default_level_qty)
+        self.logger = logger
+
+        self.bids = _BookSide()
+        self.asks = _BookSide()
+        self.now = 0.0
+
+        self._ids = itertools.count(1)
+        # 有効化待ち: (activate_ts, seq, order)
+        self._pending: List[tuple] = []
+        # 板に並んでいる指値: order_id -> order
+        self._resting: Dict[int, Dict[str, Any]] = {}
+        # 約定通知（バックテスト側で drain する）
+        self.fills: List[Dict[str, Any]] = []
+
+    # ---- 板の更新 ----
+    def on_book(self, ob: OrderBook | dict | None, ts: Optional[float] = None) -> None:
+        """板スナップショットを取り込み、有効化時刻に達した注文を処理する"""
+        book = OrderBook.coerce(ob) if ob else None
+        if book:
+            if book.depth_known:
+                self.bids.load(book.bids.px, book.bids.qty)
+                self.asks.load(book.asks.px, book.asks.qty)
+            elif book.best:
+                q = np.array([self.default_level_qty])
+                self.bids.load(book.bids.px[:1], q)
+                self.asks.load(book.asks.px[:1], q.copy())
+        self.advance(time.time() if ts is None else ts)
+
+    def on_trade(self, price: float, qty: float, aggressor: str, ts: Optional[float] = None) -> None:
+        """
+        約定テープ。aggressor 側と逆サイドに並ぶ指値のキューを進める。
+          aggressor="Sell" → 買い指値が対象、"Buy" → 売り指値が対象
+        """
+        self.advance(time.time() if ts is None else ts)
+        target = "Buy" if aggressor == "Sell" else "Sell"
+        for oid in list(self._resting):
+            o = self._resting[oid]
+            if o["side"] != target:
+                continue
+            through = price < o["price"] if target == "Buy" else price > o["price"]
+            if through:
+                self._fill_resting(o, o["remaining"])
+            elif price == o["price"]:
+                left = qty - o["queue_ahead"]
+                o["queue_ahead"] = max(o["queue_ahead"] - qty, 0.0)
+                if left > 0:
+                    self._fill_resting(o, min(left, o["remaining"]))
+
+    def advance(self, ts: float) -> None:
+        """時刻を進め、レイテンシ経過済みの注文を有効化し、板と交差した指値を約定させる"""
+        self.now = max(self.now, ts)
+        while self._pending and self._pending[0][0] <= self.now:
+            _, _, order = heapq.heappop(self._pending)
+            res = self._activate(order)
+            if res["filled_qty"] > 0:
+                self.fills.append(res)
+        if self._resting:
+            self._cross_resting()
+
+    # ---- 発注 ----
+    def submit_market(self, side: str, qty: float, ts: Optional[float] = None) -> Dict[str, Any]:
+        """
+        成行注文。latency=0 なら即時に現在の板で約定させ結果を返す。
+        latency>0 の場合は pending を返し、約定は以後の on_book/advance で fills に積まれる。
+        """
+        return self._submit({"type": "Market", "side": side, "qty": float(qty)}, ts)
+
+    def submit_limit(self, side: str, qty: float, price: float, ts: Optional[float] = None) -> Dict[str, Any]:
+        return self._submit({"type": "Limit", "side": side, "qty": float(qty), "price": float(price)}, ts)
+
+    def cancel(self, order_id: int) -> bool:
+        return self._resting.pop(order_id, None) is not None
+
+    def execute_market(self, side: str, qty: float, ob: OrderBook | dict | None = None) -> Dict[str, Any]:
+        """
+        DRY_RUN 用の同期API: 板を取り込んでから成行を即時約定させる。
+        ob は送信から latency_ms 経過した時点の板を渡す（OrderExecutor は待ってから取り直す）。
+        ts は送信時刻（now - latency）、activate_ts は約定させた時刻
+        """
+        now = time.time()
+        if ob is not None:
+            self.on_book(ob, ts=now)
+        order = self._new_order({"type": "Market", "side": side, "qty": float(qty)}, now - self.latency)
+        order["activate_ts"] = now
+        return self._match_market(order)
+
+    def _new_order(self, order: Dict[str, Any], ts: float) -> Dict[str, Any]:
+        order["order_id"] = next(self._ids)
+        order["ts"] = ts
+        order["remaining"] = order["qty"]
+        order["filled_qty"] = 0.0
+        order["notional"] = 0.0
+        return order
+
+    def _submit(self, order: Dict[str, Any], ts: Optional[float]) -> Dict[str, Any]:
+        now = self.now if ts is None else ts
+        order = self._new_order(order, now)
+        order["activate_ts"] = now + self.latency
+        if self.latency <= 0:
+            self.advance(now)
+            return self._activate(order)
+        heapq.heappush(self._pending, (order["activate_ts"], order["order_id"], order))
+        return self._report(order, "pending")
+
+    def _activate(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        if order["type"] == "Market":
+            return self._match_market(order)
+        book = self.bids if order["side"] == "Buy" else self.asks
+        opp = self.asks if order["side"] == "Buy" else self.bids
+        crosses = opp.best > 0 and (
+            opp.best <= order["price"] if order["side"] == "Buy" else opp.best >= order["price"]
+        )
+        if crosses:
+            # 即時に交差する指値は、指値価格までの範囲で成行として処理
+            return self._match_market(order, limit=order["price"])
+        order["queue_ahead"] = book.qty_at(order["price"])
+        self._resting[order["order_id"]] = order
+        return self._report(order, "new")
+
+    # ---- 約定処理 ----
+    def _match_market(self, order: Dict[str, Any], limit: Optional[float] = None) -> Dict[str, Any]:
+        book = self.asks if order["side"] == "Buy" else self.bids
+        want = order["remaining"]
+        if limit is not None and len(book.px):
+            # 指値価格より有利なレベルまでに制限
+            ok = book.px <= limit if order["side"] == "Buy" else book.px >= limit
+            cap = float(book.cum_qty[ok].max()) - book.used if ok.any() else 0.0
+            want = min(want, max(cap, 0.0))
+        filled, avg, _ = book.take(want)
+        order["filled_qty"] += filled
+        order["notional"] += filled * avg
+        order["remaining"] -= filled
+        if order["type"] == "Limit" and order["remaining"] > 0:
+            order["queue_ahead"] = 0.0
+            self._resting[order["order_id"]] = order
+            status = "partial" if filled > 0 else "new"
+        else:
+            status = "filled" if order["remaining"] <= 0 else ("partial" if filled > 0 else "rejected")
+        return self._report(order, status)
+
+    def _fill_resting(self, order: Dict[str, Any], qty: float) -> None:
+        qty = min(qty, order["remaining"])
+        if qty <= 0:
+            return
+        order["filled_qty"] += qty
+        order["notional"] += qty * order["price"]
+        order["remaining"] -= qty
+        status = "partial"
+        if order["remaining"] <= 0:
+            self._resting.pop(order["order_id"], None)
+            status = "filled"
+        self.fills.append(self._report(order, status))
+
+    def _cross_resting(self) -> None:
+        bb, ba = self.bids.best, self.asks.best
+        for oid in list(self._resting):
+            o = self._resting[oid]
+            # 反対側の最良気配が指値に届いた（同値を含む）ら全量約定
+            if o["side"] == "Buy" and ba > 0 and ba <= o["price"]:
+                self._fill_resting(o, o["remaining"])
+            elif o["side"] == "Sell" and bb > 0 and bb >= o["price"]:
+                self._fill_resting(o, o["remaining"])
+            else:
+                # 同値レベルの数量が減った分は前に並ぶ量も減ったとみなす（キャンセル分）
+                book = self.bids if o["side"] == "Buy" else self.asks
+                o["queue_ahead"] = min(o["queue_ahead"], book.qty_at(o["price"]))
+
+    def _report(self, order: Dict[str, Any], status: str) -> Dict[str, Any]:
+        filled = order["filled_qty"]
+        return {
+            "status": status,
+            "order_id": order["order_id"],
+            "symbol": self.symbol,
+            "type": order["type"],
+            "side": order["side"],
+            "qty": order["qty"],
+            "filled_qty": filled,
+            "avg_price": (order["notional"] / filled) if filled > 0 else 0.0,
+            "ts": order["ts"],
+            "activate_ts": order["activate_ts"],
+        }
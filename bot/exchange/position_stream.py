@@ -0,0 +1,207 @@
+# bot/exchange/position_stream.py
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from bot.exchange.types import Position
+
+
+def _f(v, default: float = 0.0) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+class LocalPrivateStream:
+    """
+    private WS のローカル代替（テスト・DRY_RUN 用）。
+    push() した Bybit v5 形式のメッセージを recv() で順に返す。
+      {"topic": "position",  "data": [{"symbol", "side", "size", "entryPrice"}]}
+      {"topic": "execution", "data": [{"symbol", "side", "execQty", "execPrice"}]}
+    """
+
+    def __init__(self):
+        self._q: "queue.Queue[dict]" = queue.Queue()
+        self.closed = False
+
+    def push(self, msg: dict) -> None:
+        self._q.put(msg)
+
+    def recv(self, timeout: float = 0.5) -> Optional[dict]:
+        try:
+            return self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class PositionTracker:
+    """
+    プッシュ型のポジション/約定トラッカー。
+      - stream（recv(timeout) を持つ private WS）から position / execution を受けてキャッシュ更新
+      - 戦略は get() でメモリ上のキャッシュ（Position のコピー）を読む（毎サイクルの REST は不要）
+      - reconcile_sec ごとに REST（exchange.get_current_position）で突き合わせ、
+        ずれていればアラートを出して REST 側に合わせる
+      - stream が無い場合は従来通り get() のたびに REST を叩く（ポーリングモード）
+    """
+
+    def __init__(self, exchange, stream=None, symbol: Optional[str] = None,
+                 reconcile_sec: float = 60.0, size_tol: float = 1e-9,
+                 logger=None, alert: Optional[Callable[[str], Any]] = None):
+        self.exchange = exchange
+        self.stream = stream
+        self.symbol = symbol or getattr(exchange, "symbol", "DOGEUSDT")
+        self.reconcile_sec = float(reconcile_sec)
+        self.size_tol = float(size_tol)
+        self.logger = logger
+        self.alert = alert
+
+        self._position = Position.flat()
+        self._lock = threading.Lock()
+        self._last_reconcile = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.events = 0
+        self.drifts = 0
+        # プッシュで状態を更新した通し番号（REST 応答待ちの間に届いたかの判定用）
+        self.seq = 0
+        self.last_event_ts = 0.0
+
+    # ---- ライフサイクル ----
+    @property
+    def streaming(self) -> bool:
+        return self.stream is not None
+
+    def start(self) -> "PositionTracker":
+        if self.stream is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="position-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.stream is not None and hasattr(self.stream, "close"):
+            self.stream.close()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                msg = self.stream.recv(timeout=0.5)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"[PositionTracker] stream error: {e!r}")
+                time.sleep(1.0)
+                continue
+            if msg:
+                self.on_message(msg)
+
+    # ---- 参照 ----
+    def get(self) -> Position:
+        """現在のポジション（コピー）。ポーリングモードでは REST を叩く"""
+        if self.stream is None:
+            return self._fetch_rest()
+        return self._position.copy()
+
+    # ---- プッシュイベント ----
+    def on_message(self, msg: dict) -> None:
+        topic = str(msg.get("topic", ""))
+        for d in msg.get("data") or []:
+            if d.get("symbol", self.symbol) != self.symbol:
+                continue
+            if topic.startswith("position"):
+                self._on_position(d)
+            elif topic.startswith("execution"):
+                self._on_execution(d)
+        self.events += 1
+        self.last_event_ts = time.time()
+
+    def _on_position(self, d: dict) -> None:
+        size = abs(_f(d.get("size")))
+        side = d.get("side") or None
+        if size > self.size_tol and side in ("Buy", "Sell"):
+            pos = Position(True, side, size, _f(d.get("entryPrice", d.get("avgPrice"))))
+        else:
+            pos = Position.flat()
+        with self._lock:
+            self.seq += 1
+            self._position = pos
+
+    def _on_execution(self, d: dict) -> None:
+        """position トピックより先に届く約定を暫定反映（後続の position で上書きされる）"""
+        qty = _f(d.get("execQty"))
+        price = _f(d.get("execPrice"))
+        side = d.get("side")
+        if qty <= 0 or side not in ("Buy", "Sell"):
+            return
+        with self._lock:
+            self.seq += 1
+            cur = self._position
+            signed = cur.size * (1 if cur.side == "Buy" else -1 if cur.side == "Sell" else 0)
+            delta = qty if side == "Buy" else -qty
+            new = signed + delta
+            if abs(new) <= self.size_tol:
+                self._position = Position.flat()
+                return
+            new_side = "Buy" if new > 0 else "Sell"
+            if signed == 0 or (signed > 0) != (new > 0):
+                entry = price  # 新規 or ドテン
+            elif abs(new) > abs(signed):
+                entry = (cur.entry_price * abs(signed) + price * qty) / abs(new)  # 積み増し
+            else:
+                entry = cur.entry_price  # 一部決済
+            self._position = Position(True, new_side, abs(new), entry)
+
+    # ---- REST 突き合わせ ----
+    def _fetch_rest(self) -> Position:
+        try:
+            pos = self.exchange.get_current_position()
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"[PositionTracker] REST position failed: {e!r}")
+            return self._position.copy()
+        # 古い録画などの dict もここで Position に正規化
+        return Position.coerce(pos)
+
+    def reconcile(self, force: bool = False, now: Optional[float] = None) -> bool:
+        """
+        REST と突き合わせる（stream 有りのときのみ意味を持つ）。
+        ずれを検出したら True を返し、REST 側の値を採用する。
+        REST の応答待ちの間にプッシュが届いたら、REST の値の方が古い可能性があるので採用せず次のサイクルでやり直す。
+        """
+        if self.stream is None:
+            return False
+        now = time.time() if now is None else now
+        if not force and now - self._last_reconcile < self.reconcile_sec:
+            return False
+        self._last_reconcile = now
+        with self._lock:
+            seq = self.seq
+        rest = self._fetch_rest()
+        with self._lock:
+            if self.seq != seq:
+                self._last_reconcile = 0.0
+                return False
+            cur = self._position.copy()
+            drift = (
+                rest.is_open != cur.is_open
+                or (rest.is_open and rest.side != cur.side)
+                or abs(rest.size - cur.size) > self.size_tol
+            )
+            self._position = rest
+        if drift and not force:
+            self.drifts += 1
+            msg = f"⚠ position drift: stream={cur} rest={rest}"
+            if self.logger:
+                self.logger.warning(f"[PositionTracker] {msg}")
+            if self.alert:
+                try:
+                    self.alert(msg)
+                except Exception:
+                    pass
+        return bool(drift)
@@ -0,0 +1,226 @@
+# bot/exchange/scheduler.py
+from __future__ import annotations
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional
+
+# 優先度クラス（小さいほど優先）
+PRIORITY_ORDER = 0      # 発注・取消
+PRIORITY_POSITION = 1   # ポジション照会
+PRIORITY_MARKET = 2     # 価格・板・ローソク足
+
+CLASS_NAMES = {PRIORITY_ORDER: "order", PRIORITY_POSITION: "position", PRIORITY_MARKET: "market"}
+
+
+class RequestShed(RuntimeError):
+    """レート予算が逼迫しているため低優先度リクエストを捨てた"""
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class RequestScheduler:
+    """
+    API キー1本分のレート予算（トークンバケット）を優先度付きで配分する。
+      - 発注 > ポジション > 市場データ。上位クラスが待っている間は下位クラスは取らない
+      - 下位クラスはバケットに予約分（reserve）を残した時だけ取れる → 市場データが連打されても
+        発注ぶんのトークンは常に残り、発注は待たない
+      - 市場データ・ポジションは同じ key の実行中リクエストに相乗り（coalesce。トークン消費なし）
+      - 市場データは待ち行列が max_queue を超えるか max_wait 秒待っても取れなければ捨てる（RequestShed）
+    実行は呼び出し元スレッドで行う（HTTP 実行中の他リクエストが発注をブロックしない）。
+    """
+
+    def __init__(self, rate_per_sec: float = 10.0, burst: float = 10.0, reserve: int = 2,
+                 market_max_wait: float = 2.0, market_max_queue: int = 8, logger=None):
+        self.rate = float(rate_per_sec)
+        self.burst = max(1.0, float(burst))
+        self.reserve = {
+            PRIORITY_ORDER: 0,
+            PRIORITY_POSITION: reserve // 2,
+            PRIORITY_MARKET: reserve,
+        }
+        self.market_max_wait = float(market_max_wait)
+        self.market_max_queue = int(market_max_queue)
+        self.logger = logger
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._waiting = {p: 0 for p in CLASS_NAMES}
+        self._inflight: Dict[Hashable, _Flight] = {}
+
+        # メトリクス
+        self.calls = {p: 0 for p in CLASS_NAMES}
+        self.shed = {p: 0 for p in CLASS_NAMES}
+        self.coalesced = {p: 0 for p in CLASS_NAMES}
+        self.wait_max = {p: 0.0 for p in CLASS_NAMES}
+        self._waits: Dict[int, Deque[float]] = {p: deque(maxlen=1024) for p in CLASS_NAMES}
+
+    # ---- トークン ----
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _acquire(self, prio: int, max_wait: Optional[float]) -> float:
+        """トークンを1つ取る。return: 待ち時間（秒）"""
+        t0 = time.monotonic()
+        deadline = t0 + max_wait if max_wait is not None else math.inf
+        need = 1.0 + self.reserve[prio]
+        with self._cond:
+            if prio == PRIORITY_MARKET and self._waiting[prio] >= self.market_max_queue:
+                self.shed[prio] += 1
+                raise RequestShed(f"{CLASS_NAMES[prio]} queue full ({self._waiting[prio]})")
+            self._waiting[prio] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    blocked = any(self._waiting[p] for p in CLASS_NAMES if p < prio)
+                    if not blocked and (self._tokens >= need or self.rate <= 0):
+                        if self.rate > 0:
+                            self._tokens -= 1.0
+                        return now - t0
+                    if now >= deadline:
+                        self.shed[prio] += 1
+                        raise RequestShed(f"{CLASS_NAMES[prio]} waited {now - t0:.3f}s")
+                    short = max(need - self._tokens, 0.0) / self.rate if self.rate > 0 else 0.05
+                    self._cond.wait(timeout=min(max(short, 0.001), deadline - now))
+            finally:
+                self._waiting[prio] -= 1
+                self._cond.notify_all()
+
+    def try_acquire(self, prio: int) -> bool:
+        """
+        待たずにトークンを1つ取る（取れたら呼び出し件数に数える）。予約分を残せない・同じか上位のクラスが
+        待っているなら False（捨てた数には数えない）。省いてもよいリクエスト（接続の温め等）用。
+        """
+        with self._cond:
+            self._refill(time.monotonic())
+            if any(self._waiting[p] for p in CLASS_NAMES if p <= prio):
+                return False
+            if self.rate > 0:
+                if self._tokens < 1.0 + self.reserve[prio]:
+                    return False
+                self._tokens -= 1.0
+        self._record(prio, 0.0)
+        return True
+
+    def _record(self, prio: int, waited: float) -> None:
+        self.calls[prio] += 1
+        self._waits[prio].append(waited)
+        if waited > self.wait_max[prio]:
+            self.wait_max[prio] = waited
+
+    # ---- 実行 ----
+    def call(self, prio: int, fn: Callable[..., Any], *args, key: Optional[Hashable] = None, **kwargs) -> Any:
+        """
+        fn(*args, **kwargs) を予算内で実行する。
+        key を渡すと同じ key の実行中リクエストがあればその結果を共有する（発注では使わない）。
+        """
+        if key is None or prio == PRIORITY_ORDER:
+            return self._run(prio, fn, args, kwargs)
+
+        with self._cond:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced[prio] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._run(prio, fn, args, kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def _run(self, prio: int, fn, args, kwargs):
+        max_wait = self.market_max_wait if prio == PRIORITY_MARKET else None
+        waited = self._acquire(prio, max_wait)
+        self._record(prio, waited)
+        return fn(*args, **kwargs)
+
+    # ---- メトリクス ----
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """クラス別の件数・捨てた数・相乗り数・待ち時間（ms: 平均 / p50 / p99 / 最大）"""
+        out: Dict[str, Dict[str, float]] = {}
+        for p, name in CLASS_NAMES.items():
+            waits = sorted(self._waits[p])
+            n = len(waits)
+            out[name] = {
+                "calls": self.calls[p],
+                "shed": self.shed[p],
+                "coalesced": self.coalesced[p],
+                "wait_ms_avg": (sum(waits) / n * 1e3) if n else 0.0,
+                "wait_ms_p50": waits[n // 2] * 1e3 if n else 0.0,
+                "wait_ms_p99": waits[min(n - 1, int(n * 0.99))] * 1e3 if n else 0.0,
+                "wait_ms_max": self.wait_max[p] * 1e3,
+            }
+        return out
+
+
+class ScheduledExchange:
+    """
+    取引所のラッパー。各メソッドを優先度クラスに振り分けて RequestScheduler 経由で呼ぶ。
+    それ以外の属性は元の取引所へ委譲する。
+    """
+
+    def __init__(self, exchange, scheduler: RequestScheduler):
+        self._ex = exchange
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        return getattr(self._ex, name)
+
+    def get_last_price(self):
+        return self.scheduler.call(PRIORITY_MARKET, self._ex.get_last_price, key="get_last_price")
+
+    def get_order_price(self):
+        """決済価格の取り直し用。市場データ枠（待ち・間引きあり）ではなく発注枠で取る"""
+        return self.scheduler.call(PRIORITY_ORDER, self._ex.get_last_price)
+
+    def get_orderbook(self):
+        return self.scheduler.call(PRIORITY_MARKET, self._ex.get_orderbook, key="get_orderbook")
+
+    def fetch_ohlcv(self, timeframe: str, limit: int = 100):
+        return self.scheduler.call(PRIORITY_MARKET, self._ex.fetch_ohlcv, timeframe, limit=limit,
+                                   key=("fetch_ohlcv", timeframe, limit))
+
+    def get_current_position(self):
+        return self.scheduler.call(PRIORITY_POSITION, self._ex.get_current_position, key="get_current_position")
+
+    def place_market_order(self, side: str, qty: float):
+        return self.scheduler.call(PRIORITY_ORDER, self._ex.place_market_order, side=side, qty=qty)
+
+    def prepare_market_order(self, side: str, qty: float, warm_sec: float = 10.0):
+        """作り置き自体は通信なし。接続の温め（tickers の GET）は市場データ枠で、予算に余裕がある時だけ"""
+        order = self._ex.prepare_market_order(side, qty, warm_sec=-1)
+        warm = getattr(self._ex, "warm_connection", None)
+        if warm is not None:
+            warm(warm_sec, acquire=lambda: self.scheduler.try_acquire(PRIORITY_MARKET))
+        return order
+
+    def send_prepared(self, order):
+        return self.scheduler.call(PRIORITY_ORDER, self._ex.send_prepared, order)
+
+    def cancel_order(self, *args, **kwargs):
+        return self.scheduler.call(PRIORITY_ORDER, self._ex.cancel_order, *args, **kwargs)
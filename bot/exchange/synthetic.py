@@ -0,0 +1,383 @@
+# bot/exchange/synthetic.py
+from __future__ import annotations
+import itertools
+import math
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot.exchange.types import Bars, BookSide, OrderBook, Position
+from bot.features.resampler import timeframe_ms
+
+_BAR_MS = 60_000
+_OU_CHUNK = 256
+
+
+class Regime:
+    """
+    相場レジーム1つ分のパラメータ（時間の単位は秒）。
+      rate    : 約定ティックの到着率（回/秒。間隔は指数分布）
+      vol     : GBM のボラティリティ（1/√秒。1e-4 = 1bp/√秒）
+      drift   : GBM のドリフト（1/秒）
+      dwell   : 平均滞在時間（秒。滞在ティック数は幾何分布）
+      spread  : 最良気配のスプレッド（ティック数）
+      qty     : 板厚・約定数量の倍率
+    """
+    __slots__ = ("name", "rate", "vol", "drift", "dwell", "spread", "qty")
+
+    def __init__(self, name: str, rate: float, vol: float, drift: float = 0.0, dwell: float = 3600.0,
+                 spread: int = 1, qty: float = 1.0):
+        self.name = name
+        self.rate = float(rate)
+        self.vol = float(vol)
+        self.drift = float(drift)
+        self.dwell = float(dwell)
+        self.spread = int(spread)
+        self.qty = float(qty)
+
+    def __repr__(self) -> str:
+        return f"Regime({self.name}, rate={self.rate:g}/s, vol={self.vol:g}, drift={self.drift:g})"
+
+
+DEFAULT_REGIMES: Tuple[Regime, ...] = (
+    Regime("calm", rate=2.0, vol=0.8e-4, dwell=3600.0, spread=1, qty=1.0),
+    Regime("trend_up", rate=6.0, vol=1.5e-4, drift=2e-6, dwell=1200.0, spread=1, qty=1.5),
+    Regime("trend_down", rate=6.0, vol=1.5e-4, drift=-2e-6, dwell=1200.0, spread=1, qty=1.5),
+    Regime("volatile", rate=20.0, vol=5e-4, dwell=300.0, spread=3, qty=3.0),
+)
+
+
+class TickBlock:
+    """
+    generate() が返すティック列（各列 NumPy 配列。1ティック = 約定1件とその直後の最良気配）。
+      t      : 時刻（エポック秒）
+      price  : 約定価格（買いなら ask、売りなら bid）
+      side   : アグレッサー（+1 = Buy / -1 = Sell、int8）
+      qty    : 約定数量
+      bid/ask: 最良気配
+      regime : レジーム番号（int8。SyntheticMarket.regimes の添字）
+      tilt   : 板厚の偏り（-imbalance..+imbalance。+ なら買い板が厚い）
+    """
+    __slots__ = ("t", "price", "side", "qty", "bid", "ask", "regime", "tilt")
+
+    def __init__(self, t, price, side, qty, bid, ask, regime, tilt):
+        self.t = t
+        self.price = price
+        self.side = side
+        self.qty = qty
+        self.bid = bid
+        self.ask = ask
+        self.regime = regime
+        self.tilt = tilt
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, c).nbytes for c in self.__slots__)
+
+
+class SyntheticMarket:
+    """
+    NumPy で一括生成する合成マーケット（シード固定で決定的）。1回の generate(n) で n ティックを作る。
+      価格 : レジームスイッチング GBM。レジームはマルコフ連鎖（滞在は幾何分布、遷移先は transitions の行）
+             対数収益 = (drift - vol²/2)·dt + vol·√dt·z、dt は到着率 rate の指数分布
+      テープ: アグレッサーは価格の動いた向き（z）と板の偏りに寄せて抽選、数量は対数正規
+      板   : 偏り tilt は OU 過程（半減期 imbalance_halflife 秒）を tanh で ±imbalance に収めたもの。
+             L2 は books()/book() で必要な時点だけ作る（levels 本、深いほど厚く、買い/売りを 1±tilt 倍）
+    価格経路と板の数量ノイズは別の乱数列なので、板を何回作っても価格経路は変わらない。
+    同じ seed・同じ n の並びで generate すれば同じ列になる（n の区切り方を変えると乱数の消費順が変わる）。
+    """
+
+    def __init__(self, seed: int = 0, price: float = 0.1, tick: float = 1e-5, levels: int = 50,
+                 base_qty: float = 5000.0, trade_qty: float = 500.0, imbalance: float = 0.5,
+                 imbalance_halflife: float = 60.0, depth_slope: float = 0.05,
+                 regimes: Sequence[Regime] = DEFAULT_REGIMES, transitions=None, start_ts: float = 1.7e9):
+        if not regimes:
+            raise ValueError("regimes must not be empty")
+        path_ss, book_ss = np.random.SeedSequence(seed).spawn(2)
+        self.rng = np.random.default_rng(path_ss)
+        self.book_rng = np.random.default_rng(book_ss)
+        self.tick = float(tick)
+        self.levels = int(levels)
+        self.base_qty = float(base_qty)
+        self.trade_qty = float(trade_qty)
+        self.imbalance = float(imbalance)
+        self.tau = imbalance_halflife / math.log(2.0)
+        self.profile = 1.0 + depth_slope * np.arange(self.levels)
+
+        self.regimes = tuple(regimes)
+        k = len(self.regimes)
+        self._rate = np.array([r.rate for r in self.regimes])
+        self._vol = np.array([r.vol for r in self.regimes])
+        self._drift = np.array([r.drift for r in self.regimes])
+        self._spread = np.array([r.spread for r in self.regimes], dtype=np.float64)
+        self._qty = np.array([r.qty for r in self.regimes])
+        if transitions is None:
+            p = np.ones((k, k)) - np.eye(k) if k > 1 else np.ones((1, 1))
+        else:
+            p = np.array(transitions, dtype=np.float64)
+            if p.shape != (k, k) or (p < 0).any():
+                raise ValueError(f"transitions must be a non-negative {k}x{k} matrix")
+        self._trans = p / p.sum(axis=1, keepdims=True)
+
+        # 生成をまたいで持ち越す状態
+        self.t = float(start_ts)
+        self._ou_t = self.t
+        self.logp = math.log(price)
+        self.x = 0.0                # 板の偏りの OU 状態（定常分散 1）
+        self.regime = 0
+        self._left = self._dwell(0)
+        self.count = 0
+
+    def _dwell(self, r: int) -> int:
+        """レジーム r の滞在ティック数（平均 dwell 秒 × rate）"""
+        return int(self.rng.geometric(min(1.0, 1.0 / max(self.regimes[r].dwell * self._rate[r], 1.0))))
+
+    def _regime_path(self, n: int) -> np.ndarray:
+        out = np.empty(n, dtype=np.int8)
+        i = 0
+        while i < n:
+            k = min(self._left, n - i)
+            out[i:i + k] = self.regime
+            i += k
+            self._left -= k
+            if self._left == 0:
+                self.regime = int(self.rng.choice(len(self.regimes), p=self._trans[self.regime]))
+                self._left = self._dwell(self.regime)
+        return out
+
+    def _ou(self, eps: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """
+        時刻 t の不等間隔 OU: x_k = e^{-Δt/τ}·x_{k-1} + eps_k。
+        _OU_CHUNK ティックごとに指数の重みで cumsum し（ブロック内は e^{Δt/τ} が溢れない長さ）、
+        ブロック間の持ち越しだけ Python で回す。
+        """
+        n = len(eps)
+        m = -(-n // _OU_CHUNK)
+        pad = m * _OU_CHUNK - n
+        tt = np.concatenate([t, np.full(pad, t[-1])]).reshape(m, _OU_CHUNK)
+        ee = np.concatenate([eps, np.zeros(pad)]).reshape(m, _OU_CHUNK)
+        rel = (tt - tt[:, :1]) / self.tau
+        x = np.cumsum(ee * np.exp(rel), axis=1) * np.exp(-rel)
+        # ブロック先頭に入ってくる状態（直前の値を時刻差で減衰させて足す）
+        prev_t = np.concatenate([[self._ou_t], tt[:-1, -1]])
+        carry = np.empty(m)
+        x0 = self.x
+        for c in range(m):
+            carry[c] = x0 * math.exp(-(tt[c, 0] - prev_t[c]) / self.tau)
+            x0 = x[c, -1] + carry[c] * math.exp(-rel[c, -1])
+        x += carry[:, None] * np.exp(-rel)
+        self.x = float(x0)
+        return x.reshape(-1)[:n]
+
+    def generate(self, n: int) -> TickBlock:
+        """次の n ティック（前回の続き）"""
+        rng = self.rng
+        reg = self._regime_path(n)
+        dt = rng.standard_exponential(n) / self._rate[reg]
+        t = self.t + np.cumsum(dt)
+
+        # 価格（対数収益の cumsum）
+        z = rng.standard_normal(n)
+        vol = self._vol[reg]
+        ret = (self._drift[reg] - 0.5 * vol * vol) * dt + vol * np.sqrt(dt) * z
+        logp = self.logp + np.cumsum(ret)
+        mid = np.exp(logp) / self.tick
+
+        # 板の偏り（定常分散 1 の OU → ±imbalance）
+        eps = np.sqrt(-np.expm1(-2.0 * dt / self.tau)) * rng.standard_normal(n)
+        tilt = self.imbalance * np.tanh(self._ou(eps, t))
+
+        # 最良気配（ティック単位。スプレッドはレジーム依存 + ときどき1ティック広がる）
+        spread = self._spread[reg] + (rng.random(n) < 0.1)
+        bid_t = np.maximum(np.round(mid - spread / 2.0), 1.0)
+        bid = bid_t * self.tick
+        ask = (bid_t + spread) * self.tick
+
+        # テープ（動いた向きと板の厚い側に寄せたアグレッサー、数量は対数正規）
+        p_buy = 1.0 / (1.0 + np.exp(-(1.5 * z + 2.0 * tilt)))
+        side = np.where(rng.random(n) < p_buy, 1, -1).astype(np.int8)
+        qty = self.trade_qty * self._qty[reg] * rng.lognormal(0.0, 1.0, n)
+        price = np.where(side > 0, ask, bid)
+
+        self.t = float(t[-1])
+        self._ou_t = self.t
+        self.logp = float(logp[-1])
+        self.count += n
+        return TickBlock(t, price, side, qty, bid, ask, reg, tilt)
+
+    # ---- 板 ----
+    def books(self, block: TickBlock, idx) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """block の idx 番目のティック時点の L2 板をまとめて: (bid_px, bid_qty, ask_px, ask_qty) 各 (len(idx), levels)"""
+        idx = np.atleast_1d(np.asarray(idx))
+        k = np.arange(self.levels) * self.tick
+        bid_px = block.bid[idx, None] - k
+        ask_px = block.ask[idx, None] + k
+        depth = (self.base_qty * self._qty[block.regime[idx]])[:, None] * self.profile
+        tilt = block.tilt[idx, None]
+        noise = self.book_rng.lognormal(0.0, 0.4, (2, len(idx), self.levels))
+        return bid_px, depth * (1.0 + tilt) * noise[0], ask_px, depth * (1.0 - tilt) * noise[1]
+
+    def book(self, block: TickBlock, i: int, ts: float = 0.0) -> OrderBook:
+        bid_px, bid_qty, ask_px, ask_qty = self.books(block, [i])
+        return OrderBook(BookSide(bid_px[0], bid_qty[0]), BookSide(ask_px[0], ask_qty[0]), ts=ts)
+
+
+class SyntheticExchange:
+    """
+    SyntheticMarket を取引所として使うバックエンド（EXCHANGE_BACKEND=synthetic。ネットワークなし・決定的）。
+    インターフェイスは BybitExchange と同じ。長時間（シミュレーション上の数週間）の負荷・メモリ試験用。
+      - fetch_ohlcv() の呼び出し（= BotRunner の1サイクルの頭）ごとに cycle_sec 秒だけ相場を進める
+      - clock() はシミュレーション時刻（特徴量の秒窓・上位足はこの時刻で動く）
+      - 1分足は消化したティックから集計し、直近 bar_history 本だけ持つ（ティックは block_size 件ずつ作って捨てる）
+      - place_market_order は現在の板を食って約定し、ポジションを更新する
+    """
+
+    def __init__(self, symbol: str = "DOGEUSDT", market: Optional[SyntheticMarket] = None,
+                 cycle_sec: float = 15.0, block_size: int = 1 << 16, bar_history: int = 1000,
+                 warmup_bars: int = 200, logger=None):
+        self.symbol = symbol
+        self.market = market if market is not None else SyntheticMarket()
+        self.cycle_sec = float(cycle_sec)
+        self.block_size = int(block_size)
+        self.bar_history = int(bar_history)
+        self.logger = logger
+
+        self._bars = np.empty((0, 6))
+        self.now = self.market.t
+        self._block = self.market.generate(self.block_size)
+        self._i = 0
+        self._cur = (self._block, 0)
+        self.ticks = 0
+        self._book_key = None
+        self._book: Optional[OrderBook] = None
+        self.pos_size = 0.0     # 符号付き（+ = Buy）
+        self.pos_entry = 0.0
+        self._order_ids = itertools.count(1)
+        self.advance(warmup_bars * _BAR_MS / 1000.0)
+
+    @classmethod
+    def from_config(cls, config, logger=None) -> "SyntheticExchange":
+        market = SyntheticMarket(seed=config.SYNTH_SEED, price=config.SYNTH_START_PRICE,
+                                 levels=config.SYNTH_BOOK_LEVELS, imbalance=config.SYNTH_IMBALANCE)
+        return cls(config.SYMBOL, market, cycle_sec=config.SYNTH_CYCLE_SEC,
+                   bar_history=config.BAR_HISTORY, logger=logger)
+
+    # ---- シミュレーション時刻 ----
+    def clock(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> int:
+        """相場を seconds 秒進める。消化したティック数を返す"""
+        target = self.now + seconds
+        done = 0
+        while True:
+            blk, i = self._block, self._i
+            j = i + int(np.searchsorted(blk.t[i:], target, side="right"))
+            if j > i:
+                self._fold(blk.t[i:j], blk.price[i:j], blk.qty[i:j])
+                self._cur = (blk, j - 1)
+                done += j - i
+            self._i = j
+            if j < len(blk):
+                break
+            self._block, self._i = self.market.generate(self.block_size), 0
+        self.now = target
+        self.ticks += done
+        return done
+
+    def _fold(self, t: np.ndarray, price: np.ndarray, qty: np.ndarray) -> None:
+        """ティックを1分足へ（分の境目で reduceat。最後の足が同じ分なら続きとして更新）"""
+        start = np.floor(t * 1000.0 / _BAR_MS) * _BAR_MS
+        cut = np.flatnonzero(np.diff(start)) + 1
+        s = np.concatenate([[0], cut])
+        e = np.concatenate([cut, [len(t)]])
+        rows = np.column_stack([
+            start[s], price[s], np.maximum.reduceat(price, s), np.minimum.reduceat(price, s),
+            price[e - 1], np.add.reduceat(qty, s),
+        ])
+        bars = self._bars
+        if len(bars) and bars[-1, 0] == rows[0, 0]:
+            last = bars[-1]
+            last[2] = max(last[2], rows[0, 2])
+            last[3] = min(last[3], rows[0, 3])
+            last[4] = rows[0, 4]
+            last[5] += rows[0, 5]
+            rows = rows[1:]
+        if len(rows):
+            self._bars = np.concatenate([bars, rows])[-self.bar_history:]
+
+    # ---- 市場データ ----
+    def get_last_price(self) -> float:
+        blk, i = self._cur
+        return float(blk.price[i])
+
+    def get_orderbook(self) -> OrderBook:
+        """現在のティック時点の L2 板（同じティックの間は同じ板）"""
+        key = (self.ticks, self.now)
+        if key != self._book_key:
+            blk, i = self._cur
+            self._book = self.market.book(blk, i, ts=self.now)
+            self._book_key = key
+        return self._book
+
+    def fetch_ohlcv(self, timeframe: str = "1m", limit: int = 100) -> Bars:
+        """cycle_sec 秒進めてから直近 limit 本の1分足（1m 以外は1分足をまとめる）"""
+        self.advance(self.cycle_sec)
+        rows = self._bars
+        k = max(1, timeframe_ms(timeframe) // _BAR_MS)
+        if k > 1 and len(rows):
+            grp = np.floor(rows[:, 0] / (k * _BAR_MS))
+            s = np.concatenate([[0], np.flatnonzero(np.diff(grp)) + 1])
+            e = np.concatenate([s[1:], [len(rows)]])
+            rows = np.column_stack([
+                grp[s] * k * _BAR_MS, rows[s, 1], np.maximum.reduceat(rows[:, 2], s),
+                np.minimum.reduceat(rows[:, 3], s), rows[e - 1, 4], np.add.reduceat(rows[:, 5], s),
+            ])
+        rows = rows[-limit:] if limit > 0 else rows
+        return Bars(*(rows[:, c].copy() for c in range(6)))
+
+    # ---- 取引 ----
+    def get_current_position(self) -> Position:
+        if abs(self.pos_size) < 1e-12:
+            return Position.flat()
+        return Position(True, "Buy" if self.pos_size > 0 else "Sell", abs(self.pos_size), self.pos_entry)
+
+    def place_market_order(self, side: str, qty: float) -> Dict[str, Any]:
+        """現在の板を食って平均約定価格を出し、ポジションを更新する"""
+        book = self.get_orderbook()
+        levels = book.asks if side == "Buy" else book.bids
+        px, q = levels.px, levels.qty
+        cum = np.cumsum(q)
+        take = np.minimum(q, np.maximum(qty - (cum - q), 0.0))
+        filled = float(take.sum())
+        avg = float(px @ take / filled) if filled > 0 else float(px[0])
+        if len(self._bars):
+            self._bars[-1, 5] += qty
+
+        signed = qty if side == "Buy" else -qty
+        new = self.pos_size + signed
+        if abs(new) < 1e-12:
+            self.pos_size, self.pos_entry = 0.0, 0.0
+        elif self.pos_size == 0 or (self.pos_size > 0) != (new > 0):
+            self.pos_size, self.pos_entry = new, avg
+        elif abs(new) > abs(self.pos_size):
+            self.pos_entry = (self.pos_entry * abs(self.pos_size) + avg * qty) / abs(new)
+            self.pos_size = new
+        else:
+            self.pos_size = new
+        return {"status": "ok", "side": side, "qty": qty, "symbol": self.symbol,
+                "order_id": f"syn-{next(self._order_ids)}", "avg_price": avg}
+
+    # ---- ストリーム（無し: ポジションは REST 相当の照会、TP/SL はサイクルごとの価格で評価） ----
+    def open_private_stream(self):
+        return None
+
+    def open_public_stream(self):
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sim_time": self.now, "ticks": self.ticks, "generated": self.market.count,
+                "bars": len(self._bars), "block_bytes": self._block.nbytes}
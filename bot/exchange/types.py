@@ -0,0 +1,283 @@
+# bot/exchange/types.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+# ---------------------------------------------------------------------------
+# ローソク足（列指向）
+# ---------------------------------------------------------------------------
+class Bars:
+    """
+    OHLCV の struct-of-arrays（各列 float64 の NumPy 配列。start はエポック ms）。
+      - bars.close などで列をそのまま参照（コピーなし）
+      - 旧コード互換: len() / bars[i] -> dict / for bar in bars（dict を都度生成）
+      - bars[a:b] は Bars（ビュー）
+    """
+    __slots__ = ("start", "open", "high", "low", "close", "volume")
+    COLUMNS: Tuple[str, ...] = ("start", "open", "high", "low", "close", "volume")
+
+    def __init__(self, start=None, open=None, high=None, low=None, close=None, volume=None):
+        self.close = _EMPTY if close is None else np.asarray(close, dtype=np.float64)
+        n = len(self.close)
+        # open/high/low が無い足（旧ダミー等）は close で代用、start/volume は 0
+        self.open = self.close if open is None else np.asarray(open, dtype=np.float64)
+        self.high = self.close if high is None else np.asarray(high, dtype=np.float64)
+        self.low = self.close if low is None else np.asarray(low, dtype=np.float64)
+        self.start = np.zeros(n) if start is None else np.asarray(start, dtype=np.float64)
+        self.volume = np.zeros(n) if volume is None else np.asarray(volume, dtype=np.float64)
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict[str, Any]]) -> "Bars":
+        """exchange の旧形式（1本1 dict）から。欠けた列は close / 0 で埋める"""
+        rows = [r for r in rows if "close" in r]
+        if not rows:
+            return cls()
+        n = len(rows)
+
+        def _col(key):
+            if key not in rows[0]:
+                return None
+            return np.fromiter((r.get(key, 0.0) for r in rows), dtype=np.float64, count=n)
+        return cls(start=_col("start"), open=_col("open"), high=_col("high"), low=_col("low"),
+                   close=_col("close"), volume=_col("volume"))
+
+    @classmethod
+    def coerce(cls, data) -> "Bars":
+        """Bars ならそのまま、list[dict]（旧形式・古い録画）なら変換"""
+        if isinstance(data, Bars):
+            return data
+        return cls.from_dicts(data or [])
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return Bars(*(getattr(self, c)[i] for c in self.COLUMNS))
+        return {c: float(getattr(self, c)[i]) for c in self.COLUMNS}
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def tail(self, n: int) -> "Bars":
+        return self[-n:] if n > 0 else self[0:0]
+
+    def __repr__(self) -> str:
+        last = f", last_close={self.close[-1]}" if len(self) else ""
+        return f"Bars(n={len(self)}{last})"
+
+
+# ---------------------------------------------------------------------------
+# 板
+# ---------------------------------------------------------------------------
+class Level:
+    """板の1レベル。旧形式互換で level[0] / level[1] でも読める"""
+    __slots__ = ("price", "qty")
+
+    def __init__(self, price: float, qty: float):
+        self.price = price
+        self.qty = qty
+
+    def __getitem__(self, i: int) -> float:
+        return (self.price, self.qty)[i]
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        return f"Level({self.price}, {self.qty})"
+
+
+class BookSide:
+    """
+    板の片側（価格・数量の float64 配列。best が先頭）。
+    旧形式 [[price, qty], ...] の文字列配列からは from_levels で一括変換。
+    """
+    __slots__ = ("px", "qty")
+
+    def __init__(self, px=_EMPTY, qty=_EMPTY):
+        self.px = np.asarray(px, dtype=np.float64)
+        self.qty = np.asarray(qty, dtype=np.float64)
+
+    @classmethod
+    def from_levels(cls, levels: Optional[Sequence], max_levels: Optional[int] = None) -> "BookSide":
+        if isinstance(levels, BookSide):
+            return levels[:max_levels] if max_levels else levels
+        if not levels:
+            return cls()
+        head = levels[:max_levels] if max_levels else levels
+        try:
+            arr = np.asarray(head, dtype=np.float64)
+            if arr.ndim != 2 or arr.shape[1] < 2:
+                raise ValueError
+        except (TypeError, ValueError):
+            rows = []
+            for x in head:
+                try:
+                    rows.append((float(x[0]), float(x[1])))
+                except Exception:
+                    continue
+            if not rows:
+                return cls()
+            arr = np.asarray(rows, dtype=np.float64)
+        return cls(arr[:, 0], arr[:, 1])
+
+    def __len__(self) -> int:
+        return len(self.px)
+
+    def __bool__(self) -> bool:
+        return len(self.px) > 0
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return BookSide(self.px[i], self.qty[i])
+        return Level(float(self.px[i]), float(self.qty[i]))
+
+    def __iter__(self) -> Iterator[Level]:
+        for p, q in zip(self.px.tolist(), self.qty.tolist()):
+            yield Level(p, q)
+
+    @property
+    def best(self) -> Optional[float]:
+        return float(self.px[0]) if len(self.px) else None
+
+
+class OrderBook:
+    """
+    L2 板（bids / asks の BookSide）。
+      depth_known=False は best bid/ask しか分からない板（数量は 0 で保持）。
+      旧形式互換で ob.get("bids") / ob.get("best_bid") / ob["asks"] も使える。
+    """
+    __slots__ = ("bids", "asks", "ts", "depth_known")
+
+    def __init__(self, bids: Optional[BookSide] = None, asks: Optional[BookSide] = None,
+                 ts: float = 0.0, depth_known: bool = True):
+        self.bids = bids if bids is not None else BookSide()
+        self.asks = asks if asks is not None else BookSide()
+        self.ts = ts
+        self.depth_known = depth_known
+
+    @classmethod
+    def from_best(cls, best_bid: float, best_ask: float, ts: float = 0.0) -> "OrderBook":
+        z = np.zeros(1)
+        return cls(BookSide(np.array([best_bid]), z), BookSide(np.array([best_ask]), z.copy()),
+                   ts=ts, depth_known=False)
+
+    @classmethod
+    def coerce(cls, ob, max_levels: Optional[int] = None) -> "OrderBook":
+        """OrderBook ならそのまま、旧形式 dict（bids/asks または best_bid/best_ask）なら変換"""
+        if isinstance(ob, OrderBook):
+            return ob
+        ob = ob or {}
+        if ob.get("bids") is not None or ob.get("asks") is not None:
+            return cls(BookSide.from_levels(ob.get("bids"), max_levels),
+                       BookSide.from_levels(ob.get("asks"), max_levels))
+        try:
+            bb = float(ob.get("best_bid") or 0)
+            ba = float(ob.get("best_ask") or 0)
+        except (TypeError, ValueError):
+            bb = ba = 0.0
+        if bb > 0 and ba > 0:
+            return cls.from_best(bb, ba)
+        return cls()
+
+    @property
+    def best(self) -> Optional[Tuple[float, float]]:
+        if not (self.bids and self.asks):
+            return None
+        return float(self.bids.px[0]), float(self.asks.px[0])
+
+    # ---- 旧 dict 形式互換 ----
+    def get(self, key: str, default=None):
+        if key == "bids":
+            return self.bids
+        if key == "asks":
+            return self.asks
+        if key == "best_bid":
+            return self.bids.best if self.bids else default
+        if key == "best_ask":
+            return self.asks.best if self.asks else default
+        return default
+
+    def __getitem__(self, key: str):
+        v = self.get(key)
+        if v is None:
+            raise KeyError(key)
+        return v
+
+    def __bool__(self) -> bool:
+        return bool(self.bids) or bool(self.asks)
+
+    def __repr__(self) -> str:
+        return f"OrderBook(best={self.best}, levels={len(self.bids)}/{len(self.asks)})"
+
+
+# ---------------------------------------------------------------------------
+# ポジション
+# ---------------------------------------------------------------------------
+class Position:
+    """
+    単一シンボルのポジション。旧形式互換で pos.get("is_open") / pos["side"] / dict(pos) も使える。
+    """
+    __slots__ = ("is_open", "side", "size", "entry_price")
+    KEYS: Tuple[str, ...] = ("is_open", "side", "size", "entry_price")
+
+    def __init__(self, is_open: bool = False, side: Optional[str] = None,
+                 size: float = 0.0, entry_price: float = 0.0):
+        self.is_open = is_open
+        self.side = side
+        self.size = size
+        self.entry_price = entry_price
+
+    @classmethod
+    def flat(cls) -> "Position":
+        return cls()
+
+    @classmethod
+    def coerce(cls, pos) -> "Position":
+        """Position / dict（取引所・古い録画）/ None を正規化（コピーを返す）"""
+        if isinstance(pos, Position):
+            return pos.copy()
+        if not pos:
+            return cls()
+        try:
+            size = abs(float(pos.get("size") or 0.0))
+            entry = float(pos.get("entry_price") or 0.0)
+        except (TypeError, ValueError):
+            size, entry = 0.0, 0.0
+        side = pos.get("side") or None
+        if not pos.get("is_open") or side not in ("Buy", "Sell"):
+            return cls()
+        return cls(True, side, size, entry)
+
+    def copy(self) -> "Position":
+        return Position(self.is_open, self.side, self.size, self.entry_price)
+
+    # ---- 旧 dict 形式互換 ----
+    def keys(self) -> Tuple[str, ...]:
+        return self.KEYS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.KEYS else default
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.KEYS}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Position, dict)):
+            return all(self.get(k) == other.get(k) for k in self.KEYS)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return (f"Position(is_open={self.is_open}, side={self.side}, "
+                f"size={self.size}, entry_price={self.entry_price})")
@@ -0,0 +1,58 @@
+# bot/features/change.py
+from __future__ import annotations
+from typing import Dict, Tuple
+
+from bot.exchange.types import Bars, BookSide
+
+
+class StageStats:
+    """
+    変更検知の集計。ステージ名 → 計算した回数 / 入力が前回と同じで結果を使い回した回数。
+      bars : 足 → テクニカル指標（IndicatorBank の同期と全期間のクエリ）
+      book : 板 → 板特徴量（累積数量と depth_imb / microprice / 傾き）
+      ticks: 価格ティック → 上げ下げ比率（窓が時間で動くモメンタム・ボラ・傾きは毎回計算）
+      rules: 特徴量 → 戦略の条件評価（Strategy01 の規則）
+    プロセス内で共有（マルチプロセス構成ではプロセスごと）。
+    """
+    __slots__ = ("computed", "reused")
+
+    def __init__(self):
+        self.computed: Dict[str, int] = {}
+        self.reused: Dict[str, int] = {}
+
+    def miss(self, stage: str) -> None:
+        self.computed[stage] = self.computed.get(stage, 0) + 1
+
+    def hit(self, stage: str) -> None:
+        self.reused[stage] = self.reused.get(stage, 0) + 1
+
+    def reset(self) -> None:
+        self.computed.clear()
+        self.reused.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for stage in sorted(set(self.computed) | set(self.reused)):
+            c, r = self.computed.get(stage, 0), self.reused.get(stage, 0)
+            out[stage] = {"computed": c, "reused": r, "reused_pct": r / (c + r) * 100.0 if c + r else 0.0}
+        return out
+
+
+stage_stats = StageStats()
+
+
+def bars_key(bars: Bars) -> Tuple:
+    """
+    足の変更検知キー: 本数・先頭の開始時刻・最新足の OHLCV。
+    （IndicatorBank.sync と同じく、確定済みの足は書き換わらない前提）
+    """
+    n = len(bars)
+    if not n:
+        return (0,)
+    return (n, float(bars.start[0]), float(bars.start[-1]), float(bars.open[-1]), float(bars.high[-1]),
+            float(bars.low[-1]), float(bars.close[-1]), float(bars.volume[-1]))
+
+
+def side_key(side: BookSide) -> bytes:
+    """板の片側（上位レベルの価格 + 数量）の内容そのもの。比較は memcmp で、ハッシュ衝突もない"""
+    return side.px.tobytes() + side.qty.tobytes()
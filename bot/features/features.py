@@ -1,103 +1,177 @@
 # bot/features/features.py
 import time
 import numpy as np
-from collections import deque
 from typing import Any, Dict
 from datetime import datetime
 
-# --- 内部状態を保持するシンプルなクラス ---
+from bot.features.change import stage_stats
+from bot.features.orderbook import OrderBookArrays
+from bot.utils.trace import new_trace_id
+
+# --- 内部状態: 価格ティックの時系列（窓は件数ではなく秒で切る） ---
 class FeatureState:
-    def __init__(self, maxlen: int = 500):
-        self.prices = deque(maxlen=maxlen)
-        self.times = deque(maxlen=maxlen)
+    """
+    価格ティックの (時刻, 価格) を NumPy のバッファに追記する時系列。
+      - times / prices: 保持中の区間のビュー（古い順。コピーなし）
+      - 窓の始まりは times の二分探索（O(log n)）。ポーリング間隔が 15 秒でも 50ms でも同じ秒数の窓になる
+      - horizon_sec より古いサンプルと maxlen を超えた分は追記時に捨てる（バッファ末尾に来たら前へ詰める）
+      - count: これまでに追記した通し数（clear でも戻さない）。保持中の先頭の通し番号は count - len
+    窓の秒数は configure() で設定（load_indicators_from_env から呼ぶ）。
+    """
+
+    def __init__(self, maxlen: int = 20000):
+        self._resize(maxlen)
+        self.configure(tick_sec=300.0, vol_short_sec=300.0, vol_long_sec=900.0, trend_sec=450.0, maxlen=maxlen)
+
+    def _resize(self, maxlen: int) -> None:
+        self.maxlen = max(2, int(maxlen))
+        self._t = np.empty(self.maxlen * 2, dtype=np.float64)
+        self._p = np.empty(self.maxlen * 2, dtype=np.float64)
+        self._lo = self._hi = 0
+        self.count = getattr(self, "count", 0)
+
+    def configure(self, tick_sec: float, vol_short_sec: float, vol_long_sec: float, trend_sec: float,
+                  maxlen: int) -> None:
+        self.tick_sec = float(tick_sec)
+        self.vol_short_sec = float(vol_short_sec)
+        self.vol_long_sec = float(vol_long_sec)
+        self.trend_sec = float(trend_sec)
+        # 最長の窓より少し長く持つ（窓の手前の1点も残すので、窓の頭はちょうどの時刻から as-of で取れる）
+        self.horizon_sec = max(self.tick_sec, self.vol_long_sec, self.trend_sec, 5.0) * 1.1
+        if int(maxlen) != self.maxlen:
+            t, p = self.times.copy(), self.prices.copy()
+            self._resize(maxlen)
+            self.extend(t, p)
+
+    # ---- 保持中の区間 ----
+    @property
+    def times(self) -> np.ndarray:
+        return self._t[self._lo:self._hi]
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self._p[self._lo:self._hi]
+
+    def __len__(self) -> int:
+        return self._hi - self._lo
+
+    def append(self, t: float, price: float) -> None:
+        lo, hi = self._lo, self._hi
+        if hi > lo and t < self._t[hi - 1]:
+            t = self._t[hi - 1]          # 時刻が戻った（時計の補正等）→ 単調に保つ
+        if hi == len(self._t):
+            n = hi - lo
+            self._t[:n] = self._t[lo:hi]
+            self._p[:n] = self._p[lo:hi]
+            lo, hi = 0, n
+        self._t[hi] = t
+        self._p[hi] = price
+        hi += 1
+        self.count += 1
+        # 古い方を捨てる（horizon は二分探索。残すのは窓の手前の1点まで）
+        cut = lo + int(np.searchsorted(self._t[lo:hi], t - self.horizon_sec, side="right")) - 1
+        self._lo = max(lo, cut, hi - self.maxlen)
+        self._hi = hi
+
+    def extend(self, times, prices) -> None:
+        for t, p in zip(np.asarray(times, dtype=np.float64).tolist(), np.asarray(prices, dtype=np.float64).tolist()):
+            self.append(t, p)
+
+    def clear(self) -> None:
+        self._lo = self._hi = 0
+
+    # ---- 窓 ----
+    def since(self, seconds: float) -> int:
+        """最新から seconds 秒以内の最初のサンプルの位置（times / prices の添字）"""
+        t = self.times
+        return int(np.searchsorted(t, t[-1] - seconds, side="left")) if len(t) else 0
+
+    def covers(self, seconds: float) -> bool:
+        """seconds 秒前までさかのぼれるだけのデータがあるか"""
+        t = self.times
+        return len(t) > 1 and t[0] <= t[-1] - seconds
+
+    def asof(self, seconds: float):
+        """seconds 秒前の時点での価格（その時刻以前の最後のサンプル）。データが無ければ None"""
+        t = self.times
+        if not len(t):
+            return None
+        i = int(np.searchsorted(t, t[-1] - seconds, side="right")) - 1
+        return float(self._p[self._lo + i]) if i >= 0 else None
+
 
 feature_state = FeatureState()
 
+# 板は配列で保持し、累積数量は更新ごとに一度だけ計算
+order_book = OrderBookArrays()
 
-def _extract_best(ob: dict) -> tuple[float, float] | None:
-    bids = ob.get("bids")
-    asks = ob.get("asks")
-    if not bids or not asks:
-        return None
-    try:
-        bb = float(bids[0][0])
-        ba = float(asks[0][0])
-        return bb, ba
-    except Exception:
-        return None
-
-
-def _depth_imbalance(ob: dict, depth: int = 5) -> float | None:
-    bids = ob.get("bids")
-    asks = ob.get("asks")
-    if not bids or not asks:
-        return None
-    b = sum(float(x[1]) for x in bids[:depth] if x and len(x) >= 2)
-    a = sum(float(x[1]) for x in asks[:depth] if x and len(x) >= 2)
-    total = a + b
-    if total <= 0:
-        return 0.0
-    return (b - a) / total
+
+# 上げ下げ比率の前回: window_sec → (窓の先頭の通し番号, 通し数, 結果)
+_tick_memo: Dict[float, tuple] = {}
 
 
-def _tick_direction_ratio(prices: deque, lookback: int = 20) -> tuple[float, float]:
-    n = min(lookback, len(prices) - 1)
-    if n <= 0:
+def _tick_direction_ratio(state: FeatureState, window_sec: float) -> tuple[float, float]:
+    """
+    直近 window_sec 秒の値動き（窓内のサンプルで終わる変化）のうち上げ/下げの割合。
+    窓の先頭が前回と同じで、増えたのが同値の1点だけ（差分 0 は数えない）なら前回の結果を使う。
+    """
+    if len(state) < 2:
         return 0.0, 0.0
-    ups = downs = 0
-    for i in range(-1, -n - 1, -1):
-        if prices[i] > prices[i - 1]:
-            ups += 1
-        elif prices[i] < prices[i - 1]:
-            downs += 1
+    i = max(state.since(window_sec) - 1, 0)
+    first = state.count - len(state) + i
+    p = state.prices
+    memo = _tick_memo.get(window_sec)
+    if memo is not None and memo[0] == first and (
+            memo[1] == state.count or (memo[1] + 1 == state.count and p[-1] == p[-2])):
+        stage_stats.hit("ticks")
+        _tick_memo[window_sec] = (first, state.count, memo[2])
+        return memo[2]
+    stage_stats.miss("ticks")
+    d = np.diff(p[i:])
+    ups = int(np.count_nonzero(d > 0))
+    downs = int(np.count_nonzero(d < 0))
     total = ups + downs
-    if total == 0:
-        return 0.0, 0.0
-    return ups / total, downs / total
+    out = (ups / total, downs / total) if total else (0.0, 0.0)
+    _tick_memo[window_sec] = (first, state.count, out)
+    return out
 
 
-def _momentum(prices: deque, k: int) -> float:
-    if len(prices) <= k:
+def _momentum(state: FeatureState, seconds: float) -> float:
+    """現在値 - seconds 秒前の時点の値（そこまでさかのぼれなければ 0）"""
+    if len(state) < 2:
+        return 0.0
+    then = state.asof(seconds)
+    if then is None:
         return 0.0
-    return float(prices[-1] - prices[-1 - k])
+    return float(state.prices[-1] - then)
 
 
-def _volatility(prices: deque, short: int = 20, long: int = 60) -> float:
-    if len(prices) < long:
+def _volatility(state: FeatureState, short_sec: float, long_sec: float) -> float:
+    """直近 short_sec 秒と long_sec 秒の価格の標準偏差の比（long_sec 分のデータが無ければ 0）"""
+    if not state.covers(long_sec):
         return 0.0
-    arr = np.array(prices)
-    short_std = np.std(arr[-short:])
-    long_std = np.std(arr[-long:])
+    p = state.prices
+    short_std = np.std(p[state.since(short_sec):])
+    long_std = np.std(p[state.since(long_sec):])
     if long_std == 0:
         return 0.0
-    return short_std / long_std
+    return float(short_std / long_std)
 
 
-def _trend_slope(prices: deque, lookback: int = 30) -> float:
-    if len(prices) < lookback:
+def _trend_slope(state: FeatureState, seconds: float) -> float:
+    """直近 seconds 秒の価格を時刻で線形回帰した傾き（価格/秒）"""
+    if not state.covers(seconds):
         return 0.0
-    y = np.array(prices)[-lookback:]
-    x = np.arange(len(y))
-    # 線形回帰の傾き
-    A = np.vstack([x, np.ones(len(x))]).T
-    slope, _ = np.linalg.lstsq(A, y, rcond=None)[0]
-    return float(slope)
-
-
-def _liquidity_ratio(ob: dict, depth: int = 5, full: int = 20) -> float:
-    bids = ob.get("bids")
-    asks = ob.get("asks")
-    if not bids or not asks:
+    i = state.since(seconds)
+    x = state.times[i:]
+    y = state.prices[i:]
+    if len(x) < 2:
         return 0.0
-    b_top = sum(float(x[1]) for x in bids[:depth])
-    a_top = sum(float(x[1]) for x in asks[:depth])
-    b_full = sum(float(x[1]) for x in bids[:full])
-    a_full = sum(float(x[1]) for x in asks[:full])
-    total_top = b_top + a_top
-    total_full = b_full + a_full
-    if total_full <= 0:
+    x = x - x.mean()
+    sxx = float(np.dot(x, x))
+    if sxx == 0:
         return 0.0
-    return total_top / total_full
+    return float(np.dot(x, y - y.mean()) / sxx)
 
 
 # --- 公開API -------------------------------------------------------------
@@ -105,9 +179,8 @@ def compute_market_features(exchange) -> Dict[str, Any]:
     """
     exchange の get_orderbook()/get_last_price() を使って特徴量を生成。
     core.py から毎ポーリングで呼ばれる想定。
+    exchange が clock() を持つ場合（リプレイ等）はその時刻を使う。
     """
-    now = time.time()
-
     # 価格取得
     try:
         last = float(exchange.get_last_price())
@@ -119,7 +192,14 @@ def compute_market_features(exchange) -> Dict[str, Any]:
     except Exception:
         ob = {}
 
-    bb_ba = _extract_best(ob)
+    # レイテンシ追跡: 価格・板を受け取った時刻（monotonic）
+    t_data = time.monotonic()
+
+    clock = getattr(exchange, "clock", None)
+    now = clock() if callable(clock) else time.time()
+
+    book = order_book.update(ob)
+    bb_ba = book.best
     if bb_ba:
         bb, ba = bb_ba
         mid = (bb + ba) / 2.0
@@ -132,43 +212,55 @@ def compute_market_features(exchange) -> Dict[str, Any]:
         last = mid
 
     if last and last > 0:
-        feature_state.prices.append(last)
-        feature_state.times.append(now)
+        feature_state.append(now, last)
 
-    # 板厚バランス
-    imb5 = _depth_imbalance(ob, depth=5)
+    # 板特徴量（板厚バランス曲線・microprice・流動性比・傾きを1パスで）
+    ob_feats = book.features(liq_depth=5, liq_full=20)
 
-    # ティック方向
-    up_ratio, down_ratio = _tick_direction_ratio(feature_state.prices, lookback=20)
+    # ティック方向（窓はすべて秒。サンプル数ではない）
+    st = feature_state
+    up_ratio, down_ratio = _tick_direction_ratio(st, st.tick_sec)
 
-    # モメンタム
-    mom_1 = _momentum(feature_state.prices, k=1)
-    mom_5 = _momentum(feature_state.prices, k=5)
+    # モメンタム（1秒前・5秒前の時点との差）
+    mom_1 = _momentum(st, 1.0)
+    mom_5 = _momentum(st, 5.0)
 
     # 追加特徴量
-    vol = _volatility(feature_state.prices, short=20, long=60)
-    slope = _trend_slope(feature_state.prices, lookback=30)
-    liq = _liquidity_ratio(ob, depth=5, full=20)
+    vol = _volatility(st, st.vol_short_sec, st.vol_long_sec)
+    slope = _trend_slope(st, st.trend_sec)
 
     # 出力
     out = {
         "mid": mid or 0.0,
         "spread": spread or 0.0,
         "spread_bps": (spread / mid * 1e4) if (mid and mid > 0) else 0.0,
-        "depth_imb_5": imb5 if imb5 is not None else 0.0,
+        "depth_imb_1": ob_feats["depth_imb_1"],
+        "depth_imb_5": ob_feats["depth_imb_5"],
+        "depth_imb_10": ob_feats["depth_imb_10"],
+        "depth_imb_20": ob_feats["depth_imb_20"],
+        "depth_imb_50": ob_feats["depth_imb_50"],
+        "microprice": ob_feats["microprice"] or mid or 0.0,
+        "weighted_mid": ob_feats["weighted_mid"] or mid or 0.0,
+        "book_slope_bid": ob_feats["book_slope_bid"],
+        "book_slope_ask": ob_feats["book_slope_ask"],
+        "book_slope": ob_feats["book_slope"],
         "tick_up_ratio": up_ratio,
         "tick_down_ratio": down_ratio,
         "mom_1s": mom_1,
         "mom_5s": mom_5,
         "volatility": vol,
         "trend_slope": slope,
-        "liq_ratio": liq,
+        "liq_ratio": ob_feats["liq_ratio"],
     }
 
     # --- alias を追加（Strategy01 用） ---
     out["depth_imbalance"] = out["depth_imb_5"]
     out["taker_bias"] = out["tick_up_ratio"] - out["tick_down_ratio"]
 
+    # --- トレース（bot/utils/trace.py。シグナル → 発注 → 応答まで持ち回す） ---
+    out["trace_id"] = new_trace_id()
+    out["t_data"] = t_data
+
     return out
 
 
@@ -0,0 +1,322 @@
+# bot/features/indicator_bank.py
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot.exchange.types import Bars
+
+# 累積和の列（0 行目は 0。i 行目 = 先頭から i 本分の合計）
+#   s:  close - ref        q:  (close - ref)^2    （ref を引くのは分散の桁落ち対策）
+#   g:  上昇幅              l:  下落幅              tr: true range（前の足の close を使う）
+_COLS = ("s", "q", "g", "l", "tr")
+
+
+class IndicatorBank:
+    """
+    複数期間の RSI / SMA / ボリンジャー / ATR を累積和の差分で求めるバンク。
+      - 累積和（close・close²・上昇幅・下落幅・TR）を1回だけ持ち、期間 p の値は
+        cum[n] - cum[n-p] の O(1)。期間をいくつ増やしても追加コストは引き算だけ
+      - load(bars):           ローソク足の配列からまとめて作り直す（cumsum 1回）
+      - sync(bars):           ライブ用。前回からの差分（未確定足の更新・1本追加）だけ反映
+      - push / update_last:   ティックで1本追加 / 未確定足の更新（どちらも O(1)）
+      - series(kind, p):      履歴全体の系列（バックテスト・チューニング用。先頭の不足分は NaN）
+    RSI は calculate_rsi と同じ単純平均（Cutler）、ATR も TR の単純平均、BB の σ は母標準偏差。
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = max(16, int(capacity))
+        self._cum = np.zeros((len(_COLS), self.capacity + 1), dtype=np.float64)
+        self._tmp = np.zeros((len(_COLS) + 1, self.capacity), dtype=np.float64)
+        self.n = 0
+        self.ref = 0.0
+        self.last_close = float("nan")
+        self._prev_close = float("nan")   # 最終足の1本前の close（update_last 用）
+        self._last_start = None           # 最終足の開始時刻（sync 用）
+        self.full_loads = 0
+
+    # ---- 構築 ----
+    def load(self, bars) -> "IndicatorBank":
+        bars = Bars.coerce(bars)
+        close = bars.close
+        n = len(close)
+        if n > self.capacity:
+            self.__init__(n * 2)
+        self.full_loads += 1
+        self.n = n
+        self._last_start = float(bars.start[-1]) if n else None
+        if n == 0:
+            self.last_close = self._prev_close = float("nan")
+            return self
+        self.ref = ref = float(close[0])
+        # 5列を1つのバッファに作ってから cumsum 1回（小さい配列は ufunc の呼び出し回数が支配的）
+        v = self._tmp[:, :n]
+        x, q, g, l, tr, t = v
+        np.subtract(close, ref, out=x)
+        np.multiply(x, x, out=q)
+        g[0] = 0.0
+        np.subtract(close[1:], close[:-1], out=g[1:])
+        np.negative(g, out=l)
+        np.maximum(g, 0.0, out=g)
+        np.maximum(l, 0.0, out=l)
+        np.maximum(bars.high[1:], close[:-1], out=tr[1:])
+        np.minimum(bars.low[1:], close[:-1], out=t[1:])
+        np.subtract(tr[1:], t[1:], out=tr[1:])
+        tr[0] = bars.high[0] - bars.low[0]
+        np.cumsum(v[:len(_COLS)], axis=1, out=self._cum[:, 1:n + 1])
+        self.last_close = float(close[-1])
+        self._prev_close = float(close[-2]) if n > 1 else float("nan")
+        return self
+
+    def sync(self, bars) -> "IndicatorBank":
+        """
+        ライブ用: 毎サイクル取り直したローソク足に追従する。
+        前回と同じ足（未確定足の更新）なら update_last、1本進んだだけなら確定 + push（どちらも O(1)）。
+        開始時刻が無い足・飛び・食い違いは load で作り直す。
+        """
+        bars = Bars.coerce(bars)
+        n = len(bars)
+        last = self._last_start
+        if n >= 3 and last is not None and last > 0:
+            start, close = bars.start, bars.close
+            if start[-1] == last and close[-2] == self._prev_close:
+                self.update_last(close[-1], bars.high[-1], bars.low[-1])
+                return self
+            if start[-2] == last and close[-3] == self._prev_close:
+                self.update_last(close[-2], bars.high[-2], bars.low[-2])
+                self.push(close[-1], bars.high[-1], bars.low[-1])
+                self._last_start = float(start[-1])
+                return self
+        return self.load(bars)
+
+    def _row(self, close: float, high: float, low: float, prev: float) -> Tuple[float, ...]:
+        x = close - self.ref
+        if prev != prev:  # 最初の1本
+            return (x, x * x, 0.0, 0.0, high - low)
+        d = close - prev
+        return (x, x * x, max(d, 0.0), max(-d, 0.0), max(high, prev) - min(low, prev))
+
+    def push(self, close: float, high: Optional[float] = None, low: Optional[float] = None) -> None:
+        """確定足（またはティック）を1本追加"""
+        close = float(close)
+        high = close if high is None else float(high)
+        low = close if low is None else float(low)
+        if self.n == 0:
+            self.ref = close
+        if self.n >= self.capacity:
+            self._compact()
+        cum = self._cum
+        n = self.n
+        np.add(cum[:, n], self._row(close, high, low, self.last_close), out=cum[:, n + 1])
+        self.n = n + 1
+        self._prev_close = self.last_close
+        self.last_close = close
+
+    def update_last(self, close: float, high: Optional[float] = None, low: Optional[float] = None) -> None:
+        """最後の1本を差し替え（未確定足の更新）"""
+        if self.n == 0:
+            self.push(close, high, low)
+            return
+        close = float(close)
+        high = close if high is None else float(high)
+        low = close if low is None else float(low)
+        cum = self._cum
+        n = self.n
+        np.add(cum[:, n - 1], self._row(close, high, low, self._prev_close), out=cum[:, n])
+        self.last_close = close
+
+    def _compact(self) -> None:
+        """満杯になったら新しい半分だけ残す（差分しか使わないので基準の行を引いて詰めるだけ）"""
+        keep = self.capacity // 2
+        base = self.n - keep
+        cum = self._cum
+        cum[:, :keep + 1] = cum[:, base:self.n + 1] - cum[:, base:base + 1]
+        self.n = keep
+
+    # ---- 最新値（期間ごとに O(1)。本数が足りなければ None） ----
+    def _window(self, row: int, p: int) -> float:
+        n = self.n
+        return float(self._cum[row, n] - self._cum[row, n - p])
+
+    def sma(self, p: int) -> Optional[float]:
+        if p <= 0 or self.n < p:
+            return None
+        return self._window(0, p) / p + self.ref
+
+    def std(self, p: int) -> Optional[float]:
+        if p <= 0 or self.n < p:
+            return None
+        m = self._window(0, p) / p
+        var = self._window(1, p) / p - m * m
+        return float(np.sqrt(var)) if var > 0 else 0.0
+
+    def bbands(self, p: int, k: float = 2.0) -> Optional[Tuple[float, float, float]]:
+        """(mid, upper, lower)"""
+        mid = self.sma(p)
+        if mid is None:
+            return None
+        w = k * self.std(p)
+        return mid, mid + w, mid - w
+
+    def rsi(self, p: int) -> Optional[float]:
+        if p <= 0 or self.n < p + 1:
+            return None
+        gain = self._window(2, p)
+        loss = self._window(3, p)
+        if loss <= 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def atr(self, p: int) -> Optional[float]:
+        if p <= 0 or self.n < p + 1:
+            return None
+        return self._window(4, p) / p
+
+    def values(self, rsi: Sequence[int] = (), sma: Sequence[int] = (), atr: Sequence[int] = (),
+               bb: Sequence[Tuple[int, float]] = ()) -> Dict[str, Optional[float]]:
+        """
+        まとめて取り出す: {"rsi_14": .., "sma_9": .., "atr_14": .., "bb_mid_20": .., "bb_upper_20": .., "bb_lower_20": ..}
+        毎サイクル同じ組み合わせなら BankQuery を作っておいて q(bank) の方が速い。
+        """
+        return BankQuery(rsi=rsi, sma=sma, atr=atr, bb=bb)(self)
+
+    # ---- 系列（履歴全体。i 番目 = i 本目までを使った値） ----
+    def series(self, kind: str, p: int, k: float = 2.0) -> np.ndarray:
+        """
+        kind: "sma" / "std" / "rsi" / "atr" / "bb_upper" / "bb_lower"
+        return: 長さ n の float64 配列（本数が足りない先頭は NaN）
+        """
+        n = self.n
+        out = np.full(n, np.nan)
+        need = p if kind in ("sma", "std", "bb_upper", "bb_lower") else p + 1
+        if p <= 0 or n < need:
+            return out
+        cum = self._cum[:, :n + 1]
+
+        def win(row):
+            return cum[row, p:] - cum[row, :-p]     # 長さ n - p + 1（窓の終わり = p-1 .. n-1 本目）
+
+        if kind == "rsi":
+            gain, loss = win(2), win(3)
+            v = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / np.where(loss > 0, loss, 1.0)), 100.0)
+            out[p:] = v[1:]
+            return out
+        if kind == "atr":
+            out[p:] = win(4)[1:] / p
+            return out
+        m = win(0) / p
+        if kind == "sma":
+            out[p - 1:] = m + self.ref
+            return out
+        sd = np.sqrt(np.maximum(win(1) / p - m * m, 0.0))
+        if kind == "std":
+            out[p - 1:] = sd
+        elif kind == "bb_upper":
+            out[p - 1:] = m + self.ref + k * sd
+        elif kind == "bb_lower":
+            out[p - 1:] = m + self.ref - k * sd
+        else:
+            raise ValueError(f"unknown series kind {kind!r}")
+        return out
+
+    def columns(self, rsi: Sequence[int] = (), sma: Sequence[int] = (), atr: Sequence[int] = (),
+                bb: Sequence[Tuple[int, float]] = ()) -> Dict[str, np.ndarray]:
+        """values() と同じキーで系列をまとめて返す（CompiledRules.evaluate_arrays にそのまま渡せる）"""
+        out: Dict[str, np.ndarray] = {}
+        for p in rsi:
+            out[f"rsi_{p}"] = self.series("rsi", p)
+        for p in sma:
+            out[f"sma_{p}"] = self.series("sma", p)
+        for p in atr:
+            out[f"atr_{p}"] = self.series("atr", p)
+        for p, k in bb:
+            out[f"bb_mid_{p}"] = self.series("sma", p)
+            out[f"bb_upper_{p}"] = self.series("bb_upper", p, k)
+            out[f"bb_lower_{p}"] = self.series("bb_lower", p, k)
+        return out
+
+
+# BankQuery の種類
+_RSI, _SMA, _ATR, _BB_MID, _BB_UPPER, _BB_LOWER = range(6)
+
+
+class BankQuery:
+    """
+    IndicatorBank から取り出す期間の組み合わせ（毎サイクル同じなら作っておいて使い回す）。
+    累積和の参照は「最終行 + 期間ごとの行」を1回の fancy index でまとめて取り、あとは引き算と割り算だけ。
+      q = BankQuery(rsi=(7, 14), sma=(9, 21), atr=(14,), bb=((20, 2.0),))
+      q(bank) -> {"rsi_7": .., ..., "bb_lower_20": ..}（本数が足りない期間は None）
+    """
+
+    def __init__(self, rsi: Sequence[int] = (), sma: Sequence[int] = (), atr: Sequence[int] = (),
+                 bb: Sequence[Tuple[int, float]] = ()):
+        spec: List[Tuple[str, int, int, float]] = []
+        seen = set()
+
+        def add(key, kind, p, k=0.0):
+            if key not in seen and int(p) > 0:
+                seen.add(key)
+                spec.append((key, kind, int(p), float(k)))
+        for p in rsi:
+            add(f"rsi_{p}", _RSI, p)
+        for p in sma:
+            add(f"sma_{p}", _SMA, p)
+        for p in atr:
+            add(f"atr_{p}", _ATR, p)
+        for p, k in bb:
+            add(f"bb_mid_{p}", _BB_MID, p, k)
+            add(f"bb_upper_{p}", _BB_UPPER, p, k)
+            add(f"bb_lower_{p}", _BB_LOWER, p, k)
+        self.periods = sorted({p for _, _, p, _ in spec})
+        col = {p: i for i, p in enumerate(self.periods)}
+        # (キー, 種類, 期間, 期間の列番号, k, 必要本数)。RSI / ATR は差分を取るので p+1 本
+        self._spec = [(key, kind, p, col[p], k, p + 1 if kind in (_RSI, _ATR) else p)
+                      for key, kind, p, k in spec]
+        self.keys = tuple(key for key, *_ in spec)
+        self._p = np.asarray(self.periods, dtype=np.int64)
+        self._n = -1
+        self._idx = self._p
+
+    def __call__(self, bank: IndicatorBank) -> Dict[str, Optional[float]]:
+        n = bank.n
+        out: Dict[str, Optional[float]] = {}
+        if not self._spec:
+            return out
+        if n != self._n:
+            self._idx = np.maximum(n - self._p, 0)
+            self._n = n
+        cum = bank._cum
+        e = cum[:, n].tolist()
+        rows = cum[:, self._idx].T.tolist()
+        ref = bank.ref
+        for key, kind, p, j, k, need in self._spec:
+            if n < need:
+                out[key] = None
+                continue
+            r = rows[j]
+            if kind == _RSI:
+                gain, loss = e[2] - r[2], e[3] - r[3]
+                out[key] = 100.0 if loss <= 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+            elif kind == _SMA:
+                out[key] = (e[0] - r[0]) / p + ref
+            elif kind == _ATR:
+                out[key] = (e[4] - r[4]) / p
+            else:
+                m = (e[0] - r[0]) / p
+                if kind == _BB_MID:
+                    out[key] = m + ref
+                    continue
+                var = (e[1] - r[1]) / p - m * m
+                w = k * var ** 0.5 if var > 0 else 0.0
+                out[key] = m + ref + w if kind == _BB_UPPER else m + ref - w
+        return out
+
+
+def parse_periods(spec: str) -> Tuple[int, ...]:
+    """"7,14,21" → (7, 14, 21)（空・重複は除く）"""
+    out = []
+    for s in spec.split(","):
+        s = s.strip()
+        if s and int(s) > 0 and int(s) not in out:
+            out.append(int(s))
+    return tuple(out)
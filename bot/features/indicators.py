@@ -1,28 +1,27 @@
 # bot/features/indicators.py
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
-from bot.features.features import compute_market_features
+from typing import Sequence, Dict, Any, Optional
 
-# --- シンプルなインジケータ実装 ---
-def calculate_sma(closes: List[float], period: int) -> Optional[float]:
-    if not closes or period <= 0 or len(closes) < period:
+import numpy as np
+
+from bot.config import ensure_config
+from bot.exchange.types import Bars
+from bot.features.change import bars_key, stage_stats
+from bot.features.features import compute_market_features, feature_state
+from bot.features.indicator_bank import BankQuery, IndicatorBank, parse_periods
+
+# --- シンプルなインジケータ実装（list / NumPy 配列どちらも可） ---
+def calculate_sma(closes: Sequence[float], period: int) -> Optional[float]:
+    if closes is None or period <= 0 or len(closes) < period:
         return None
-    return sum(closes[-period:]) / period
+    return float(np.sum(closes[-period:])) / period
 
-def calculate_rsi(closes: List[float], period: int = 14) -> Optional[float]:
-    if not closes or len(closes) < period + 1:
+def calculate_rsi(closes: Sequence[float], period: int = 14) -> Optional[float]:
+    if closes is None or len(closes) < period + 1:
         return None
-    gains, losses = [], []
-    for i in range(-period, 0):
-        diff = closes[i] - closes[i - 1]
-        if diff >= 0:
-            gains.append(diff)
-            losses.append(0.0)
-        else:
-            gains.append(0.0)
-            losses.append(-diff)
-    avg_gain = sum(gains) / period
-    avg_loss = sum(losses) / period
+    diff = np.diff(np.asarray(closes[-(period + 1):], dtype=np.float64))
+    avg_gain = float(diff[diff >= 0].sum()) / period
+    avg_loss = float(-diff[diff < 0].sum()) / period
     if avg_loss == 0:
         return 100.0
     rs = avg_gain / avg_loss
@@ -30,28 +29,63 @@ def calculate_rsi(closes: List[float], period: int = 14) -> Optional[float]:
 
 # --- 環境変数をクロージャで固定 ---
 def load_indicators_from_env(config):
-    rsi_period = int(getattr(config, "RSI_PERIOD", 14))
-    sma_fast   = int(getattr(config, "SMA_FAST", 9))
-    sma_slow   = int(getattr(config, "SMA_SLOW", 21))
-    bb_window  = int(getattr(config, "BBANDS_PERIOD", getattr(config, "BB_WINDOW", 20)))
-    bb_stddev  = float(getattr(config, "BBANDS_STDDEV", getattr(config, "BB_STDDEV", 2)))
+    config = ensure_config(config)
+    rsi_period = config.RSI_PERIOD
+    sma_fast   = config.SMA_FAST
+    sma_slow   = config.SMA_SLOW
+    bb_window  = config.BBANDS_PERIOD
+    bb_stddev  = config.BBANDS_STDDEV
+    atr_period = config.ATR_PERIOD
+    extra      = parse_periods(config.INDICATOR_EXTRA_PERIODS)
+
+    # ティック特徴量の窓（秒）
+    feature_state.configure(
+        tick_sec=config.FEATURE_TICK_SEC,
+        vol_short_sec=config.FEATURE_VOL_SHORT_SEC,
+        vol_long_sec=config.FEATURE_VOL_LONG_SEC,
+        trend_sec=config.FEATURE_TREND_SEC,
+        maxlen=config.FEATURE_HISTORY_MAX,
+    )
 
-    def compute_indicators(price_data: List[Dict[str, Any]], exchange=None) -> Dict[str, Any]:
-        closes = [bar["close"] for bar in price_data if "close" in bar]
+    # 累積和は前回からの差分だけ更新し、各期間は差分1回（extra を増やしてもほぼタダ）
+    bank = IndicatorBank()
+    query = BankQuery(rsi=(rsi_period,) + extra, sma=(sma_fast, sma_slow) + extra,
+                      atr=(atr_period,) + extra, bb=((bb_window, bb_stddev),))
+    extra_keys = [f"{kind}_{p}" for p in extra for kind in ("rsi", "sma", "atr")]
 
-        # テクニカル指標
-        rsi  = calculate_rsi(closes, period=rsi_period)
-        smaF = calculate_sma(closes, period=sma_fast)
-        smaS = calculate_sma(closes, period=sma_slow)
+    # 足が前回と同じ（本数・最新足の OHLCV が一致）ならテクニカル指標は前回の値を使う
+    memo: Dict[str, Any] = {"key": None, "tech": None}
 
-        out: Dict[str, Any] = {
-            "rsi": rsi,
-            "sma_fast": smaF,
-            "sma_slow": smaS,
+    def technicals(bars: Bars) -> Dict[str, Any]:
+        v = query(bank.sync(bars))
+        tech: Dict[str, Any] = {
+            "rsi": v[f"rsi_{rsi_period}"],
+            "sma_fast": v[f"sma_{sma_fast}"],
+            "sma_slow": v[f"sma_{sma_slow}"],
             "bb_window": bb_window,
             "bb_stddev": bb_stddev,
-            "last_close": closes[-1] if closes else None,
+            "bb_mid": v[f"bb_mid_{bb_window}"],
+            "bb_upper": v[f"bb_upper_{bb_window}"],
+            "bb_lower": v[f"bb_lower_{bb_window}"],
+            "atr": v[f"atr_{atr_period}"],
+            "last_close": float(bars.close[-1]) if len(bars) else None,
         }
+        for key in extra_keys:
+            tech[key] = v[key]
+        return tech
+
+    def compute_indicators(price_data: Bars, exchange=None) -> Dict[str, Any]:
+        # 列をそのまま参照（旧形式の list[dict] だけ変換）
+        bars = Bars.coerce(price_data)
+        key = bars_key(bars)
+        if key == memo["key"]:
+            stage_stats.hit("bars")
+        else:
+            stage_stats.miss("bars")
+            memo["key"], memo["tech"] = key, technicals(bars)
+
+        # テクニカル指標（以降で書き足すのでコピー）
+        out: Dict[str, Any] = dict(memo["tech"])
 
         # --- features.py からのマーケット特徴量を統合 ---
         if exchange:
@@ -0,0 +1,126 @@
+# bot/features/orderbook.py
+from __future__ import annotations
+from typing import Dict, Tuple
+
+import numpy as np
+
+from bot.exchange.types import OrderBook
+from bot.features.change import side_key, stage_stats
+
+# 深さ別の板厚バランスを出すレベル
+IMB_LEVELS: Tuple[int, ...] = (1, 5, 10, 20, 50)
+MAX_LEVELS = 50
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+class OrderBookArrays:
+    """
+    L2板を価格/数量の NumPy 配列で保持し、更新ごとに累積数量を一度だけ計算する。
+    exchange.get_orderbook() の OrderBook（配列をそのまま参照）と旧 dict 形式を受け付ける:
+      {"bids": [[price, qty], ...], "asks": [[price, qty], ...]}
+      {"best_bid": float, "best_ask": float}（数量不明 → 0 として扱う）
+    上位 max_levels の内容が前回と同じなら累積も特徴量も作り直さない（version が変わらない）。
+    """
+    __slots__ = ("bid_px", "bid_qty", "ask_px", "ask_qty", "cum_bid", "cum_ask",
+                 "version", "_key", "_feat_key", "_feat")
+
+    def __init__(self):
+        self.bid_px = self.bid_qty = self.ask_px = self.ask_qty = _EMPTY
+        self.cum_bid = self.cum_ask = _EMPTY
+        self.version = 0
+        self._key = None
+        self._feat_key = None
+        self._feat: Dict[str, float] = {}
+
+    def update(self, ob: OrderBook | dict | None, max_levels: int = MAX_LEVELS) -> "OrderBookArrays":
+        book = OrderBook.coerce(ob, max_levels)
+        bids, asks = book.bids[:max_levels], book.asks[:max_levels]
+        key = (side_key(bids), side_key(asks))
+        if key == self._key:
+            return self
+        self._key = key
+        self.version += 1
+        self.bid_px, self.bid_qty = bids.px, bids.qty
+        self.ask_px, self.ask_qty = asks.px, asks.qty
+        self.cum_bid = np.cumsum(self.bid_qty)
+        self.cum_ask = np.cumsum(self.ask_qty)
+        return self
+
+    @property
+    def has_both(self) -> bool:
+        return len(self.bid_px) > 0 and len(self.ask_px) > 0
+
+    @property
+    def best(self) -> Tuple[float, float] | None:
+        if not self.has_both:
+            return None
+        return float(self.bid_px[0]), float(self.ask_px[0])
+
+    @staticmethod
+    def _depth(cum: np.ndarray, k: int) -> float:
+        """上位 k レベルまでの累積数量（レベル不足なら全量）"""
+        if not len(cum):
+            return 0.0
+        return float(cum[min(k, len(cum)) - 1])
+
+    def features(self, liq_depth: int = 5, liq_full: int = 20) -> Dict[str, float]:
+        """
+        累積配列から以下を一度に算出:
+          depth_imb_{1,5,10,20,50}, microprice, weighted_mid, liq_ratio,
+          book_slope_bid / book_slope_ask / book_slope（1bps 当たりの数量）
+        片側が空の場合は 0.0（mid 系は 0.0 → 呼び出し側でフォールバック）。
+        板が前回と同じ（version が同じ）なら前回の dict をそのまま返す（呼び出し側は書き換えないこと）。
+        """
+        key = (self.version, liq_depth, liq_full)
+        if key == self._feat_key:
+            stage_stats.hit("book")
+            return self._feat
+        stage_stats.miss("book")
+        self._feat_key = key
+        self._feat = out = self._features(liq_depth, liq_full)
+        return out
+
+    def _features(self, liq_depth: int, liq_full: int) -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        if not self.has_both:
+            for k in IMB_LEVELS:
+                out[f"depth_imb_{k}"] = 0.0
+            out.update(microprice=0.0, weighted_mid=0.0, liq_ratio=0.0,
+                       book_slope_bid=0.0, book_slope_ask=0.0, book_slope=0.0)
+            return out
+
+        cb, ca = self.cum_bid, self.cum_ask
+        for k in IMB_LEVELS:
+            b, a = self._depth(cb, k), self._depth(ca, k)
+            tot = a + b
+            out[f"depth_imb_{k}"] = (b - a) / tot if tot > 0 else 0.0
+
+        bb, ba = float(self.bid_px[0]), float(self.ask_px[0])
+        bq, aq = float(self.bid_qty[0]), float(self.ask_qty[0])
+        mid = (bb + ba) / 2.0
+        # microprice: 反対側の数量で重み付け（買い板が厚いほど ask 寄り）
+        out["microprice"] = (ba * bq + bb * aq) / (bq + aq) if (bq + aq) > 0 else mid
+
+        # 上位 liq_depth レベルの数量加重平均価格
+        nb, na = min(liq_depth, len(cb)), min(liq_depth, len(ca))
+        wq = float(cb[nb - 1] + ca[na - 1])
+        if wq > 0:
+            notional = float(self.bid_px[:nb] @ self.bid_qty[:nb] + self.ask_px[:na] @ self.ask_qty[:na])
+            out["weighted_mid"] = notional / wq
+        else:
+            out["weighted_mid"] = mid
+
+        top = self._depth(cb, liq_depth) + self._depth(ca, liq_depth)
+        full = self._depth(cb, liq_full) + self._depth(ca, liq_full)
+        out["liq_ratio"] = top / full if full > 0 else 0.0
+
+        # 板の傾き: 最深レベルまでの累積数量 / mid からの距離(bps)
+        def _slope(px: np.ndarray, cum: np.ndarray) -> float:
+            dist_bps = abs(mid - float(px[-1])) / mid * 1e4 if mid > 0 else 0.0
+            return float(cum[-1]) / dist_bps if dist_bps > 0 else 0.0
+
+        out["book_slope_bid"] = _slope(self.bid_px, cb)
+        out["book_slope_ask"] = _slope(self.ask_px, ca)
+        out["book_slope"] = (out["book_slope_bid"] + out["book_slope_ask"]) / 2.0
+        return out
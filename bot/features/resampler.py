@@ -0,0 +1,188 @@
+# bot/features/resampler.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from bot.exchange.types import Bars
+
+_UNIT_MS = {"s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+# bar の内部表現（未確定バーは list で in-place 更新、確定バーは float64 リングの1行）
+# 先頭 6 列は Bars.COLUMNS と同じ並び
+_START, _OPEN, _HIGH, _LOW, _CLOSE, _VOL, _FIRST, _LAST = range(8)
+
+
+def timeframe_ms(tf: str | int) -> int:
+    """
+    "1m" / "5m" / "1h" / "1d" 形式、または Bybit の interval 表記（"1","5","60","D","W"）をミリ秒へ。
+    月足（"M" / "1M"）は長さが一定でなく固定幅の境界で切れないので受け付けない（小文字 m は分）。
+    """
+    s = str(tf).strip()
+    if s.isdigit():
+        return int(s) * 60_000
+    if s.endswith("M"):
+        raise ValueError(f"monthly timeframe is not supported: {tf!r}")
+    if s.upper() in ("D", "W"):
+        return _UNIT_MS[s.lower()]
+    unit = s[-1].lower()
+    if unit not in _UNIT_MS or not s[:-1].isdigit():
+        raise ValueError(f"unknown timeframe: {tf!r}")
+    return int(s[:-1]) * _UNIT_MS[unit]
+
+
+class _Series:
+    """確定バーは (maxlen, 8) の固定リングに保持（バー1本ごとの list/dict を持ち続けない）"""
+    __slots__ = ("tf", "ms", "ring", "n", "head", "cur")
+
+    def __init__(self, tf: str, maxlen: int):
+        self.tf = tf
+        self.ms = timeframe_ms(tf)
+        self.ring = np.zeros((max(1, int(maxlen)), 8), dtype=np.float64)
+        self.n = 0      # 保持本数
+        self.head = 0   # 次に書く行
+        self.cur: Optional[list] = None
+
+    def append(self, bar) -> None:
+        self.ring[self.head] = bar
+        self.head = (self.head + 1) % len(self.ring)
+        if self.n < len(self.ring):
+            self.n += 1
+
+    def row(self, i: int) -> np.ndarray:
+        """古い方から i 番目の確定バー（リングの行ビュー。書き換えると訂正になる）"""
+        return self.ring[(self.head - self.n + i) % len(self.ring)]
+
+    def tail(self, k: int) -> np.ndarray:
+        k = min(max(k, 0), self.n)
+        return self.ring[(self.head - k + np.arange(k)) % len(self.ring)]
+
+
+class BarResampler:
+    """
+    ティック（約定 or 価格サンプル）から複数タイムフレームの OHLCV を1パスでローカル生成する。
+      - 境界はエポックms の整数演算（start = ts - ts % tf_ms）で、ミリ秒単位で厳密
+      - 取引の無い区間は直前 close のフラットバー（volume=0）で埋め、系列を連続に保つ
+      - 確定済みバーに遅れて届いた約定は保持範囲内なら該当バーを訂正
+        （open/close は約定時刻の前後関係で更新）
+      - bars(tf, include_partial=True) で未確定バーも参照可能
+    bars() は exchange.fetch_ohlcv() と同じ列指向の Bars、確定通知・partial() は dict。
+    """
+
+    def __init__(self, timeframes: Iterable[str] = ("1m",), maxlen: int = 1000):
+        self._series: Dict[str, _Series] = {}
+        for tf in timeframes:
+            tf = str(tf).strip()
+            if tf and tf not in self._series:
+                self._series[tf] = _Series(tf, maxlen)
+        self.late_fixed = 0
+        self.late_dropped = 0
+
+    @property
+    def timeframes(self) -> List[str]:
+        return list(self._series)
+
+    # ---- 入力 ----
+    def on_trade(self, ts_ms: int, price: float, qty: float = 0.0) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        1ティックを全タイムフレームへ反映する。
+        return: このティックで確定したバーの [(tf, bar_dict), ...]
+        """
+        ts_ms = int(ts_ms)
+        price = float(price)
+        qty = float(qty)
+        if price <= 0:
+            return []
+        closed: List[Tuple[str, Dict[str, Any]]] = []
+        for s in self._series.values():
+            start = ts_ms - ts_ms % s.ms
+            cur = s.cur
+            if cur is None:
+                s.cur = [start, price, price, price, price, qty, ts_ms, ts_ms]
+                continue
+            if start == cur[_START]:
+                self._update(cur, ts_ms, price, qty)
+            elif start > cur[_START]:
+                # 確定 → 空白区間をフラットバーで埋めて新バーへ
+                s.append(cur)
+                closed.append((s.tf, self._to_dict(cur, s.ms)))
+                last_close = cur[_CLOSE]
+                gap = cur[_START] + s.ms
+                # 長い空白（停止明け・時刻の飛び）でも埋め草は保持できる maxlen 本まで（古い分は飛ばす）
+                gap = max(gap, start - len(s.ring) * s.ms)
+                while gap < start:
+                    # first/last を区間外（start-1）にして「埋め草」を識別
+                    flat = [gap, last_close, last_close, last_close, last_close, 0.0, gap - 1, gap - 1]
+                    s.append(flat)
+                    closed.append((s.tf, self._to_dict(flat, s.ms)))
+                    gap += s.ms
+                s.cur = [start, price, price, price, price, qty, ts_ms, ts_ms]
+            else:
+                self._late(s, start, ts_ms, price, qty)
+        return closed
+
+    def on_price(self, ts_ms: int, price: float) -> List[Tuple[str, Dict[str, Any]]]:
+        """価格サンプル（出来高なし）。ポーリング値の取り込み用"""
+        return self.on_trade(ts_ms, price, 0.0)
+
+    @staticmethod
+    def _update(bar: list, ts_ms: int, price: float, qty: float) -> None:
+        if price > bar[_HIGH]:
+            bar[_HIGH] = price
+        if price < bar[_LOW]:
+            bar[_LOW] = price
+        if ts_ms >= bar[_LAST]:
+            bar[_CLOSE] = price
+            bar[_LAST] = ts_ms
+        if ts_ms < bar[_FIRST]:
+            bar[_OPEN] = price
+            bar[_FIRST] = ts_ms
+        bar[_VOL] += qty
+
+    def _late(self, s: _Series, start: int, ts_ms: int, price: float, qty: float) -> None:
+        if not s.n:
+            self.late_dropped += 1
+            return
+        first_start = int(s.row(0)[_START])
+        idx = (start - first_start) // s.ms
+        if idx < 0 or idx >= s.n:
+            self.late_dropped += 1
+            return
+        bar = s.row(idx)
+        if bar[_FIRST] < bar[_START]:
+            # 埋め草のフラットバー → 実データで置き換え
+            bar[_OPEN] = bar[_HIGH] = bar[_LOW] = bar[_CLOSE] = price
+            bar[_FIRST] = bar[_LAST] = ts_ms
+            bar[_VOL] = qty
+        else:
+            self._update(bar, ts_ms, price, qty)
+        self.late_fixed += 1
+
+    # ---- 出力 ----
+    @staticmethod
+    def _to_dict(bar, ms: int) -> Dict[str, Any]:
+        start = int(bar[_START])
+        return {
+            "start": start,
+            "end": start + ms - 1,
+            "open": float(bar[_OPEN]),
+            "high": float(bar[_HIGH]),
+            "low": float(bar[_LOW]),
+            "close": float(bar[_CLOSE]),
+            "volume": float(bar[_VOL]),
+        }
+
+    def bars(self, tf: str, limit: int = 100, include_partial: bool = False) -> Bars:
+        s = self._series[tf]
+        partial = include_partial and s.cur is not None
+        rows = s.tail(limit - 1 if partial else limit)
+        if partial:
+            rows = np.vstack([rows, np.asarray(s.cur, dtype=np.float64)])
+        return Bars(*np.ascontiguousarray(rows[:, :6].T))
+
+    def partial(self, tf: str) -> Optional[Dict[str, Any]]:
+        s = self._series[tf]
+        return self._to_dict(s.cur, s.ms) if s.cur is not None else None
+
+    def closes(self, tf: str, limit: int = 100, include_partial: bool = True) -> np.ndarray:
+        return self.bars(tf, limit=limit, include_partial=include_partial).close
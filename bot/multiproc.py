@@ -0,0 +1,207 @@
+# bot/multiproc.py
+from __future__ import annotations
+import logging
+import multiprocessing as mp
+import os
+import time
+from typing import List, Optional
+
+from bot.config import ensure_config
+from bot.core import BotRunner
+from bot.features.features import feature_state, order_book
+from bot.strategies.strategy01 import Strategy01
+from bot.utils.log_pipeline import setup_logging
+from bot.utils.shm_ring import SnapshotRing, snapshot_to_indicators
+
+# MP_STRATEGIES の名前 → 戦略クラス
+STRATEGIES = {
+    "strategy01": Strategy01,
+}
+
+_LOG_FORMAT = "%(asctime)s [%(levelname)s] %(processName)s %(name)s: %(message)s"
+
+
+class MarketDataRunner(BotRunner):
+    """
+    市場データ専用プロセス: 取得・板・特徴量を計算し、発注はせずリングへ publish する。
+    発注・ポジション追跡・ExitEngine・private stream・起動時のポジ同期は持たない
+    （保護的イグジットは各戦略プロセスが自分のエントリー分だけ受け持つ）。
+    """
+    TRADING = False
+
+    def __init__(self, config, logger, ring: SnapshotRing, exchange=None):
+        super().__init__(config, logger, exchange=exchange)
+        self.ring = ring
+
+    def _act(self, indicators):
+        if len(feature_state):
+            indicators["ts"] = float(feature_state.times[-1])
+            indicators["price"] = float(feature_state.prices[-1])
+        self.ring.publish(indicators, order_book)
+        self._save_checkpoint()
+
+
+class StrategyRunner(BotRunner):
+    """
+    戦略プロセス: リングの新着スナップショットを読み、判定・発注だけを行う。
+    取得・特徴量計算はしないのでポーリング間隔は市場データ側が決める。
+    """
+
+    def __init__(self, config, logger, ring: SnapshotRing, strategy_name: str = "strategy01",
+                 exchange=None, wait_sec: Optional[float] = None):
+        super().__init__(config, logger, exchange=exchange)
+        self.ring = ring
+        self.strategy = STRATEGIES[strategy_name](self.config, logger)
+        self.wait_sec = wait_sec if wait_sec is not None else max(1.0, self.poll_sec * 2)
+        # 既に積まれている分は捨て、起動後の最新から読む
+        self.last_seq = ring.head
+        self.snapshots = 0
+
+    def _collect_indicators(self):
+        recs = self.ring.wait(self.last_seq, timeout=self.wait_sec)
+        if not recs:
+            return None
+        for rec in recs:
+            ts, price = float(rec["ts"]), float(rec["price"])
+            if ts == ts and price == price:
+                self.resampler.on_price(int(ts * 1000), price)
+        # 判定は最新の1件だけ（遅れた分はバーにだけ反映）
+        indicators = snapshot_to_indicators(recs[-1])
+        indicators["bb_window"] = self.config.BBANDS_PERIOD
+        indicators["bb_stddev"] = self.config.BBANDS_STDDEV
+        indicators["bars"] = self.resampler
+        self.last_seq = indicators["seq"]
+        self.snapshots += len(recs)
+        return indicators
+
+    def run(self):
+        self._apply_config_reload()
+        indicators = self._collect_indicators()
+        if indicators is not None:
+            self._act(indicators)
+
+
+def _pin_cpu(index: int, logger) -> None:
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    cpus = sorted(os.sched_getaffinity(0))
+    cpu = cpus[index % len(cpus)]
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError as e:
+        logger.warning(f"[multiproc] pin cpu{cpu} failed: {e!r}")
+
+
+def _loop(runner, stop, logger) -> None:
+    while not stop.is_set():
+        try:
+            runner.run()
+        except Exception as e:
+            logger.error("❌ Error: %s", e, exc_info=True)
+            stop.wait(runner.poll_sec)
+
+
+def _market_data_main(config, ring_name: str, stop, cpu_index: Optional[int]) -> None:
+    logger = setup_logging(config, text_format=_LOG_FORMAT)
+    if cpu_index is not None:
+        _pin_cpu(cpu_index, logger)
+    ring = SnapshotRing.attach(ring_name)
+    try:
+        _loop(MarketDataRunner(config, logger, ring), stop, logger)
+    finally:
+        ring.close()
+
+
+def _strategy_main(config, ring_name: str, stop, cpu_index: Optional[int], strategy_name: str) -> None:
+    logger = setup_logging(config, text_format=_LOG_FORMAT)
+    if cpu_index is not None:
+        _pin_cpu(cpu_index, logger)
+    ring = SnapshotRing.attach(ring_name)
+    try:
+        _loop(StrategyRunner(config, logger, ring, strategy_name), stop, logger)
+    finally:
+        ring.close()
+
+
+def _tagged(path: str, tag: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tag}{ext}" if path else path
+
+
+def _rate_share(config, procs: int, trading: bool = True) -> dict:
+    """
+    API キー1本のレート予算をプロセス数で等分する（各プロセスの RequestScheduler は互いを知らないので）。
+    市場データプロセスは発注しないので発注用の予約トークンは持たない
+    """
+    rate = config.API_RATE_LIMIT_PER_SEC / procs
+    burst = max(1.0, config.API_RATE_BURST / procs)
+    reserve = min(config.API_ORDER_RESERVE, max(0, int(burst) - 1)) if trading else 0
+    return dict(API_RATE_LIMIT_PER_SEC=rate, API_RATE_BURST=burst, API_ORDER_RESERVE=reserve)
+
+
+def _worker_config(config, name: str, index: int, procs: int = 1):
+    """戦略プロセスごとに取引ログ・チェックポイント・JSON ログを分け、レート予算も等分する"""
+    tag = f"{name}-{index}"
+    return config.replace(
+        **_rate_share(config, procs),
+        STRATEGY_NAME=name,
+        TRADE_LOG_DIR=os.path.join(config.TRADE_LOG_DIR, tag),
+        CHECKPOINT_PATH=_tagged(config.CHECKPOINT_PATH, tag),
+        LOG_JSON_FILE=_tagged(config.LOG_JSON_FILE, tag),
+    )
+
+
+def run_multiprocess(config, logger=None, stop=None) -> None:
+    """
+    市場データ1プロセス + MP_STRATEGIES の戦略ごとに1プロセスを起動し、stop（または Ctrl-C）まで待つ。
+    スナップショットは共有メモリのリング経由（pickle はプロセス起動時の config のみ）。
+    MP_PIN_CPUS=true なら各プロセスを別コアへ固定（市場データ = 先頭コア）。
+    API_RATE_LIMIT_PER_SEC / API_RATE_BURST は全プロセスで1つの予算なので、プロセス数で等分して渡す。
+    """
+    config = ensure_config(config)
+    logger = logger or logging.getLogger("DogeBot")
+    names = [n.strip().lower() for n in config.MP_STRATEGIES.split(",") if n.strip()]
+    unknown = [n for n in names if n not in STRATEGIES]
+    if not names or unknown:
+        raise ValueError(f"MP_STRATEGIES: unknown strategy {unknown or names}")
+
+    ctx = mp.get_context("spawn")
+    stop = stop or ctx.Event()
+    ring = SnapshotRing.create(slots=config.MP_RING_SLOTS)
+    pin = config.MP_PIN_CPUS
+    nprocs = len(names) + 1
+    md_config = config.replace(
+        **_rate_share(config, nprocs, trading=False),
+        LOG_JSON_FILE=_tagged(config.LOG_JSON_FILE, "market-data"),
+        EXIT_ENGINE=False, POSITION_STREAM=False, ORDER_PREARM=False,
+    )
+    procs: List[mp.Process] = [
+        ctx.Process(target=_market_data_main, name="market-data",
+                    args=(md_config, ring.name, stop, 0 if pin else None), daemon=True)
+    ]
+    for i, name in enumerate(names):
+        procs.append(ctx.Process(
+            target=_strategy_main, name=f"strategy-{name}-{i}",
+            args=(_worker_config(config, name, i, nprocs), ring.name, stop, i + 1 if pin else None, name),
+            daemon=True,
+        ))
+    for p in procs:
+        p.start()
+    logger.info(f"[multiproc] started {len(procs)} processes (ring={ring.name}, slots={ring.slots})")
+
+    try:
+        while not stop.is_set():
+            dead = [p.name for p in procs if not p.is_alive()]
+            if dead:
+                logger.error(f"[multiproc] process exited: {dead}")
+                break
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=max(5.0, config.POLL_SEC + 1.0))
+            if p.is_alive():
+                p.terminate()
+        ring.close()
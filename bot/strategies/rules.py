@@ -0,0 +1,153 @@
+# bot/strategies/rules.py
+from __future__ import annotations
+import operator
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+
+class P:
+    """しきい値パラメータの参照（compile 時に params から値を埋める）。-P("x") で符号反転"""
+    __slots__ = ("name", "scale")
+
+    def __init__(self, name: str, scale: float = 1.0):
+        self.name = name
+        self.scale = scale
+
+    def __neg__(self) -> "P":
+        return P(self.name, -self.scale)
+
+    def resolve(self, params: Mapping[str, float]) -> float:
+        return float(params[self.name]) * self.scale
+
+    def key(self) -> Tuple[str, float]:
+        return (self.name, self.scale)
+
+
+class C:
+    """条件: feature op threshold（threshold は数値または P）。特徴量が欠損（None / NaN）なら偽"""
+    __slots__ = ("feature", "op", "threshold")
+
+    def __init__(self, feature: str, op: str, threshold):
+        if op not in _OPS:
+            raise ValueError(f"unknown op {op!r}")
+        self.feature = feature
+        self.op = op
+        self.threshold = threshold
+
+    def key(self) -> Tuple[Any, ...]:
+        th = self.threshold.key() if isinstance(self.threshold, P) else float(self.threshold)
+        return (self.feature, self.op, th)
+
+
+class All:
+    """条件の AND（ルールの本体）"""
+    __slots__ = ("conds",)
+
+    def __init__(self, *conds: C):
+        self.conds = conds
+
+
+class RuleSet:
+    """
+    宣言的なエントリー/エグジット規則。
+      features: 規則で使う特徴量名 → indicators のキー候補（先頭から最初に値があるものを使う）
+      rules:    規則名 → All(C(...), ...)
+    compile(params) でしきい値を埋めた CompiledRules を作る（しきい値変更時だけ作り直す）。
+    同じ条件（feature, op, threshold）が複数の規則に出てきても評価は1回。
+    """
+
+    def __init__(self, features: Mapping[str, Sequence[str]], rules: Mapping[str, All]):
+        self.features = {k: tuple(v) for k, v in features.items()}
+        self.rules = dict(rules)
+        for name, rule in self.rules.items():
+            for c in rule.conds:
+                if c.feature not in self.features:
+                    raise ValueError(f"rule {name!r}: unknown feature {c.feature!r}")
+
+    def compile(self, params: Mapping[str, float]) -> "CompiledRules":
+        conds: List[C] = []
+        index: Dict[Tuple[Any, ...], int] = {}
+        rule_idx: Dict[str, Tuple[int, ...]] = {}
+        for name, rule in self.rules.items():
+            ids = []
+            for c in rule.conds:
+                k = c.key()
+                if k not in index:
+                    index[k] = len(conds)
+                    conds.append(c)
+                ids.append(index[k])
+            rule_idx[name] = tuple(ids)
+        feats = sorted({c.feature for c in conds})
+        return CompiledRules(
+            features={f: self.features[f] for f in feats},
+            conds=[(c.feature, c.op, c.threshold.resolve(params) if isinstance(c.threshold, P)
+                    else float(c.threshold)) for c in conds],
+            rules=rule_idx,
+        )
+
+
+class CompiledRules:
+    """
+    compile 済みの規則。
+      evaluate(indicators)      -> {規則名: bool}（ライブ。条件ごとに1回だけ評価）
+      evaluate_arrays(columns)  -> {規則名: bool 配列}（バックテスト。列ごとにベクトル演算）
+    ライブ側はしきい値をリテラルに埋め込んだ関数を生成して使う（条件の解釈ループなし）。
+    ライブとバックテストで同じ定義・同じしきい値を使う。
+    """
+    __slots__ = ("features", "conds", "rules", "evaluate", "source")
+
+    def __init__(self, features: Dict[str, Tuple[str, ...]],
+                 conds: List[Tuple[str, str, float]], rules: Dict[str, Tuple[int, ...]]):
+        self.features = features
+        self.conds = conds
+        self.rules = rules
+        self.source = self._codegen()
+        ns: Dict[str, Any] = {}
+        exec(compile(self.source, "<rules>", "exec"), ns)
+        self.evaluate: Callable[[Mapping[str, Any]], Dict[str, bool]] = ns["evaluate"]
+
+    def _codegen(self) -> str:
+        names = {f: f"f{i}" for i, f in enumerate(self.features)}
+        lines = ["def evaluate(ind):", "    g = ind.get"]
+        for f, keys in self.features.items():
+            v = names[f]
+            lines.append(f"    {v} = g({keys[0]!r})")
+            for k in keys[1:]:
+                lines.append(f"    if {v} is None: {v} = g({k!r})")
+        # 欠損（None）は偽。NaN は比較が常に偽なのでそのまま
+        for i, (f, op, th) in enumerate(self.conds):
+            v = names[f]
+            lines.append(f"    c{i} = {v} is not None and {v} {op} {th!r}")
+        body = ", ".join(
+            f"{name!r}: " + (" and ".join(f"c{i}" for i in ids) if ids else "True")
+            for name, ids in self.rules.items()
+        )
+        lines.append(f"    return {{{body}}}")
+        return "\n".join(lines) + "\n"
+
+    def evaluate_arrays(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """columns: indicators のキー → 1次元配列（欠損は NaN）。全列同じ長さ"""
+        cols: Dict[str, np.ndarray] = {}
+        n = None
+        for name, keys in self.features.items():
+            arr = None
+            for k in keys:
+                if k in columns:
+                    a = np.asarray(columns[k], dtype=np.float64)
+                    arr = a if arr is None else np.where(np.isnan(arr), a, arr)
+            if arr is None:
+                raise KeyError(f"no column for feature {name!r} (tried {keys})")
+            cols[name] = arr
+            n = len(arr) if n is None else n
+        # NaN との比較は常に偽 → 欠損は偽（ライブの None と同じ）
+        with np.errstate(invalid="ignore"):
+            bits = [_OPS[op](cols[f], th) for f, op, th in self.conds]
+        out: Dict[str, np.ndarray] = {}
+        for name, ids in self.rules.items():
+            out[name] = np.logical_and.reduce([bits[i] for i in ids]) if ids else np.ones(n or 0, dtype=bool)
+        return out
@@ -1,122 +1,159 @@
 # bot/strategies/strategy01.py
 from __future__ import annotations
 import logging
+from typing import Any, Dict, Mapping
+
+import numpy as np
+
+from bot.config import ensure_config
+from bot.features.change import stage_stats
+from bot.strategies.rules import All, C, P, RuleSet
+from bot.utils.log_pipeline import event
+from bot.utils.trace import from_indicators as trace_from_indicators
+
+# エントリー/エグジット規則（しきい値 P(...) は apply_config で埋める。ライブとバックテストで共通）
+RULES = RuleSet(
+    features={
+        "rsi": ("rsi",),
+        "depth": ("depth_imbalance", "depth_imb_5"),
+        "taker": ("taker_bias",),
+    },
+    rules={
+        "long": All(C("rsi", "<", P("buy_th")), C("depth", ">", P("depth_thr")), C("taker", ">", P("taker_thr"))),
+        "short": All(C("rsi", ">", P("sell_th")), C("depth", "<", -P("depth_thr")), C("taker", "<", -P("taker_thr"))),
+        "exit_long": All(C("rsi", ">=", P("exit_long"))),
+        "exit_short": All(C("rsi", "<=", P("exit_short"))),
+    },
+)
+
+# シグナル note に載せる特徴量（bot/analytics/performance.py が key=value で読む）
+NOTE_KEYS = (
+    ("depth", ("depth_imbalance", "depth_imb_5")), ("taker", ("taker_bias",)),
+    ("spread_bps", ("spread_bps",)), ("mom1", ("mom_1s",)), ("mom5", ("mom_5s",)),
+    ("vol", ("volatility",)), ("slope", ("trend_slope",)), ("liq", ("liq_ratio",)),
+)
+
 
 class Strategy01:
     """
     RSI + 板厚バランス + 成行バイアス を利用したシンプル戦略
       - 未保有: RSIと特徴量条件を満たせばエントリー
       - 保有:   RSIによるクローズ判定
+    条件は RULES を compile したもの。同じ indicators で should_open / should_close /
+    generate_signal を呼んでも各条件の評価は1サイクル1回。規則が参照する特徴量の値が
+    前サイクルと同じなら評価もしない（前回の結果を使う）。
     """
 
     def __init__(self, config, logger=None):
-        self.config = config
         self.logger = logger or logging.getLogger("DogeBot")
+        self._last_ind = None
+        self._last_key = None
+        self._last_eval: Dict[str, bool] = {}
+        self.apply_config(config)
+
+    # --- しきい値の適用（ホットリロード時も呼ばれる。特徴量の状態には触れない） ---
+    def apply_config(self, config) -> None:
+        self.config = config = ensure_config(config)
 
         # --- RSIしきい値 ---
-        self.buy_th  = float(getattr(config, "RSI_BUY_THRESHOLD", 20))
-        self.sell_th = float(getattr(config, "RSI_SELL_THRESHOLD", 80))
-        self.exit_long  = float(getattr(config, "RSI_EXIT_LONG", 55))
-        self.exit_short = float(getattr(config, "RSI_EXIT_SHORT", 45))
+        self.buy_th  = config.RSI_BUY_THRESHOLD
+        self.sell_th = config.RSI_SELL_THRESHOLD
+        self.exit_long  = config.RSI_EXIT_LONG
+        self.exit_short = config.RSI_EXIT_SHORT
 
         # --- 板厚/成行偏りしきい値（Stage4追加） ---
-        self.depth_thr = float(getattr(config, "DEPTH_IMB_THRESHOLD", 0.15))
-        self.taker_thr = float(getattr(config, "TAKER_BIAS_THRESHOLD", 0.10))
-
-        self.order_size = float(getattr(config, "ORDER_SIZE", 100))
+        self.depth_thr = config.DEPTH_IMB_THRESHOLD
+        self.taker_thr = config.TAKER_BIAS_THRESHOLD
+
+        self.order_size = config.ORDER_SIZE
+
+        # --- 規則をしきい値込みで compile ---
+        self.rules = RULES.compile({
+            "buy_th": self.buy_th, "sell_th": self.sell_th,
+            "exit_long": self.exit_long, "exit_short": self.exit_short,
+            "depth_thr": self.depth_thr, "taker_thr": self.taker_thr,
+        })
+        self._inputs = tuple(k for keys in self.rules.features.values() for k in keys)
+        self._last_ind = None
+        self._last_key = None
+
+    # --- 規則の評価（同じ indicators・同じ入力値なら前回の結果を使う） ---
+    def _evaluate(self, indicators: dict) -> Dict[str, bool]:
+        if indicators is not self._last_ind:
+            key = tuple(map(indicators.get, self._inputs))
+            if key == self._last_key:
+                stage_stats.hit("rules")
+            else:
+                stage_stats.miss("rules")
+                self._last_eval = self.rules.evaluate(indicators)
+                self._last_key = key
+            self._last_ind = indicators
+        return self._last_eval
+
+    def signal_masks(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        バックテスト用: 特徴量の列（indicators のキー → 配列、欠損は NaN）を同じ規則でベクトル評価。
+        return: long / short / exit_long / exit_short の bool 配列（ポジション状態は呼び出し側で扱う）
+        """
+        return self.rules.evaluate_arrays(columns)
 
     # --- 開くべきか ---
     def should_open_position(self, indicators: dict, position: dict) -> bool:
-        rsi   = indicators.get("rsi")
-        depth = indicators.get("depth_imbalance") or indicators.get("depth_imb_5")
-        taker = indicators.get("taker_bias")
-
-        is_open = bool(position and position.get("is_open"))
-        if rsi is None or is_open:
-            self.logger.debug(f"[Strategy01] skip open: rsi={rsi}, is_open={is_open}")
+        if (position and position.get("is_open")) or indicators.get("rsi") is None:
             return False
-
-        # --- ロング条件 ---
-        long_ok = (
-            rsi < self.buy_th and
-            depth is not None and depth > +self.depth_thr and
-            taker is not None and taker > +self.taker_thr
-        )
-
-        # --- ショート条件 ---
-        short_ok = (
-            rsi > self.sell_th and
-            depth is not None and depth < -self.depth_thr and
-            taker is not None and taker < -self.taker_thr
-        )
-
-        self.logger.debug(
-            f"[Strategy01.should_open] rsi={rsi}, depth={depth}, taker={taker}, "
-            f"long_ok={long_ok}, short_ok={short_ok}"
-        )
-
-        return long_ok or short_ok
+        r = self._evaluate(indicators)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            event(self.logger, "should_open", logging.DEBUG,
+                  rsi=indicators.get("rsi"), long_ok=r["long"], short_ok=r["short"])
+        return r["long"] or r["short"]
+
+    # --- シグナルの近さ（発注の作り置き用） ---
+    def pending_side(self, indicators: dict, band: float) -> str | None:
+        """未保有前提。RSI がエントリーしきい値から band 以内ならその向き（両方なら近い方）、無ければ None"""
+        rsi = indicators.get("rsi")
+        if rsi is None or band <= 0:
+            return None
+        to_buy, to_sell = rsi - self.buy_th, self.sell_th - rsi
+        if min(to_buy, to_sell) > band:
+            return None
+        return "Buy" if to_buy <= to_sell else "Sell"
 
     # --- シグナル生成（向きと枚数） ---
     def generate_signal(self, indicators: dict, position: dict) -> dict:
-        rsi        = indicators.get("rsi")
-        depth      = indicators.get("depth_imbalance") or indicators.get("depth_imb_5")
-        taker      = indicators.get("taker_bias")
-        spread_bps = indicators.get("spread_bps")
-        mom_1      = indicators.get("mom_1s")
-        mom_5      = indicators.get("mom_5s")
-        vol        = indicators.get("volatility")
-        slope      = indicators.get("trend_slope")
-        liq        = indicators.get("liq_ratio")
-
-        side = "None"
-        if rsi is not None:
-            if (
-                rsi < self.buy_th
-                and depth is not None and depth > +self.depth_thr
-                and taker is not None and taker > +self.taker_thr
-            ):
-                side = "Buy"
-            elif (
-                rsi > self.sell_th
-                and depth is not None and depth < -self.depth_thr
-                and taker is not None and taker < -self.taker_thr
-            ):
-                side = "Sell"
-
-        # noteを拡張
-        note = (
-            f"rsi={rsi if rsi is not None else 'NA'}, "
-            f"depth={depth}, taker={taker}, "
-            f"spread_bps={spread_bps}, mom1={mom_1}, mom5={mom_5}, "
-            f"vol={vol}, slope={slope}, liq={liq}"
-        )
-
-        self.logger.debug(f"[Strategy01.generate_signal] side={side}, note={note}")
+        r = self._evaluate(indicators)
+        side = "Buy" if r["long"] else "Sell" if r["short"] else "None"
+
+        # noteを拡張（シグナル生成時のみ）
+        rsi = indicators.get("rsi")
+        parts = [f"rsi={rsi if rsi is not None else 'NA'}"]
+        for name, keys in NOTE_KEYS:
+            v = next((indicators[k] for k in keys if indicators.get(k) is not None), None)
+            parts.append(f"{name}={v}")
+        note = ", ".join(parts)
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            event(self.logger, "signal", logging.DEBUG, side=side, note=note)
 
         return {
             "side": side,
             "qty": self.order_size,
             "maker": False,
             "note": note,
+            "trace": trace_from_indicators(indicators),
         }
 
     # --- 閉じるべきか ---
     def should_close_position(self, indicators: dict, position: dict) -> bool:
-        rsi = indicators.get("rsi")
-        if rsi is None or not position or not position.get("is_open"):
-            self.logger.debug(f"[Strategy01.should_close] skip close: rsi={rsi}, position={position}")
+        if not position or not position.get("is_open") or indicators.get("rsi") is None:
             return False
 
         side = position.get("side")
-        if side == "Buy":
-            close_ok = rsi >= self.exit_long
-        elif side == "Sell":
-            close_ok = rsi <= self.exit_short
-        else:
-            close_ok = False
-
-        self.logger.debug(f"[Strategy01.should_close] side={side}, rsi={rsi}, close_ok={close_ok}")
+        r = self._evaluate(indicators)
+        close_ok = r["exit_long"] if side == "Buy" else r["exit_short"] if side == "Sell" else False
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            event(self.logger, "should_close", logging.DEBUG,
+                  side=side, rsi=indicators.get("rsi"), close_ok=close_ok)
         return close_ok
 
 # FIXME: RSI/BB に基づくクローズ条件（Strategy02）導入予定
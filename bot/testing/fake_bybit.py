@@ -0,0 +1,462 @@
+# bot/testing/fake_bybit.py
+from __future__ import annotations
+import base64
+import hashlib
+import itertools
+import json
+import math
+import random
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from bot.exchange.types import OrderBook
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_LEVELS = 50
+_BAR_MS = 60_000
+
+
+def _fmt(x: float) -> str:
+    return format(float(x), ".10g")
+
+
+class _Symbol:
+    """1シンボル分の板・価格・1分足・ポジション"""
+
+    def __init__(self, symbol: str, seed: int, price: float, tick: float, base_qty: float,
+                 sigma: float, script: Optional[Sequence[Tuple[float, Any]]] = None, history: int = 200):
+        self.symbol = symbol
+        self.rng = np.random.default_rng(seed)
+        self.price = price
+        self.tick = tick
+        self.base_qty = base_qty
+        self.sigma = sigma
+        self.script = list(script) if script is not None else None
+        self.step = 0
+        self.bid_px = self.bid_qty = self.ask_px = self.ask_qty = np.empty(0)
+        self.ts_ms = int(time.time() * 1000)
+        self.bars: List[List[float]] = []
+        self.pos_size = 0.0     # 符号付き（+ = Buy）
+        self.pos_entry = 0.0
+        self._seed_history(history)
+        self.update()
+
+    def _seed_history(self, n: int) -> None:
+        """起動直後から RSI 等が出るよう、過去 n 本の1分足を同じ乱数系列で作っておく"""
+        now = self.ts_ms - self.ts_ms % _BAR_MS
+        rets = self.rng.normal(0.0, self.sigma * 8, size=n)
+        closes = self.price * np.exp(np.cumsum(rets) - rets.sum())
+        opens = np.concatenate([[closes[0]], closes[:-1]])
+        for i in range(n):
+            o, c = float(opens[i]), float(closes[i])
+            self.bars.append([now - (n - i) * _BAR_MS, o, max(o, c), min(o, c), c, 0.0])
+        self.price = float(closes[-1])
+
+    def update(self) -> None:
+        self.ts_ms = int(time.time() * 1000)
+        if self.script is not None:
+            price, book = self.script[min(self.step, len(self.script) - 1)]
+            self.price = float(price)
+            ob = OrderBook.coerce(book)
+            self.bid_px, self.bid_qty = ob.bids.px, ob.bids.qty
+            self.ask_px, self.ask_qty = ob.asks.px, ob.asks.qty
+        else:
+            self.price = max(self.tick, self.price * math.exp(self.rng.normal(0.0, self.sigma)))
+            bb = math.floor(self.price / self.tick) * self.tick
+            k = np.arange(_LEVELS)
+            self.bid_px = bb - k * self.tick
+            self.ask_px = bb + (k + 1) * self.tick
+            # 板厚の偏りもゆっくり揺らす（depth_imbalance が動くように）
+            tilt = math.sin(self.step / 50.0) * 0.5
+            self.bid_qty = self.rng.lognormal(math.log(self.base_qty) + tilt, 0.5, _LEVELS)
+            self.ask_qty = self.rng.lognormal(math.log(self.base_qty) - tilt, 0.5, _LEVELS)
+        self.step += 1
+        self._on_price(self.price, self.ts_ms)
+
+    def _on_price(self, price: float, ts_ms: int) -> None:
+        start = ts_ms - ts_ms % _BAR_MS
+        bar = self.bars[-1] if self.bars else None
+        if bar is None or start > bar[0]:
+            self.bars.append([start, price, price, price, price, 0.0])
+            if len(self.bars) > 1000:
+                del self.bars[:-1000]
+        else:
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+
+    def fill(self, side: str, qty: float) -> float:
+        """成行を板に当てて平均約定価格を返し、ポジションを更新する"""
+        px, q = (self.ask_px, self.ask_qty) if side == "Buy" else (self.bid_px, self.bid_qty)
+        if not len(px):
+            avg = self.price
+        else:
+            cum = np.cumsum(q)
+            take = np.minimum(q, np.maximum(qty - (cum - q), 0.0))
+            filled = float(take.sum())
+            avg = float(px @ take / filled) if filled > 0 else float(px[0])
+        if self.bars:
+            self.bars[-1][5] += qty
+        signed = qty if side == "Buy" else -qty
+        new = self.pos_size + signed
+        if abs(new) < 1e-12:
+            self.pos_size, self.pos_entry = 0.0, 0.0
+        elif self.pos_size == 0 or (self.pos_size > 0) != (new > 0):
+            self.pos_size, self.pos_entry = new, avg
+        elif abs(new) > abs(self.pos_size):
+            self.pos_entry = (self.pos_entry * abs(self.pos_size) + avg * qty) / abs(new)
+            self.pos_size = new
+        else:
+            self.pos_size = new
+        return avg
+
+    def position_row(self) -> Dict[str, str]:
+        side = "Buy" if self.pos_size > 0 else "Sell" if self.pos_size < 0 else ""
+        return {"symbol": self.symbol, "side": side, "size": _fmt(abs(self.pos_size)),
+                "avgPrice": _fmt(self.pos_entry)}
+
+
+class _WsClient:
+    __slots__ = ("wfile", "lock", "topics", "alive")
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+        self.topics: set = set()
+        self.alive = True
+
+    def send(self, obj: Dict[str, Any]) -> None:
+        data = json.dumps(obj).encode()
+        n = len(data)
+        if n < 126:
+            head = struct.pack("!BB", 0x81, n)
+        elif n < 65536:
+            head = struct.pack("!BBH", 0x81, 126, n)
+        else:
+            head = struct.pack("!BBQ", 0x81, 127, n)
+        with self.lock:
+            self.wfile.write(head + data)
+            self.wfile.flush()
+
+
+class FakeBybitServer:
+    """
+    Bybit v5 のローカル代替（REST + private / public WS を同じポートで提供）。負荷試験・結合テスト用。
+      REST: /v5/market/tickers, /v5/market/orderbook, /v5/market/kline,
+            /v5/position/list, /v5/order/create
+      WS:   ws://host:port/v5/private（auth / subscribe / ping。約定時に execution → position を push）
+            ws://host:port/v5/public/linear（価格更新ごとに tickers.{symbol}、約定時に publicTrade.{symbol}）
+    市場データ:
+      - 既定はシード付きの幾何ランダムウォーク + 50 レベルの板（シンボルごとに独立・再現可能）
+      - scripts={symbol: [(price, book), ...]} で台本（録画から作るなら script_from_recording）
+      - updates_per_sec > 0 ならバックグラウンドで N シンボル × M 回/秒 更新、
+        0 なら板リクエストごとに1ステップ進める（タイミングに依存しない決定的モード）
+    障害注入: latency_ms + jitter_ms の遅延、error_rate で HTTP 503 / retCode 10006、
+              rate_limit_per_sec を超えたら retCode 10006。
+    with FakeBybitServer(["DOGEUSDT"]) as srv: config.replace(BYBIT_BASE_URL=srv.url, ...)
+    """
+
+    def __init__(self, symbols: Iterable[str] = ("DOGEUSDT",), updates_per_sec: float = 10.0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_per_sec: float = 0.0, seed: int = 0, price: float = 0.2, tick: float = 0.00001,
+                 base_qty: float = 50_000.0, sigma: float = 0.0005,
+                 scripts: Optional[Dict[str, Sequence[Tuple[float, Any]]]] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        scripts = scripts or {}
+        self.markets: Dict[str, _Symbol] = {
+            s: _Symbol(s, seed + i, price, tick, base_qty, sigma, scripts.get(s))
+            for i, s in enumerate(symbols)
+        }
+        self.updates_per_sec = float(updates_per_sec)
+        self.latency = float(latency_ms) / 1000.0
+        self.jitter = float(jitter_ms) / 1000.0
+        self.error_rate = float(error_rate)
+        self.rate_limit = float(rate_limit_per_sec)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._hits: List[float] = []
+        self._order_ids = itertools.count(1)
+        self._ws: List[_WsClient] = []
+        self._stop = threading.Event()
+
+        self.requests: Counter = Counter()
+        self.errors_injected = 0
+        self.rate_limited = 0
+        self.orders = 0
+        self.updates = 0
+        self.ws_sent = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.headers.get("Upgrade", "").lower() == "websocket":
+                    server._serve_ws(self)
+                    return
+                server._respond(self, "GET", None)
+
+            def do_POST(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                server._respond(self, "POST", self.rfile.read(n))
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        addr = f"{host}:{self._httpd.server_address[1]}"
+        self.url = f"http://{addr}"
+        self.ws_url = f"ws://{addr}/v5/private"
+        self.ws_public_url = f"ws://{addr}/v5/public/linear"
+        self._threads = [threading.Thread(target=self._httpd.serve_forever, name="fake-bybit", daemon=True)]
+        if self.updates_per_sec > 0:
+            self._threads.append(threading.Thread(target=self._tick_loop, name="fake-bybit-ticker", daemon=True))
+
+    # ---- ライフサイクル ----
+    def start(self) -> "FakeBybitServer":
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for c in list(self._ws):
+            c.alive = False
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": dict(self.requests), "errors_injected": self.errors_injected,
+            "rate_limited": self.rate_limited, "orders": self.orders,
+            "updates": self.updates, "ws_sent": self.ws_sent,
+        }
+
+    # ---- 市場の更新 ----
+    def _tick_loop(self) -> None:
+        period = 1.0 / self.updates_per_sec
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            with self._lock:
+                for m in self.markets.values():
+                    m.update()
+                self.updates += len(self.markets)
+                ticks = [(m.symbol, m.price) for m in self.markets.values()]
+            for symbol, price in ticks:
+                self._publish_ticker(symbol, price)
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif delay < -1.0:
+                next_t = time.monotonic()  # 大きく遅れたら追いつこうとしない
+
+    # ---- REST ----
+    def _respond(self, h: BaseHTTPRequestHandler, method: str, body: Optional[bytes]) -> None:
+        url = urlparse(h.path)
+        self.requests[url.path] += 1
+        status, payload = self._route(method, url.path, {k: v[0] for k, v in parse_qs(url.query).items()}, body)
+        out = json.dumps(payload).encode()
+        h.send_response(status)
+        h.send_header("Content-Type", "application/json")
+        h.send_header("Content-Length", str(len(out)))
+        h.end_headers()
+        h.wfile.write(out)
+
+    @staticmethod
+    def _ok(result: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        return 200, {"retCode": 0, "retMsg": "OK", "result": result, "time": int(time.time() * 1000)}
+
+    @staticmethod
+    def _err(code: int, msg: str, status: int = 200) -> Tuple[int, Dict[str, Any]]:
+        return status, {"retCode": code, "retMsg": msg, "result": {}, "time": int(time.time() * 1000)}
+
+    def _inject(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            delay = self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+            err = self.error_rate > 0 and self._rng.random() < self.error_rate
+            flip = self._rng.random() < 0.5
+            limited = False
+            if self.rate_limit > 0:
+                now = time.monotonic()
+                self._hits = [t for t in self._hits if now - t < 1.0]
+                limited = len(self._hits) >= self.rate_limit
+                if not limited:
+                    self._hits.append(now)
+        if delay > 0:
+            time.sleep(delay)
+        if limited:
+            self.rate_limited += 1
+            return self._err(10006, "Too many visits!")
+        if err:
+            self.errors_injected += 1
+            return self._err(10016, "Service Unavailable", 503) if flip else self._err(10006, "Too many visits!")
+        return None
+
+    def _route(self, method: str, path: str, q: Dict[str, str], body: Optional[bytes]):
+        injected = self._inject()
+        if injected is not None:
+            return injected
+        if method == "POST":
+            try:
+                q = json.loads(body or b"{}")
+            except ValueError:
+                return self._err(10001, "bad json", 400)
+        m = self.markets.get(q.get("symbol", ""))
+        if m is None:
+            return self._err(10001, f"unknown symbol {q.get('symbol')!r}")
+
+        with self._lock:
+            if path == "/v5/market/tickers":
+                return self._ok({"category": q.get("category", "linear"), "list": [{
+                    "symbol": m.symbol, "lastPrice": _fmt(m.price),
+                    "bid1Price": _fmt(m.bid_px[0]) if len(m.bid_px) else "",
+                    "ask1Price": _fmt(m.ask_px[0]) if len(m.ask_px) else "",
+                }]})
+            if path == "/v5/market/orderbook":
+                if self.updates_per_sec <= 0:
+                    m.update()
+                    self.updates += 1
+                    self._publish_ticker(m.symbol, m.price)
+                n = min(int(q.get("limit", 50)), _LEVELS)
+                return self._ok({
+                    "s": m.symbol,
+                    "b": [[_fmt(p), _fmt(x)] for p, x in zip(m.bid_px[:n].tolist(), m.bid_qty[:n].tolist())],
+                    "a": [[_fmt(p), _fmt(x)] for p, x in zip(m.ask_px[:n].tolist(), m.ask_qty[:n].tolist())],
+                    "ts": m.ts_ms, "u": m.step,
+                })
+            if path == "/v5/market/kline":
+                limit = int(q.get("limit", 200))
+                rows = m.bars[-limit:][::-1]
+                return self._ok({"symbol": m.symbol, "category": q.get("category", "linear"),
+                                 "list": [[str(int(b[0]))] + [_fmt(x) for x in b[1:6]] + ["0"] for b in rows]})
+            if path == "/v5/position/list":
+                return self._ok({"category": q.get("category", "linear"), "list": [m.position_row()]})
+            if path == "/v5/order/create" and method == "POST":
+                side = q.get("side")
+                try:
+                    qty = float(q.get("qty"))
+                except (TypeError, ValueError):
+                    return self._err(10001, "bad qty")
+                if side not in ("Buy", "Sell") or qty <= 0:
+                    return self._err(10001, "bad order")
+                price = m.fill(side, qty)
+                self.orders += 1
+                oid = f"fake-{next(self._order_ids)}"
+                pos = m.position_row()
+        if path == "/v5/order/create" and method == "POST":
+            self._publish("execution", [{"symbol": m.symbol, "side": side, "execQty": _fmt(qty),
+                                         "execPrice": _fmt(price), "orderId": oid}])
+            self._publish("position", [{**pos, "entryPrice": pos["avgPrice"]}])
+            self._publish(f"publicTrade.{m.symbol}", [{"s": m.symbol, "S": side, "v": _fmt(qty),
+                                                       "p": _fmt(price), "T": int(time.time() * 1000)}])
+            return self._ok({"orderId": oid, "orderLinkId": "", "avgPrice": _fmt(price)})
+        return self._err(10001, f"unknown path {path}", 404)
+
+    # ---- private / public WS（RFC6455 の最小実装） ----
+    def _publish_ticker(self, symbol: str, price: float) -> None:
+        topic = f"tickers.{symbol}"
+        if any(topic in c.topics for c in self._ws):
+            self._publish(topic, {"symbol": symbol, "lastPrice": _fmt(price)})
+
+    def _publish(self, topic: str, data: Any) -> None:
+        msg = {"topic": topic, "creationTime": int(time.time() * 1000), "data": data}
+        for c in list(self._ws):
+            if c.alive and topic in c.topics:
+                try:
+                    c.send(msg)
+                    self.ws_sent += 1
+                except OSError:
+                    c.alive = False
+
+    def _serve_ws(self, h: BaseHTTPRequestHandler) -> None:
+        key = h.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        h.send_response(101, "Switching Protocols")
+        h.send_header("Upgrade", "websocket")
+        h.send_header("Connection", "Upgrade")
+        h.send_header("Sec-WebSocket-Accept", accept)
+        h.end_headers()
+        h.wfile.flush()
+        client = _WsClient(h.wfile)
+        self._ws.append(client)
+        try:
+            while client.alive and not self._stop.is_set():
+                frame = self._read_frame(h.rfile)
+                if frame is None:
+                    break
+                opcode, data = frame
+                if opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    with client.lock:
+                        h.wfile.write(struct.pack("!BB", 0x8A, len(data)) + data)
+                        h.wfile.flush()
+                    continue
+                if opcode != 0x1:
+                    continue
+                try:
+                    req = json.loads(data)
+                except ValueError:
+                    continue
+                op = req.get("op")
+                if op == "subscribe":
+                    client.topics.update(req.get("args") or [])
+                if op in ("auth", "subscribe", "ping"):
+                    client.send({"op": "pong" if op == "ping" else op, "success": True, "ret_msg": ""})
+        except OSError:
+            pass
+        finally:
+            client.alive = False
+            if client in self._ws:
+                self._ws.remove(client)
+            h.close_connection = True
+
+    @staticmethod
+    def _read_frame(rfile) -> Optional[Tuple[int, bytes]]:
+        head = rfile.read(2)
+        if len(head) < 2:
+            return None
+        b0, b1 = head
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", rfile.read(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", rfile.read(8))[0]
+        mask = rfile.read(4) if b1 & 0x80 else None
+        data = rfile.read(n)
+        if mask:
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        return b0 & 0x0F, data
+
+
+def script_from_recording(paths: List[str]) -> List[Tuple[float, Any]]:
+    """MarketRecorder の録画から [(price, book), ...] の台本を作る（板ごとに直前の価格を対応付け）"""
+    from bot.utils.recorder import read_frames
+    out: List[Tuple[float, Any]] = []
+    last = 0.0
+    for _, _, channel, payload in read_frames(paths):
+        if channel == "get_last_price" and isinstance(payload, (int, float)):
+            last = float(payload)
+        elif channel == "get_orderbook" and payload:
+            book = OrderBook.coerce(payload)
+            price = last or (sum(book.best) / 2 if book.best else 0.0)
+            if price > 0:
+                out.append((price, book))
+    return out
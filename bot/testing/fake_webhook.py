@@ -0,0 +1,80 @@
+# bot/testing/fake_webhook.py
+from __future__ import annotations
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+class LocalWebhookServer:
+    """
+    Discord Webhook のローカル代替（DiscordNotifier の動作確認用）。
+      - POST された JSON を received に溜める
+      - rate_limit 件 / window_sec を超えると 429 + retry_after を返す
+      - 成功時は X-RateLimit-Remaining / X-RateLimit-Reset-After ヘッダを付与
+    with LocalWebhookServer() as srv: DiscordNotifier(srv.url) ...
+    """
+
+    def __init__(self, rate_limit: int = 5, window_sec: float = 2.0, host: str = "127.0.0.1", port: int = 0):
+        self.rate_limit = int(rate_limit)
+        self.window_sec = float(window_sec)
+        self.received: List[Dict[str, Any]] = []
+        self.rejected = 0
+        self._hits: List[float] = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(n)
+                status, headers, out = server._handle(body)
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self._httpd.server_address[1]}/webhook"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def _handle(self, body: bytes):
+        now = time.monotonic()
+        with self._lock:
+            self._hits = [t for t in self._hits if now - t < self.window_sec]
+            if len(self._hits) >= self.rate_limit:
+                self.rejected += 1
+                retry = self.window_sec - (now - self._hits[0])
+                return 429, {"Retry-After": f"{retry:.3f}"}, json.dumps(
+                    {"message": "You are being rate limited.", "retry_after": retry, "global": False}
+                ).encode()
+            self._hits.append(now)
+            remaining = self.rate_limit - len(self._hits)
+            reset = self.window_sec - (now - self._hits[0])
+            try:
+                self.received.append(json.loads(body or b"{}"))
+            except ValueError:
+                return 400, {}, b"{}"
+        return 204, {"X-RateLimit-Remaining": str(remaining),
+                     "X-RateLimit-Reset-After": f"{reset:.3f}"}, b""
+
+    def start(self) -> "LocalWebhookServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,170 @@
+# bot/utils/checkpoint.py
+from __future__ import annotations
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+MAGIC = b"DOGECKPT"
+VERSION = 1
+
+_SIDE_TO_CODE = {None: 0, "Buy": 1, "Sell": -1}
+_CODE_TO_SIDE = {v: k for k, v in _SIDE_TO_CODE.items()}
+
+# 先頭のヘッダ部（maxlen を読んでから全体レイアウトを決める）
+_HEADER = [
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("maxlen", "<u4"),
+    ("written_at", "<f8"),
+]
+
+
+def _layout(maxlen: int) -> np.dtype:
+    """固定レイアウト（リトルエンディアン, パディング無し）"""
+    return np.dtype(_HEADER + [
+        # FeatureState の保持区間（古い順に n 件）
+        ("n", "<u4"),
+        ("prices", "<f8", (maxlen,)),
+        ("times", "<f8", (maxlen,)),
+        # PositionHandler
+        ("pos_in", "i1"),
+        ("pos_side", "i1"),
+        # OrderExecutor._entry_snapshot
+        ("snap_has", "i1"),
+        ("snap_side", "i1"),
+        ("snap_maker", "i1"),
+        ("snap_qty", "<f8"),
+        ("snap_price", "<f8"),
+        ("snap_fee", "<f8"),
+    ])
+
+
+class Checkpoint:
+    """
+    ウォームリスタート用のチェックポイント。
+      - 特徴量のリングバッファ（price/time）、PositionHandler の内部状態、
+        エントリー手数料スナップショットを固定レイアウトのバイナリに保存
+      - 書き込みは tmp へ memmap → flush/fsync → os.replace でアトミックに差し替え
+      - 読み込みは memmap（パース無し）。max_age_sec より古ければ使わない
+    """
+
+    def __init__(self, path: str = "logs/checkpoint.bin", every_sec: float = 30.0,
+                 max_age_sec: float = 300.0, logger=None):
+        self.path = path
+        self.every_sec = float(every_sec)
+        self.max_age_sec = float(max_age_sec)
+        self.logger = logger
+        self._last_save = 0.0
+
+    # ---- 保存 ----
+    def due(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - self._last_save >= self.every_sec
+
+    def save(self, feature_state, position_handler=None, order_executor=None,
+             now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        # 保持中の区間だけ書く（FeatureState は秒で切るので件数は可変）
+        maxlen = max(len(feature_state), 1)
+        rec = np.zeros(1, dtype=_layout(maxlen))[0]
+        rec["magic"] = MAGIC
+        rec["version"] = VERSION
+        rec["maxlen"] = maxlen
+        rec["written_at"] = now
+
+        n = len(feature_state)
+        rec["n"] = n
+        if n:
+            rec["prices"][:n] = feature_state.prices
+            rec["times"][:n] = feature_state.times
+
+        if position_handler is not None:
+            rec["pos_in"] = 1 if position_handler.in_position else 0
+            rec["pos_side"] = _SIDE_TO_CODE.get(position_handler.side, 0)
+
+        snap = getattr(order_executor, "_entry_snapshot", None) if order_executor else None
+        if snap:
+            rec["snap_has"] = 1
+            rec["snap_side"] = _SIDE_TO_CODE.get(snap.get("side"), 0)
+            rec["snap_maker"] = 1 if snap.get("maker") else 0
+            rec["snap_qty"] = float(snap.get("qty", 0.0))
+            rec["snap_price"] = float(snap.get("price", 0.0))
+            rec["snap_fee"] = float(snap.get("fee", 0.0))
+
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        mm = np.memmap(tmp, dtype=rec.dtype, mode="w+", shape=(1,))
+        mm[0] = rec
+        mm.flush()
+        del mm
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._last_save = now
+
+    # ---- 読み込み ----
+    def load(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """新鮮なチェックポイントがあれば dict で返す。無い/古い/壊れている場合は None"""
+        if not os.path.exists(self.path):
+            return None
+        now = time.time() if now is None else now
+        try:
+            head = np.memmap(self.path, dtype=np.dtype(_HEADER), mode="r", shape=(1,))[0]
+            if bytes(head["magic"]) != MAGIC or int(head["version"]) != VERSION:
+                raise ValueError("layout mismatch")
+            dt = _layout(int(head["maxlen"]))
+            if os.path.getsize(self.path) != dt.itemsize:
+                raise ValueError("size mismatch")
+            rec = np.memmap(self.path, dtype=dt, mode="r", shape=(1,))[0]
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"[Checkpoint] ignored {self.path}: {e!r}")
+            return None
+
+        age = now - float(rec["written_at"])
+        if age > self.max_age_sec or age < 0:
+            if self.logger:
+                self.logger.info(f"[Checkpoint] stale ({age:.0f}s old), cold start")
+            return None
+
+        n = int(rec["n"])
+        snap = None
+        if rec["snap_has"]:
+            snap = {
+                "side": _CODE_TO_SIDE.get(int(rec["snap_side"])),
+                "qty": float(rec["snap_qty"]),
+                "price": float(rec["snap_price"]),
+                "fee": float(rec["snap_fee"]),
+                "maker": bool(rec["snap_maker"]),
+            }
+        return {
+            "written_at": float(rec["written_at"]),
+            "age": age,
+            "prices": np.array(rec["prices"][:n]),
+            "times": np.array(rec["times"][:n]),
+            "in_position": bool(rec["pos_in"]),
+            "side": _CODE_TO_SIDE.get(int(rec["pos_side"])),
+            "entry_snapshot": snap,
+        }
+
+    def restore(self, feature_state, position_handler=None, order_executor=None) -> bool:
+        """load() 結果を各コンポーネントへ反映。反映できたら True"""
+        data = self.load()
+        if data is None:
+            return False
+        feature_state.clear()
+        feature_state.extend(data["times"], data["prices"])
+        if position_handler is not None:
+            position_handler.restore_state(data["in_position"], data["side"])
+        if order_executor is not None:
+            order_executor._entry_snapshot = data["entry_snapshot"]
+        if self.logger:
+            self.logger.info(
+                f"[Checkpoint] restored {len(data['prices'])} prices, "
+                f"in_position={data['in_position']} side={data['side']} (age {data['age']:.0f}s)"
+            )
+        return True
@@ -0,0 +1,252 @@
+# bot/utils/exit_engine.py
+from __future__ import annotations
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from bot.exchange.types import Position
+from bot.utils.log_pipeline import event
+from bot.utils.trace import new_trace_id, now
+
+_INF = math.inf
+# 決済が失敗したときの再試行間隔（ティックごとに発注し直さない）
+_RETRY_SEC = 1.0
+
+
+def _f(v, default: float = 0.0) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def exit_levels(config) -> tuple[float, float, float]:
+    """
+    (tp, sl, trail) を比率で返す（0 = 無効）。
+      TP_PCT / SL_PCT / TRAIL_PCT はパーセント（1.0 = 1%）。
+      TAKE_PROFIT_PCT / STOP_LOSS_PCT（比率。0.03 = 3%）は任意の上書きで、0 より大きければそちらを使う。
+    """
+    tp = config.TAKE_PROFIT_PCT if config.TAKE_PROFIT_PCT > 0 else config.TP_PCT / 100.0
+    sl = config.STOP_LOSS_PCT if config.STOP_LOSS_PCT > 0 else config.SL_PCT / 100.0
+    return tp, sl, config.TRAIL_PCT / 100.0
+
+
+class ExitEngine:
+    """
+    保有中ポジションの保護的イグジット（利確・損切・トレーリングストップ）。戦略サイクルとは独立に動く。
+      - arm(side, qty, entry): エントリー時にトリガー価格を一度だけ計算しておく
+          Buy:  tp = entry*(1+tp), stop = entry*(1-sl)   Sell: 上下反転
+      - on_price(price): 価格更新ごとに呼ぶ。比較のみ（トレーリングは高値/安値更新時だけ stop を寄せる）
+      - 発火したら OrderExecutor.close_position(reason="tp"|"sl"|"trail") → 成功したら PositionHandler.mark_closed()。
+        失敗（まだ保有中）なら同じトリガーで張り直し、_RETRY_SEC 後の価格で再試行（連続失敗の最初に alert）
+      - stream（public WS の tickers / publicTrade）があれば専用スレッドで受けた価格ごとに評価。
+        無くても BotRunner が毎サイクルの価格を on_price に渡す
+      - lock は BotRunner の売買判定と共有（同じポジションを戦略とエンジンで二重に閉じない）
+    実運用では決済数量は PositionTracker の実ポジ（stream のキャッシュ）に従い、実ポジが既にフラットなら発注しない。
+    決済価格は発火した価格（trace の ref_price）を使い、発火から送信までに REST を挟まない。
+    """
+
+    def __init__(self, config, order_executor, position_handler, tracker=None, stream=None,
+                 symbol: Optional[str] = None, logger=None, alert: Optional[Callable[[str], Any]] = None):
+        self.order_executor = order_executor
+        self.position_handler = position_handler
+        self.tracker = tracker
+        self.stream = stream
+        self.symbol = symbol or config.SYMBOL
+        self.logger = logger or logging.getLogger(__name__)
+        self.alert = alert
+        self.lock = threading.RLock()
+
+        self.enabled = config.EXIT_ENGINE
+        self.is_dry = config.DRY_RUN
+        self.tp_pct, self.sl_pct, self.trail_pct = exit_levels(config)
+
+        # 保有中のトリガー（arm で前計算）
+        self.armed = False
+        self._long = True
+        self._side: Optional[str] = None
+        self._qty = 0.0
+        self._entry = 0.0
+        self._tp = _INF
+        self._stop = -_INF
+        self._best = 0.0
+        self._trail_k = 0.0
+        self._stop_reason = "sl"
+        self._retry_at = 0.0
+        self._failing = False
+
+        self._stop_evt = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.fired = 0
+        self.failed = 0
+        self.ticks = 0
+        self.last_price = 0.0
+
+    # ---- ライフサイクル ----
+    def start(self) -> "ExitEngine":
+        if self.enabled and self.stream is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="exit-engine", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop_evt.set()
+        if self.stream is not None and hasattr(self.stream, "close"):
+            self.stream.close()
+
+    def apply_config(self, config) -> None:
+        """TP/SL/トレーリング幅のホットリロード。保有中なら現在の建値で張り直す（トレールの高値は引き継ぐ）"""
+        with self.lock:
+            self.tp_pct, self.sl_pct, self.trail_pct = exit_levels(config)
+            if self.armed:
+                best = self._best
+                self.arm(self._side, self._qty, self._entry)
+                self._track(best)
+
+    def _loop(self) -> None:
+        while not self._stop_evt.is_set():
+            try:
+                msg = self.stream.recv(timeout=0.5)
+            except Exception as e:
+                self.logger.warning(f"[ExitEngine] stream error: {e!r}")
+                time.sleep(1.0)
+                continue
+            if msg:
+                self.on_message(msg)
+
+    # ---- トリガー ----
+    def arm(self, side: Optional[str], qty: float, entry: float) -> bool:
+        """エントリー（または再起動時の同期）でトリガー価格を前計算する"""
+        qty, entry = _f(qty), _f(entry)
+        if not self.enabled or side not in ("Buy", "Sell") or qty <= 0 or entry <= 0:
+            return False
+        tp, sl, trail = self.tp_pct, self.sl_pct, self.trail_pct
+        with self.lock:
+            self._side, self._qty, self._entry = side, qty, entry
+            self._long = side == "Buy"
+            self._best = entry
+            self._stop_reason = "sl"
+            self._retry_at, self._failing = 0.0, False
+            if self._long:
+                self._tp = entry * (1.0 + tp) if tp > 0 else _INF
+                self._stop = entry * (1.0 - sl) if 0 < sl < 1 else -_INF
+                self._trail_k = 1.0 - trail if 0 < trail < 1 else 0.0
+            else:
+                self._tp = entry * (1.0 - tp) if 0 < tp < 1 else -_INF
+                self._stop = entry * (1.0 + sl) if sl > 0 else _INF
+                self._trail_k = 1.0 + trail if trail > 0 else 0.0
+            self.armed = True
+        event(self.logger, "exit_armed", symbol=self.symbol, side=side, qty=qty, entry=entry,
+              tp=self._tp, stop=self._stop, trail_pct=trail)
+        return True
+
+    def arm_from(self, snapshot: Optional[dict] = None, position=None) -> bool:
+        """OrderExecutor のエントリースナップショット（無ければ実ポジの建値）から arm"""
+        if snapshot:
+            return self.arm(snapshot.get("side"), snapshot.get("qty"), snapshot.get("price"))
+        if position is not None and position.get("is_open"):
+            return self.arm(position.get("side"), position.get("size"), position.get("entry_price"))
+        return False
+
+    def disarm(self) -> None:
+        with self.lock:
+            self.armed = False
+
+    def levels(self) -> dict:
+        return {"side": self._side, "entry": self._entry, "tp": self._tp, "stop": self._stop,
+                "best": self._best, "armed": self.armed}
+
+    def _track(self, price: float) -> None:
+        """トレーリング: 有利方向の最良値を更新したときだけ stop を寄せる"""
+        if self._long:
+            if price > self._best:
+                self._best = price
+                if self._trail_k:
+                    s = price * self._trail_k
+                    if s > self._stop:
+                        self._stop, self._stop_reason = s, "trail"
+        elif price < self._best:
+            self._best = price
+            if self._trail_k:
+                s = price * self._trail_k
+                if s < self._stop:
+                    self._stop, self._stop_reason = s, "trail"
+
+    # ---- 価格入力 ----
+    def on_message(self, msg: dict) -> None:
+        """public WS のメッセージ（publicTrade は約定ごと、tickers は lastPrice）"""
+        topic = msg.get("topic") or ""
+        data = msg.get("data")
+        if topic.startswith("publicTrade"):
+            for tr in data or ():
+                self.on_price(_f(tr.get("p")))
+        elif topic.startswith("tickers") and isinstance(data, dict):
+            self.on_price(_f(data.get("lastPrice")))
+
+    def on_price(self, price: float) -> bool:
+        """価格1件を評価。発火して決済したら True"""
+        if not self.armed or price <= 0:
+            return False
+        self.ticks += 1
+        self.last_price = price
+        self._track(price)
+        if self._long:
+            if price >= self._tp:
+                return self._fire("tp", price)
+            if price <= self._stop:
+                return self._fire(self._stop_reason, price)
+        else:
+            if price <= self._tp:
+                return self._fire("tp", price)
+            if price >= self._stop:
+                return self._fire(self._stop_reason, price)
+        return False
+
+    def _fire(self, reason: str, price: float) -> bool:
+        t_data = now()
+        with self.lock:
+            # 待っている間に戦略側が閉じた / 張り直した
+            if not self.armed or (self._failing and time.monotonic() < self._retry_at):
+                return False
+            self.armed = False
+            trigger = self._tp if reason == "tp" else self._stop
+            position = Position(True, self._side, self._qty, self._entry)
+            # 発火から送信までに REST は挟まない: 実ポジの確認は stream のキャッシュがある時だけ
+            # （ポーリングモードは arm 時の数量で決済。フラット化は次サイクルの実ポジ参照で拾う）
+            if not self.is_dry and self.tracker is not None and self.tracker.streaming:
+                live = self.tracker.get()
+                if not live.is_open or live.side != self._side:
+                    # 取引所側では既に閉じている（清算・手動決済など）→ 内部状態だけ合わせる
+                    self.position_handler.mark_closed()
+                    self.logger.warning("[ExitEngine] %s trigger but exchange position is flat; marked closed",
+                                        reason)
+                    return False
+                position = live
+            event(self.logger, "exit_trigger", symbol=self.symbol, reason=reason, side=self._side,
+                  price=price, trigger=trigger, entry=self._entry)
+            trace = {"trace_id": new_trace_id(), "t_data": t_data, "t_signal": now(), "ref_price": price}
+            if not self.order_executor.close_position(position, reason=reason, trace=trace):
+                self._close_failed(reason, price)
+                return False
+            self._failing = False
+            self.position_handler.mark_closed()
+            self.fired += 1
+        return True
+
+    def _close_failed(self, reason: str, price: float) -> None:
+        """決済できなかった（まだ保有中）: 同じトリガーのまま張り直して再試行を待つ。lock 内で呼ぶ"""
+        self.armed = True
+        self.failed += 1
+        self._retry_at = time.monotonic() + _RETRY_SEC
+        msg = f"❌ exit {reason} @ {price} not filled; position still open, retrying"
+        self.logger.error(f"[ExitEngine] {msg}")
+        event(self.logger, "exit_failed", symbol=self.symbol, reason=reason, side=self._side, price=price)
+        if not self._failing and self.alert:
+            try:
+                self.alert(msg)
+            except Exception:
+                pass
+        self._failing = True
@@ -0,0 +1,214 @@
+# bot/utils/log_pipeline.py
+from __future__ import annotations
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bot.config import ensure_config
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+
+def event(logger: logging.Logger, name: str, level: int = logging.INFO, **fields: Any) -> None:
+    """
+    構造化イベントを1件記録する（無効レベルなら dict も作らず即 return）。
+      event(logger, "order_placed", side="Buy", qty=100, price=0.12, trace_id=tid)
+    JSON では {"ev": "order_placed", "side": "Buy", ...}、コンソールでは "order_placed side=Buy ..." になる。
+    DEBUG 以下はイベント名ごとに LogRecord を作る前に間引く（捨てる時のコストはトークンバケット1回分）。
+    """
+    if not logger.isEnabledFor(level):
+        return
+    extra = {"ev": name, "fields": fields}
+    h = _queue_handler
+    if level <= logging.DEBUG and h is not None:
+        skipped = h.take(("ev", name))
+        if skipped < 0:
+            return
+        extra["presampled"] = True
+        if skipped:
+            extra["sampled_out"] = skipped
+    logger.log(level, name, extra=extra, stacklevel=2)
+
+
+class JsonLineFormatter(logging.Formatter):
+    """1レコード = 1行の JSON（ts はエポック秒、fields はトップレベルに展開）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "lvl": record.levelname,
+            "logger": record.name,
+        }
+        if record.processName != "MainProcess":
+            out["proc"] = record.processName
+        ev = getattr(record, "ev", None)
+        if ev:
+            out["ev"] = ev
+        else:
+            out["msg"] = record.getMessage()
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        for key in ("sampled_out", "queue_dropped"):
+            n = getattr(record, key, 0)
+            if n:
+                out[key] = n
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        if record.levelno >= logging.WARNING:
+            out["src"] = f"{record.module}:{record.lineno}"
+        return json.dumps(out, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """従来のテキスト形式。構造化イベントは "ev k=v ..." で表示"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class SampledQueueHandler(logging.handlers.QueueHandler):
+    """
+    取引スレッド側のハンドラ。やることは「間引き判定して put_nowait」だけ:
+      - 整形しない（getMessage / 例外整形は QueueListener 側のスレッドで行う）
+        → 引数は呼び出し後に書き換えない値（数値・文字列・新しい dict）を渡すこと
+      - DEBUG 以下は呼び出し箇所（ファイル:行）ごとにトークンバケットで間引き
+        （debug_rate 件/秒・debug_burst 件まで。捨てた件数は次に通ったレコードの sampled_out に載る）
+      - キューが満杯なら待たずに捨てて数える（次に入ったレコードの queue_dropped に載る）
+    """
+
+    def __init__(self, q: queue.Queue, debug_rate: float = 1.0, debug_burst: float = 5.0,
+                 max_keys: int = 4096):
+        super().__init__(q)
+        self.debug_rate = float(debug_rate)
+        self.debug_burst = max(1.0, float(debug_burst))
+        self.max_keys = int(max_keys)
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+        self.dropped = 0          # キュー満杯で捨てた累計
+        self._dropped_pending = 0
+        self.sampled_out = 0      # 間引いた累計
+
+    def take(self, key) -> int:
+        """
+        key のバケットからトークンを1つ取る。
+        return: -1 = 間引く / 0 以上 = 通す（値は前回通してから間引いた件数）
+        """
+        if self.debug_rate <= 0:
+            return 0
+        now = time.monotonic()
+        b = self._buckets.get(key)
+        if b is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.clear()
+            b = self._buckets[key] = [self.debug_burst, now, 0]
+        b[0] = min(self.debug_burst, b[0] + (now - b[1]) * self.debug_rate)
+        b[1] = now
+        if b[0] < 1.0:
+            b[2] += 1
+            self.sampled_out += 1
+            return -1
+        b[0] -= 1.0
+        skipped, b[2] = b[2], 0
+        return skipped
+
+    def _allow(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or getattr(record, "presampled", False):
+            return True
+        skipped = self.take((record.pathname, record.lineno))
+        if skipped < 0:
+            return False
+        if skipped:
+            record.sampled_out = skipped
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not self._allow(record):
+            return
+        if self._dropped_pending:
+            record.queue_dropped = self._dropped_pending
+        try:
+            self.queue.put_nowait(record)
+            self._dropped_pending = 0
+        except queue.Full:
+            self.dropped += 1
+            self._dropped_pending += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[SampledQueueHandler] = None
+
+
+def setup_logging(config, name: str = "DogeBot", json_path: Optional[str] = None,
+                  text_format: str = TEXT_FORMAT) -> logging.Logger:
+    """
+    root ロガーを QueueHandler → QueueListener（バックグラウンドスレッド）構成にする。
+      - コンソール: テキスト（LOG_CONSOLE=true の時）
+      - ファイル:   JSON Lines（LOG_JSON_FILE。空なら出さない。LOG_FILE_MAX_MB でローテーション）
+    json_path を渡すと LOG_JSON_FILE より優先（プロセスごとにファイルを分ける時）。
+    二度呼ぶと前の listener を止めて作り直す。終了時は atexit で残りを書き出す。
+    """
+    global _listener, _queue_handler
+    config = ensure_config(config)
+    stop_logging()
+
+    handlers: List[logging.Handler] = []
+    if config.LOG_CONSOLE:
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(TextFormatter(text_format))
+        handlers.append(console)
+    path = json_path if json_path is not None else config.LOG_JSON_FILE
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fh = logging.handlers.RotatingFileHandler(
+            path, maxBytes=int(config.LOG_FILE_MAX_MB * 1024 * 1024),
+            backupCount=config.LOG_FILE_BACKUPS, encoding="utf-8",
+        )
+        fh.setFormatter(JsonLineFormatter())
+        handlers.append(fh)
+
+    q: queue.Queue = queue.Queue(maxsize=config.LOG_QUEUE_MAX)
+    _queue_handler = SampledQueueHandler(q, debug_rate=config.LOG_DEBUG_RATE, debug_burst=config.LOG_DEBUG_BURST)
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_queue_handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+    return logging.getLogger(name)
+
+
+def stop_logging() -> None:
+    """listener を止めてキューの残りを書き出す（何度呼んでもよい）"""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        finally:
+            for h in _listener.handlers:
+                h.close()
+            _listener = None
+
+
+def pipeline_stats() -> Dict[str, int]:
+    h = _queue_handler
+    if h is None:
+        return {"dropped": 0, "sampled_out": 0, "queued": 0}
+    return {"dropped": h.dropped, "sampled_out": h.sampled_out, "queued": h.queue.qsize()}
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,224 @@
+# bot/utils/notifier.py
+from __future__ import annotations
+import heapq
+import itertools
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+# 優先度（小さいほど先に送る）
+PRIORITY_HIGH = 0     # 発注・決済の失敗、ポジション乖離など
+PRIORITY_NORMAL = 1   # 約定・決済の通知
+PRIORITY_LOW = 2      # 定期サマリ等
+
+DISCORD_MAX_CONTENT = 2000
+_STOP = (-1, -1, None)
+
+
+class DiscordNotifier:
+    """
+    Discord Webhook 通知サービス。
+      - send() はキューに積むだけで呼び出し元をブロックしない
+      - coalesce_sec の間に届いたメッセージはまとめて1通（2000文字ごと）のダイジェストにする
+      - PRIORITY_HIGH は待たずに即送信し、ダイジェスト内でも先頭に並ぶ
+      - 429 は retry_after / Retry-After に従って再送、
+        X-RateLimit-Remaining=0 なら X-RateLimit-Reset-After まで次の送信を待つ
+      - キューが満杯なら新しい NORMAL / LOW を捨てる（dropped をカウント）。
+        HIGH は捨てず、溜まっている中で最も優先度の低い（同順位なら新しい）非 HIGH を1件追い出して入れる
+        （全部 HIGH なら上限を超えて積む）
+    OrderExecutor(discord=...) にそのまま渡せる（send(msg) 互換）。
+    """
+
+    def __init__(self, webhook_url: str, coalesce_sec: float = 2.0, max_queue: int = 1000,
+                 max_retries: int = 5, timeout: float = 10.0, logger=None, username: Optional[str] = None):
+        self.url = webhook_url
+        self.coalesce_sec = float(coalesce_sec)
+        self.max_retries = int(max_retries)
+        self.timeout = float(timeout)
+        self.logger = logger
+        self.username = username
+
+        self._q: "queue.PriorityQueue" = queue.PriorityQueue(maxsize=max(int(max_queue), 1))
+        self._seq = itertools.count()
+        self._blocked_until = 0.0
+        self._session = requests.Session() if requests is not None else None
+
+        self.sent = 0
+        self.posts = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+        self._thread = threading.Thread(target=self._loop, name="discord-notifier", daemon=True)
+        self._thread.start()
+
+    # ---- 公開API ----
+    def send(self, message: str, priority: int = PRIORITY_NORMAL) -> bool:
+        """非ブロッキング。キューに積めなければ False"""
+        if not message:
+            return False
+        item = (int(priority), next(self._seq), str(message))
+        try:
+            self._q.put_nowait(item)
+            return True
+        except queue.Full:
+            if item[0] <= PRIORITY_HIGH:
+                self._put_evicting(item)
+                return True
+            self.dropped += 1
+            return False
+
+    def _put_evicting(self, item: Tuple[int, int, str]) -> None:
+        """満杯のキューへ HIGH を入れる（PriorityQueue の内部ヒープを mutex の下で直接操作）"""
+        q = self._q
+        with q.mutex:
+            heap = q.queue
+            victim = max((x for x in heap if x[0] > PRIORITY_HIGH), default=None)
+            if victim is not None:
+                heap.remove(victim)
+                heapq.heapify(heap)
+                self.dropped += 1
+            heapq.heappush(heap, item)
+            q.unfinished_tasks += 1
+            q.not_empty.notify()
+
+    def alert(self, message: str) -> bool:
+        return self.send(message, priority=PRIORITY_HIGH)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """キューを送り切ってから停止（短命スクリプト用）"""
+        deadline = time.monotonic() + timeout
+        while not self._q.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        try:
+            self._q.put(_STOP, timeout=max(deadline - time.monotonic(), 0.1))
+        except queue.Full:
+            pass
+        self._thread.join(max(deadline - time.monotonic(), 0.1))
+
+    # ---- 送信スレッド ----
+    def _loop(self) -> None:
+        while True:
+            first = self._q.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stop = False
+            if first[0] > PRIORITY_HIGH:
+                # バーストをまとめる（途中で HIGH が来たら即送信）
+                deadline = time.monotonic() + self.coalesce_sec
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._q.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                    if item[0] == PRIORITY_HIGH:
+                        break
+            # 既に溜まっている分も同じダイジェストへ
+            while not stop:
+                try:
+                    item = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            batch.sort()
+            for chunk, n in self._chunks([m for _, _, m in batch]):
+                if self._post(chunk):
+                    self.sent += n
+            if stop:
+                return
+
+    @staticmethod
+    def _chunks(messages: List[str]) -> List[Tuple[str, int]]:
+        out: List[Tuple[str, int]] = []
+        cur: List[str] = []
+        size = 0
+        for m in messages:
+            m = m[:DISCORD_MAX_CONTENT]
+            add = len(m) + (1 if cur else 0)
+            if cur and size + add > DISCORD_MAX_CONTENT:
+                out.append(("\n".join(cur), len(cur)))
+                cur, size = [], 0
+                add = len(m)
+            cur.append(m)
+            size += add
+        if cur:
+            out.append(("\n".join(cur), len(cur)))
+        return out
+
+    def _post(self, content: str) -> bool:
+        if self._session is None or not self.url:
+            self.failed += 1
+            return False
+        payload = {"content": content}
+        if self.username:
+            payload["username"] = self.username
+        backoff = 1.0
+        for _ in range(self.max_retries + 1):
+            wait = self._blocked_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                resp = self._session.post(self.url, json=payload, timeout=self.timeout)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"[Discord] post failed: {e!r}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            self.posts += 1
+            self._update_bucket(resp)
+            if resp.status_code == 429:
+                self.rate_limited += 1
+                self._blocked_until = time.monotonic() + self._retry_after(resp)
+                continue
+            if 200 <= resp.status_code < 300:
+                return True
+            if resp.status_code >= 500:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            # 4xx（429以外）は再送しても通らない
+            if self.logger:
+                self.logger.warning(f"[Discord] rejected: HTTP {resp.status_code}")
+            break
+        self.failed += 1
+        return False
+
+    @staticmethod
+    def _retry_after(resp) -> float:
+        try:
+            body = resp.json()
+            if isinstance(body, dict) and body.get("retry_after") is not None:
+                return float(body["retry_after"])
+        except Exception:
+            pass
+        try:
+            return float(resp.headers.get("Retry-After", 1.0))
+        except (TypeError, ValueError):
+            return 1.0
+
+    def _update_bucket(self, resp) -> None:
+        try:
+            if resp.headers.get("X-RateLimit-Remaining") == "0":
+                reset = float(resp.headers.get("X-RateLimit-Reset-After", 1.0))
+                self._blocked_until = max(self._blocked_until, time.monotonic() + reset)
+        except (TypeError, ValueError):
+            pass
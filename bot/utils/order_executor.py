@@ -1,23 +1,39 @@
 # bot/utils/order_executor.py
 from __future__ import annotations
+import time
 from datetime import datetime
 
+from bot.config import ensure_config
+from bot.exchange.types import OrderBook
+from bot.utils.log_pipeline import event
+from bot.utils.notifier import PRIORITY_HIGH
+from bot.utils.trace import journal_fields, new_trace_id, now, slip_bps
+
 try:
     from bot.utils.trade_logger import TradeLogger
 except Exception:
     TradeLogger = None
 
+try:
+    from bot.exchange.paper import PaperMatchingEngine
+except Exception:
+    PaperMatchingEngine = None
+
 
 class OrderExecutor:
     """
     - 戦略からの signal を実行
     - エントリー時に推定手数料をバッファ保存し、クローズ時に往復手数料を合算
     - DRY_RUN では発注はせず、日次CSVとRAWログの両方に書き込み
-    signal 例: {"side": "Buy"|"Sell", "qty": 100, "price": 0.1234(optional), "note": "...", "maker": bool}
+    - trace（trace_id・各段の monotonic 時刻・ref_price）を発注前後で刻み、RAWログの列に書く
+    - prepare(side, qty): シグナルが近いときに注文を作り置き。実発注は送信を最優先し、
+      手数料・スナップショット・ジャーナルは送信後（価格は signal / trace の ref_price を使い REST で取り直さない）
+    signal 例: {"side": "Buy"|"Sell", "qty": 100, "price": 0.1234(optional), "note": "...", "maker": bool,
+                "trace": {"trace_id", "t_data", "t_signal", "ref_price"}(optional)}
     """
     def __init__(self, exchange, config, logger=None, discord=None):
         self.exchange = exchange
-        self.config = config
+        self.config = config = ensure_config(config)
         self.logger = logger
         self.discord = discord
 
@@ -25,12 +41,12 @@ class OrderExecutor:
             import logging
             self.logger = logging.getLogger(__name__)
 
-        self.symbol = getattr(config, "SYMBOL", "DOGEUSDT")
-        self.is_dry = str(getattr(config, "DRY_RUN", "true")).lower() == "true"
+        self.symbol = config.SYMBOL
+        self.is_dry = config.DRY_RUN
 
         # 手数料（テイカー/メイカー）
-        self.taker_fee_pct = float(getattr(config, "TAKER_FEE_PCT", 0.0006))
-        self.maker_fee_pct = float(getattr(config, "MAKER_FEE_PCT", 0.0002))
+        self.taker_fee_pct = config.TAKER_FEE_PCT
+        self.maker_fee_pct = config.MAKER_FEE_PCT
 
         # TradeLogger 初期化
         if TradeLogger is None:
@@ -38,50 +54,133 @@ class OrderExecutor:
             self.tlog = None
         else:
             try:
-                logs_dir = getattr(config, "TRADE_LOG_DIR", "logs")
-                start_bal = float(getattr(config, "VIRTUAL_BALANCE_USDT", 100.0))
-                self.tlog = TradeLogger(logs_dir=logs_dir, symbol=self.symbol, starting_balance=start_bal)
-                self.logger.info(f"[TradeLogger] enabled: daily CSV => {self.tlog.filepath}")
+                logs_dir = config.TRADE_LOG_DIR
+                start_bal = config.VIRTUAL_BALANCE_USDT
+                self.tlog = TradeLogger(logs_dir=logs_dir, symbol=self.symbol, starting_balance=start_bal,
+                                        compress=config.TRADE_LOG_COMPRESS)
+                self.logger.info("[TradeLogger] enabled: daily CSV => %s", self.tlog.filepath)
             except Exception as e:
-                self.logger.warning(f"[TradeLogger] disabled: {e!r}")
+                self.logger.warning("[TradeLogger] disabled: %r", e)
                 self.tlog = None
 
+        # --- DRY_RUN 約定シミュレータ（板を食ってスリッページを反映） ---
+        self.paper = None
+        if self.is_dry and PaperMatchingEngine is not None and config.PAPER_MATCHING:
+            self.paper = PaperMatchingEngine(
+                symbol=self.symbol,
+                latency_ms=config.PAPER_LATENCY_MS,
+                default_level_qty=config.PAPER_DEFAULT_LEVEL_QTY,
+                logger=self.logger,
+            )
+
         # --- エントリースナップショット（単一ポジ軽量版） ---
         self._entry_snapshot = None
 
+        # --- 作り置きの注文（prepare。実発注のみ） ---
+        self._prepared = None
+        self.warm_sec = config.ORDER_WARM_SEC
+        self.prepared_sends = 0
+
+    @property
+    def entry_snapshot(self) -> dict | None:
+        """直近エントリーの {side, qty, price, fee, maker}（未保有なら None）。ExitEngine の arm 用"""
+        return self._entry_snapshot
+
     # ------------ 価格取得フォールバック ------------
-    def _get_mark_price(self) -> float:
+    def _get_mark_price(self, urgent: bool = False) -> float:
+        """urgent=True なら発注枠で取る（取引所が get_order_price を持つ場合。決済価格の取り直し用）"""
+        getter = getattr(self.exchange, "get_order_price", None) if urgent else None
         try:
-            lp = float(self.exchange.get_last_price())
+            lp = float((getter or self.exchange.get_last_price)())
             if lp > 0:
                 return lp
         except Exception:
             pass
         try:
-            ob = self.exchange.get_orderbook()
-            if isinstance(ob, dict):
-                if "best_bid" in ob and "best_ask" in ob:
-                    bb = float(ob.get("best_bid") or 0)
-                    ba = float(ob.get("best_ask") or 0)
-                    if bb > 0 and ba > 0:
-                        return (bb + ba) / 2.0
-                bids = ob.get("bids") or []
-                asks = ob.get("asks") or []
-                if bids and asks and bids[0] and asks[0]:
-                    bb = float(bids[0][0])
-                    ba = float(asks[0][0])
-                    if bb > 0 and ba > 0:
-                        return (bb + ba) / 2.0
+            best = OrderBook.coerce(self.exchange.get_orderbook()).best
+            if best and best[0] > 0 and best[1] > 0:
+                return (best[0] + best[1]) / 2.0
         except Exception:
             pass
         return 0.0
 
+    def _paper_fill(self, side: str, qty: float, ref_price: float) -> tuple[float, float, str]:
+        """
+        DRY_RUN: 現在の板に成行を当てて (約定価格, 約定数量, note追記) を返す。
+        PAPER_LATENCY_MS > 0 なら送信からその分待ち、待った後の板で約定させる。
+        シミュレータ無効・板取得失敗・約定ゼロ時は ref_price で全量約定扱い。
+        """
+        if self.paper is None:
+            return ref_price, qty, ""
+        if self.paper.latency > 0:
+            time.sleep(self.paper.latency)
+        try:
+            fill = self.paper.execute_market(side, qty, ob=self.exchange.get_orderbook())
+        except Exception as e:
+            self.logger.warning("[Paper] matching failed: %r", e)
+            return ref_price, qty, ""
+        if fill["filled_qty"] <= 0:
+            return ref_price, qty, ""
+        # スリッページは呼び出し側が trace の ref_price 基準で1回だけ取る（journal の slip_bps 列）
+        tag = f"paper={fill['status']} filled={fill['filled_qty']}/{qty}"
+        return fill["avg_price"], fill["filled_qty"], tag
+
+    @staticmethod
+    def _ack_price(res) -> float:
+        """取引所応答の平均約定価格（返さない取引所なら 0）"""
+        try:
+            return float(res.get("avg_price") or 0.0) if isinstance(res, dict) else 0.0
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _start_trace(trace, ref_price: float) -> dict:
+        trace = dict(trace or {})
+        trace.setdefault("trace_id", new_trace_id())
+        if not trace.get("ref_price"):
+            trace["ref_price"] = ref_price
+        return trace
+
     def _compute_fee(self, price: float, qty: float, is_maker: bool) -> float:
         fee_pct = self.maker_fee_pct if is_maker else self.taker_fee_pct
         return price * qty * fee_pct
 
+    # ------------ 作り置き（発注の高速経路） ------------
+    def prepare(self, side: str | None, qty: float, ref_price: float = 0.0) -> bool:
+        """
+        シグナルが近いときに毎サイクル呼ぶ。side/qty が変わった時だけ注文を作り直す（接続の温め直しは毎回判定）。
+        side が None なら作り置きを捨てる。DRY_RUN・作り置き非対応の取引所（リプレイ等）では何もしない。
+        """
+        if side not in ("Buy", "Sell"):
+            self._prepared = None
+            return False
+        if self.is_dry or not hasattr(self.exchange, "prepare_market_order"):
+            return False
+        qty = float(qty)
+        p = self._prepared
+        if p is not None and p["side"] == side and p["qty"] == qty:
+            p["ref_price"] = ref_price or p["ref_price"]
+            return True
+        try:
+            order = self.exchange.prepare_market_order(side, qty, warm_sec=self.warm_sec)
+        except Exception as e:
+            self.logger.warning("[OrderExecutor] prepare failed: %r", e)
+            self._prepared = None
+            return False
+        self._prepared = {"side": side, "qty": qty, "order": order, "ref_price": ref_price}
+        return True
+
+    def _take_prepared(self, side: str, qty: float):
+        p, self._prepared = self._prepared, None
+        if p is not None and p["side"] == side and p["qty"] == qty:
+            return p
+        return None
+
     # ------------ エントリー ------------
     def execute(self, signal: dict):
+        if not self.is_dry:
+            return self._execute_live(signal)
+
         side = signal["side"]
         qty = float(signal["qty"])
         price = float(signal.get("price") or self._get_mark_price())
@@ -91,6 +190,15 @@ class OrderExecutor:
         if price <= 0:
             self.logger.error("Price not available. Abort.")
             return
+        trace = self._start_trace(signal.get("trace"), price)
+
+        # DRY_RUN: 板に当てて約定シミュレーション
+        trace["t_send"] = now()
+        price, qty, paper_tag = self._paper_fill(side, qty, price)
+        trace["t_ack"] = now()
+        trace["slip_bps"] = slip_bps(side, price, trace["ref_price"])
+        if paper_tag:
+            note = f"{note} {paper_tag}".strip()
 
         fee_entry = self._compute_fee(price, qty, is_maker=is_maker)
 
@@ -100,50 +208,113 @@ class OrderExecutor:
             "fee": fee_entry, "maker": is_maker,
         }
 
-        if self.is_dry:
-            self.logger.info(
-                f"DRY_RUN: Would place {side} {qty} {self.symbol} @ {price} (entry_fee≈{fee_entry:.6f})"
-            )
+        event(self.logger, "dry_open", symbol=self.symbol, side=side, qty=qty, price=price,
+              fee=fee_entry, trace_id=trace["trace_id"])
+        if self.tlog:
+            note_full = f"OPEN {side} qty={qty} @ {price} entry_fee≈{fee_entry:.6f} {note}"
+            # 日次CSV
+            self.tlog.annotate(note_full)
+            # RAWログ
+            self.tlog.append({
+                "ts": datetime.utcnow().isoformat(timespec="seconds"),
+                "symbol": self.symbol, "side": side, "qty": qty,
+                "price": price, "fee": fee_entry, "realized_pnl": 0.0,
+                "balance": self.tlog.balance_virtual, "note": note_full,
+                **journal_fields(trace),
+            })
+            self.logger.debug("[TradeLogger] wrote DRY_RUN entry to %s", self.tlog.filepath)
+
+    def _execute_live(self, signal: dict):
+        """
+        実発注。送信までにやるのは価格の確認だけ（signal.price → trace.ref_price → 作り置き時の ref_price。
+        どれも無い時だけ REST で mark を取る）。作り置きがあれば送るだけ。
+        手数料・スナップショット・ジャーナル・通知は応答の後。
+        """
+        side = signal["side"]
+        qty = float(signal["qty"])
+        trace = signal.get("trace") or {}
+        prepared = self._take_prepared(side, qty)
+        price = float(signal.get("price") or trace.get("ref_price") or (prepared["ref_price"] if prepared else 0.0)
+                      or self._get_mark_price())
+        if price <= 0:
+            self.logger.error("Price not available. Abort.")
+            return
+        trace = self._start_trace(trace, price)
+
+        try:
+            trace["t_send"] = now()
+            if prepared is not None:
+                res = self.exchange.send_prepared(prepared["order"])
+                self.prepared_sends += 1
+            else:
+                res = self.exchange.place_market_order(side=side, qty=qty)
+            trace["t_ack"] = now()
+        except Exception as e:
+            self.logger.error("❌ Order failed: %s", e)
+            if self.discord:
+                self.discord.send(f"❌ Order failed: {e}", priority=PRIORITY_HIGH)
+            return
+
+        # ---- ここから送信後 ----
+        # 応答に約定価格があればそれでスリッページを取る。無ければ slip_bps は空欄
+        note = signal.get("note", "")
+        is_maker = bool(signal.get("maker", False))
+        fill = self._ack_price(res)
+        if fill > 0:
+            price = fill
+            trace["slip_bps"] = slip_bps(side, fill, trace["ref_price"])
+        fee_entry = self._compute_fee(price, qty, is_maker=is_maker)
+        self._entry_snapshot = {
+            "side": side, "qty": qty, "price": price,
+            "fee": fee_entry, "maker": is_maker,
+        }
+        try:
+            event(self.logger, "order_placed", symbol=self.symbol, side=side, qty=qty, price=price,
+                  fee=fee_entry, slip_bps=trace.get("slip_bps"), prepared=prepared is not None,
+                  trace_id=trace["trace_id"])
             if self.tlog:
                 note_full = f"OPEN {side} qty={qty} @ {price} entry_fee≈{fee_entry:.6f} {note}"
-                # 日次CSV
                 self.tlog.annotate(note_full)
-                # RAWログ
                 self.tlog.append({
                     "ts": datetime.utcnow().isoformat(timespec="seconds"),
                     "symbol": self.symbol, "side": side, "qty": qty,
                     "price": price, "fee": fee_entry, "realized_pnl": 0.0,
                     "balance": self.tlog.balance_virtual, "note": note_full,
+                    **journal_fields(trace),
                 })
-                self.logger.info(f"[TradeLogger] wrote DRY_RUN entry to {self.tlog.filepath}")
-            return
-
-        # 実発注
-        try:
-            self.exchange.place_market_order(side=side, qty=qty)
-            self.logger.info(f"✅ Placed {side} {qty} {self.symbol} @ ~{price}")
-            if self.tlog:
-                self.tlog.annotate(f"OPEN {side} qty={qty} @ {price} entry_fee≈{fee_entry:.6f} {note}")
         except Exception as e:
-            self.logger.error(f"❌ Order failed: {e}")
-            if self.discord:
-                self.discord.send(f"❌ Order failed: {e}")
+            self.logger.error("[TradeLogger] entry journal failed: %r", e)
 
     # ------------ クローズ ------------
-    def close_position(self, position: dict, reason: str = "close"):
+    def close_position(self, position: dict, reason: str = "close", trace: dict | None = None) -> bool:
+        """
+        決済。ポジションが閉じた（元から無い場合も含む）なら True。
+        価格が取れない・送信に失敗した（まだ保有している）なら False
+        """
         if not position or float(position.get("size", 0) or 0) == 0:
             self.logger.info("No open position.")
-            return
+            return True
 
         side_entry = position["side"]
         qty = float(position["size"])
         entry = float(position["entry_price"])
         side_close = "Sell" if side_entry == "Buy" else "Buy"
 
-        exit_price = float(self._get_mark_price())
+        # 価格は発火・判定時の ref_price。無い時だけ REST で取り直す（市場データ枠に並ばないよう発注枠で）
+        exit_price = float((trace or {}).get("ref_price") or 0.0) or float(self._get_mark_price(urgent=True))
         if exit_price <= 0:
             self.logger.error("Close price not available. Abort.")
-            return
+            return False
+        trace = self._start_trace(trace, exit_price)
+
+        paper_tag = ""
+        if self.is_dry:
+            # 部分約定でも残りは mark で決済したものとして扱う（DRY_RUNは常にフラットへ戻す）
+            trace["t_send"] = now()
+            fill_price, fill_qty, paper_tag = self._paper_fill(side_close, qty, exit_price)
+            trace["t_ack"] = now()
+            exit_price = (fill_price * fill_qty + exit_price * (qty - fill_qty)) / qty
+            trace["slip_bps"] = slip_bps(side_close, exit_price, trace["ref_price"])
 
         # 手数料
         fee_close = self._compute_fee(exit_price, qty, is_maker=False)
@@ -159,7 +330,7 @@ class OrderExecutor:
 
         if self.is_dry:
             if self.tlog:
-                note_full = f"DRY_RUN {reason} (entry_fee+close_fee)"
+                note_full = f"DRY_RUN {reason} (entry_fee+close_fee) {paper_tag}".strip()
                 # 日次CSV
                 self.tlog.log_trade(
                     side=side_entry, qty=qty, entry=entry, exit=exit_price,
@@ -172,35 +343,56 @@ class OrderExecutor:
                     "price": exit_price, "fee": fee_roundtrip,
                     "realized_pnl": realized_pnl,
                     "balance": self.tlog.balance_virtual, "note": note_full,
+                    **journal_fields(trace),
                 })
-                self.logger.info(f"[TradeLogger] wrote DRY_RUN close to {self.tlog.filepath}")
-            self.logger.info(
-                f"DRY_RUN: Would close {side_entry} {qty} {self.symbol} @ {exit_price} "
-                f"(entry {entry}) pnl≈{realized_pnl:.6f} (fees≈{fee_roundtrip:.6f})"
-            )
+                self.logger.debug("[TradeLogger] wrote DRY_RUN close to %s", self.tlog.filepath)
+            event(self.logger, "dry_close", symbol=self.symbol, side=side_entry, qty=qty, price=exit_price,
+                  entry=entry, pnl=realized_pnl, fee=fee_roundtrip, reason=reason, trace_id=trace["trace_id"])
             self._entry_snapshot = None
-            return
+            return True
 
-        # 実発注
+        # 実発注（送信だけを try で囲む。失敗ならまだ保有中なのでスナップショットも残す）
+        try:
+            trace["t_send"] = now()
+            res = self.exchange.place_market_order(side=side_close, qty=qty)
+            trace["t_ack"] = now()
+        except Exception as e:
+            self.logger.error("❌ Close failed: %s", e)
+            if self.discord:
+                self.discord.send(f"❌ Close failed: {e}", priority=PRIORITY_HIGH)
+            return False
+
+        # ---- ここから送信後（ジャーナル・通知の失敗で決済を失敗扱いにしない） ----
+        self._entry_snapshot = None
+        fill = self._ack_price(res)
+        if fill > 0:
+            exit_price = fill
+            trace["slip_bps"] = slip_bps(side_close, fill, trace["ref_price"])
+            fee_roundtrip = fee_entry + self._compute_fee(exit_price, qty, is_maker=False)
+            sign = 1.0 if side_entry == "Buy" else -1.0
+            realized_pnl = sign * (exit_price - entry) * qty - fee_roundtrip
         try:
-            self.exchange.place_market_order(side=side_close, qty=qty)
             if self.tlog:
                 self.tlog.log_trade(
                     side=side_entry, qty=qty, entry=entry, exit=exit_price,
                     fee=fee_roundtrip, note=reason
                 )
-            self.logger.info(
-                f"✅ Closed {side_entry} {qty} {self.symbol} @ ~{exit_price} "
-                f"(pnl≈{realized_pnl:.6f}, fees≈{fee_roundtrip:.6f})"
-            )
+                self.tlog.append({
+                    "ts": datetime.utcnow().isoformat(timespec="seconds"),
+                    "symbol": self.symbol, "side": side_entry, "qty": qty,
+                    "price": exit_price, "fee": fee_roundtrip,
+                    "realized_pnl": realized_pnl,
+                    "balance": self.tlog.balance_virtual, "note": reason,
+                    **journal_fields(trace),
+                })
+            event(self.logger, "position_closed", symbol=self.symbol, side=side_entry, qty=qty, price=exit_price,
+                  entry=entry, pnl=realized_pnl, fee=fee_roundtrip, reason=reason,
+                  slip_bps=trace.get("slip_bps"), trace_id=trace["trace_id"])
             if self.discord:
                 self.discord.send(
                     f"✅ Closed {side_entry} {qty} {self.symbol} @ ~{exit_price} (entry {entry}) "
                     f"PNL≈{realized_pnl:.6f} (fees≈{fee_roundtrip:.6f}) [{reason}]"
                 )
         except Exception as e:
-            self.logger.error(f"❌ Close failed: {e}")
-            if self.discord:
-                self.discord.send(f"❌ Close failed: {e}")
-        finally:
-            self._entry_snapshot = None
+            self.logger.error("[TradeLogger] close journal failed: %r", e)
+        return True
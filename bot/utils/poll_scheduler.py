@@ -0,0 +1,104 @@
+# bot/utils/poll_scheduler.py
+from __future__ import annotations
+import math
+from typing import Any, Dict, Optional
+
+from bot.config import ensure_config
+
+
+def _clip01(x: float) -> float:
+    return 0.0 if x <= 0 else 1.0 if x >= 1 else x
+
+
+def _num(v) -> Optional[float]:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+class AdaptivePoller:
+    """
+    相場の動きに応じてポーリング間隔を決める。
+      urgency (0..1) = max(
+        ボラ比 volatility（短期/長期 std）が 1 → POLL_VOL_HIGH で 0 → 1,
+        直近の値動き |mom_1s| / mid が POLL_MOVE_BPS で 1,
+        spread_bps が POLL_SPREAD_BPS で 1,
+        RSI がしきい値（未保有: 買い/売り、保有中: 決済）まで POLL_RSI_BAND 以内なら近さに比例,
+        保有中は最低 0.5,
+      )
+      interval = POLL_MAX_SEC * (POLL_MIN_SEC / POLL_MAX_SEC) ** urgency（対数補間）
+    縮めるのは即時、緩めるのは1サイクル POLL_BACKOFF 倍まで。
+    下限は API レート予算（1サイクルの REST 回数 / API_RATE_LIMIT_PER_SEC）を下回らない。
+    POLL_ADAPTIVE=false なら従来通り POLL_SEC 固定。
+    """
+
+    def __init__(self, config, calls_per_cycle: int = 3):
+        self.calls_per_cycle = max(1, int(calls_per_cycle))
+        self.apply_config(config)
+        self.interval = min(max(self.base_sec, self.min_sec), self.max_sec) if self.adaptive else self.base_sec
+        self.urgency = 0.0
+
+    def apply_config(self, config) -> None:
+        config = ensure_config(config)
+        self.adaptive = config.POLL_ADAPTIVE
+        self.base_sec = config.POLL_SEC
+        self.min_sec = min(config.POLL_MIN_SEC, config.POLL_MAX_SEC)
+        self.max_sec = max(config.POLL_MIN_SEC, config.POLL_MAX_SEC)
+        self.backoff = config.POLL_BACKOFF
+        self.vol_high = config.POLL_VOL_HIGH
+        self.move_bps = config.POLL_MOVE_BPS
+        self.spread_bps = config.POLL_SPREAD_BPS
+        self.rsi_band = config.POLL_RSI_BAND
+        self.rate_per_sec = config.API_RATE_LIMIT_PER_SEC
+        self.buy_th, self.sell_th = config.RSI_BUY_THRESHOLD, config.RSI_SELL_THRESHOLD
+        self.exit_long, self.exit_short = config.RSI_EXIT_LONG, config.RSI_EXIT_SHORT
+
+    @property
+    def floor_sec(self) -> float:
+        """レート予算から決まる最短間隔"""
+        return self.calls_per_cycle / self.rate_per_sec if self.rate_per_sec > 0 else 0.0
+
+    def score(self, indicators: Dict[str, Any], position: Optional[Dict[str, Any]] = None) -> float:
+        parts = [0.0]
+
+        vol = _num(indicators.get("volatility"))
+        if vol is not None and self.vol_high > 1:
+            parts.append(_clip01((vol - 1.0) / (self.vol_high - 1.0)))
+
+        mom = _num(indicators.get("mom_1s"))
+        mid = _num(indicators.get("mid")) or _num(indicators.get("last_close"))
+        if mom is not None and mid and self.move_bps > 0:
+            parts.append(_clip01(abs(mom) / mid * 1e4 / self.move_bps))
+
+        spread = _num(indicators.get("spread_bps"))
+        if spread is not None and self.spread_bps > 0:
+            parts.append(_clip01(spread / self.spread_bps))
+
+        rsi = _num(indicators.get("rsi"))
+        side = position.get("side") if position and position.get("is_open") else None
+        if rsi is not None and self.rsi_band > 0:
+            if side == "Buy":
+                dist = self.exit_long - rsi
+            elif side == "Sell":
+                dist = rsi - self.exit_short
+            else:
+                dist = min(rsi - self.buy_th, self.sell_th - rsi)
+            parts.append(_clip01(1.0 - max(dist, 0.0) / self.rsi_band))
+
+        if side is not None:
+            parts.append(0.5)
+        return max(parts)
+
+    def next_interval(self, indicators: Optional[Dict[str, Any]], position: Optional[Dict[str, Any]] = None) -> float:
+        if not self.adaptive:
+            # 固定間隔（POLL_SEC をそのまま。リプレイ等の POLL_SEC=0 もそのまま通す）
+            return self.base_sec
+        u = self.score(indicators or {}, position)
+        target = self.max_sec * (self.min_sec / self.max_sec) ** u
+        if target > self.interval:
+            target = min(target, self.interval * self.backoff)
+        self.urgency = u
+        self.interval = max(target, self.floor_sec)
+        return self.interval
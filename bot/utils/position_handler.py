@@ -1,4 +1,7 @@
 # bot/utils/position_handler.py
+from bot.utils.log_pipeline import event
+
+
 class PositionHandler:
     """
     DRY_RUN/実運用を問わず、“内部状態”でポジション遷移を管理。
@@ -36,10 +39,8 @@ class PositionHandler:
             msg = f"in_position={self._in_position}, side={self._side}"
 
         if self.logger:
-            self.logger.info(
-                f"[PositionHandler] synced from exchange: {msg} "
-                f"(was in_position={prev_in}, side={prev_side})"
-            )
+            self.logger.info("[PositionHandler] synced from exchange: %s (was in_position=%s, side=%s)",
+                             msg, prev_in, prev_side)
 
     # ---- 遷移判定 ----
     def entry_edge(self, want_open: bool, side: str) -> bool:
@@ -49,14 +50,14 @@ class PositionHandler:
         """
         if want_open and not self._in_position:
             if self.logger:
-                self.logger.info(f"[PositionHandler] entry_edge detected (side={side})")
+                event(self.logger, "entry_edge", side=side)
             return True
         return False
 
     def close_edge(self, want_close: bool) -> bool:
         if want_close and self._in_position:
             if self.logger:
-                self.logger.info("[PositionHandler] close_edge detected")
+                event(self.logger, "close_edge")
             return True
         return False
 
@@ -65,13 +66,20 @@ class PositionHandler:
         self._in_position = True
         self._side = side
         if self.logger:
-            self.logger.info(f"[PositionHandler] marked entered: in_position=True, side={side}")
+            event(self.logger, "position_state", in_position=True, side=side)
 
     def mark_closed(self):
         self._in_position = False
         self._side = None
         if self.logger:
-            self.logger.info("[PositionHandler] marked closed: in_position=False")
+            event(self.logger, "position_state", in_position=False)
+
+    def restore_state(self, in_position: bool, side: str | None):
+        """チェックポイントからの復元用（ウォームリスタート）"""
+        self._in_position = bool(in_position)
+        self._side = side if in_position else None
+        if self.logger:
+            self.logger.info("[PositionHandler] restored: in_position=%s, side=%s", self._in_position, self._side)
 
     # （必要なら）外部参照
     @property
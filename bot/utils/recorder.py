@@ -0,0 +1,337 @@
+# bot/utils/recorder.py
+from __future__ import annotations
+import glob
+import gzip
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# フレーム: <mono_ns:u64><wall_ns:u64><len:u32> + pickle((channel, payload))
+_FRAME = struct.Struct("<QQI")
+_STOP = object()
+
+# 録画対象の取引所メソッド（戻り値をそのまま記録）
+RECORDED_METHODS = (
+    "get_last_price", "get_orderbook", "get_current_position",
+    "fetch_ohlcv", "place_market_order",
+)
+
+
+class _RecordedError:
+    """取引所呼び出しが例外だった事実を記録・再送出するための入れ物"""
+    __slots__ = ("type_name", "message")
+
+    def __init__(self, exc: BaseException):
+        self.type_name = type(exc).__name__
+        self.message = str(exc)
+
+    def __reduce__(self):
+        return (_RecordedError._restore, (self.type_name, self.message))
+
+    @staticmethod
+    def _restore(type_name, message):
+        obj = _RecordedError.__new__(_RecordedError)
+        obj.type_name, obj.message = type_name, message
+        return obj
+
+
+class ReplayExhausted(EOFError):
+    """録画データを使い切った"""
+
+
+class MarketRecorder:
+    """
+    取引所レスポンス / WS メッセージを単調時刻付きで追記する録画器。
+      - record() はキューに積むだけ（ライブループ側のコストはタプル生成 + put のみ）
+      - バックグラウンドスレッドが pickle して gzip セグメントへ追記
+      - segment_bytes（非圧縮換算）を超えたら新しいセグメントへ切り替え
+    """
+
+    def __init__(self, out_dir: str = "logs/recordings", segment_bytes: int = 64 * 1024 * 1024,
+                 flush_sec: float = 1.0, logger=None):
+        self.out_dir = out_dir
+        self.segment_bytes = int(segment_bytes)
+        self.flush_sec = float(flush_sec)
+        self.logger = logger
+        os.makedirs(out_dir, exist_ok=True)
+
+        self._q: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._fh = None
+        self._written = 0
+        self.frames = 0
+        self.dropped = 0
+        self.segment_path: Optional[str] = None
+        self._thread = threading.Thread(target=self._loop, name="market-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, channel: str, payload: Any) -> None:
+        self._q.put((time.monotonic_ns(), time.time_ns(), channel, payload))
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._q.put(_STOP)
+        self._thread.join(timeout)
+
+    # ---- 書き込みスレッド ----
+    def _open_segment(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+        self.segment_path = os.path.join(self.out_dir, f"seg_{time.time_ns()}.rec.gz")
+        self._fh = gzip.open(self.segment_path, "ab", compresslevel=3)
+        self._written = 0
+
+    def _loop(self) -> None:
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._q.get(timeout=self.flush_sec)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                try:
+                    self._write(item)
+                except Exception as e:
+                    self.dropped += 1
+                    if self.logger:
+                        self.logger.warning(f"[Recorder] write failed: {e!r}")
+            if self._fh is not None and time.monotonic() - last_flush >= self.flush_sec:
+                self._fh.flush()
+                last_flush = time.monotonic()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _write(self, item: Tuple[int, int, str, Any]) -> None:
+        mono_ns, wall_ns, channel, payload = item
+        body = pickle.dumps((channel, payload), protocol=pickle.HIGHEST_PROTOCOL)
+        if self._fh is None or self._written >= self.segment_bytes:
+            self._open_segment()
+        self._fh.write(_FRAME.pack(mono_ns, wall_ns, len(body)))
+        self._fh.write(body)
+        self._written += _FRAME.size + len(body)
+        self.frames += 1
+
+
+def read_frames(paths: List[str]) -> Iterator[Tuple[int, int, str, Any]]:
+    """セグメントを順に読み (mono_ns, wall_ns, channel, payload) を返す"""
+    for path in paths:
+        with gzip.open(path, "rb") as f:
+            while True:
+                head = f.read(_FRAME.size)
+                if len(head) < _FRAME.size:
+                    break
+                mono_ns, wall_ns, n = _FRAME.unpack(head)
+                body = f.read(n)
+                if len(body) < n:
+                    break  # 書き込み途中で落ちたセグメントの末尾
+                channel, payload = pickle.loads(body)
+                yield mono_ns, wall_ns, channel, payload
+
+
+def segment_paths(rec_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(rec_dir, "seg_*.rec.gz")))
+
+
+class RecordingStream:
+    """WS stream のラッパー。recv() で受けたメッセージを channel（private は "ws"、public は "ws_public"）に記録"""
+
+    def __init__(self, stream, recorder: MarketRecorder, channel: str = "ws"):
+        self._stream = stream
+        self._rec = recorder
+        self._channel = channel
+
+    def recv(self, timeout: float = 0.5):
+        msg = self._stream.recv(timeout=timeout)
+        if msg is not None:
+            self._rec.record(self._channel, msg)
+        return msg
+
+    def close(self):
+        if hasattr(self._stream, "close"):
+            self._stream.close()
+
+
+class RecordingExchange:
+    """
+    取引所のラッパー。RECORDED_METHODS の戻り値（または例外）を記録し、そのまま返す。
+    それ以外の属性は元の取引所へ委譲する。
+    元の取引所が clock() を持つ（合成マーケット等）なら、その時刻も "clock" チャネルに記録する
+    （先頭に "clock_source" を1つ書き、リプレイは壁時計ではなくこの時刻を返す）。
+    session（{"dry_run": bool, "paper_matching": bool} 等）を渡すと "session" チャネルの先頭フレームとして書く
+    （リプレイは同じモードで再生する。DRY_RUN の約定シミュレータは板を取り直すので、モードが違うと FIFO がずれる）。
+    """
+
+    def __init__(self, exchange, recorder: MarketRecorder, session: Optional[Dict[str, Any]] = None):
+        self._ex = exchange
+        self._rec = recorder
+        if session is not None:
+            self._rec.record("session", dict(session))
+        if callable(getattr(exchange, "clock", None)):
+            self._rec.record("clock_source", True)
+            self.clock = self._clock
+
+    def _clock(self) -> float:
+        now = self._ex.clock()
+        self._rec.record("clock", now)
+        return now
+
+    def __getattr__(self, name):
+        return getattr(self._ex, name)
+
+    def _call(self, name: str, *args, **kwargs):
+        try:
+            res = getattr(self._ex, name)(*args, **kwargs)
+        except Exception as e:
+            self._rec.record(name, _RecordedError(e))
+            raise
+        self._rec.record(name, res)
+        return res
+
+    def get_last_price(self):
+        return self._call("get_last_price")
+
+    def get_order_price(self):
+        # 発注枠での価格取得も get_last_price として記録（リプレイは通常経路で同じ値を返す）
+        getter = getattr(self._ex, "get_order_price", None) or self._ex.get_last_price
+        try:
+            res = getter()
+        except Exception as e:
+            self._rec.record("get_last_price", _RecordedError(e))
+            raise
+        self._rec.record("get_last_price", res)
+        return res
+
+    def get_orderbook(self):
+        return self._call("get_orderbook")
+
+    def get_current_position(self):
+        return self._call("get_current_position")
+
+    def fetch_ohlcv(self, timeframe: str, limit: int = 100):
+        return self._call("fetch_ohlcv", timeframe, limit=limit)
+
+    def place_market_order(self, side: str, qty: float):
+        return self._call("place_market_order", side=side, qty=qty)
+
+    def send_prepared(self, order):
+        # 作り置き経路も place_market_order として記録（リプレイは通常経路で同じ応答を返す）
+        try:
+            res = self._ex.send_prepared(order)
+        except Exception as e:
+            self._rec.record("place_market_order", _RecordedError(e))
+            raise
+        self._rec.record("place_market_order", res)
+        return res
+
+    def open_private_stream(self):
+        stream = self._ex.open_private_stream()
+        self._rec.record("open_private_stream", stream is not None)
+        return RecordingStream(stream, self._rec) if stream is not None else None
+
+    def open_public_stream(self):
+        opener = getattr(self._ex, "open_public_stream", None)
+        stream = opener() if opener is not None else None
+        self._rec.record("open_public_stream", stream is not None)
+        return RecordingStream(stream, self._rec, channel="ws_public") if stream is not None else None
+
+
+class ReplayExchange:
+    """
+    録画を取引所として再生する。各メソッドはチャネルごとの FIFO から記録値を返す
+    （BotRunner が同じ順で呼ぶ限り、入力はビット単位で一致）。
+      - clock(): 直近に返したフレームの記録時刻（features の now に使われる）。
+                 録画元の取引所が clock() を持っていた録画（先頭が "clock_source"）では記録したその時刻
+      - session: 録画時のモード（先頭の "session" フレーム。古い録画では空 dict）
+      - 記録が尽きたら ReplayExhausted
+    """
+
+    def __init__(self, paths: List[str], symbol: str = "DOGEUSDT"):
+        self.symbol = symbol
+        self._frames = read_frames(paths)
+        self._buf: Dict[str, Deque[Tuple[int, Any]]] = defaultdict(deque)
+        self._wall = 0.0
+        # WS 再生スレッドとメインループが同じフレーム列を読むため
+        self._lock = threading.Lock()
+        self._recorded_clock = False
+        self.session: Dict[str, Any] = {}
+        for _, wall_ns, ch, payload in self._frames:
+            if ch == "session":
+                self.session = dict(payload)
+            elif ch == "clock_source":
+                self._recorded_clock = bool(payload)
+            else:
+                self._buf[ch].append((wall_ns, payload))
+                break
+
+    def clock(self) -> float:
+        if self._recorded_clock:
+            return self._next("clock")
+        return self._wall
+
+    def _next(self, channel: str):
+        with self._lock:
+            buf = self._buf[channel]
+            while not buf:
+                try:
+                    _, wall_ns, ch, payload = next(self._frames)
+                except StopIteration:
+                    raise ReplayExhausted(channel) from None
+                self._buf[ch].append((wall_ns, payload))
+            wall_ns, payload = buf.popleft()
+            self._wall = wall_ns / 1e9
+        if isinstance(payload, _RecordedError):
+            raise RuntimeError(f"[replay] {payload.type_name}: {payload.message}")
+        return payload
+
+    def get_last_price(self):
+        return self._next("get_last_price")
+
+    def get_orderbook(self):
+        return self._next("get_orderbook")
+
+    def get_current_position(self):
+        return self._next("get_current_position")
+
+    def fetch_ohlcv(self, timeframe: str, limit: int = 100):
+        return self._next("fetch_ohlcv")
+
+    def place_market_order(self, side: str, qty: float):
+        return self._next("place_market_order")
+
+    def open_private_stream(self):
+        # WS メッセージは "ws" チャネルからローカルストリームとして再生
+        from bot.exchange.position_stream import LocalPrivateStream
+        try:
+            opened = self._next("open_private_stream")
+        except ReplayExhausted:
+            return None
+        if not opened:
+            return None
+        stream = LocalPrivateStream()
+        stream.recv = lambda timeout=0.5: self._next_ws()
+        return stream
+
+    def open_public_stream(self):
+        from bot.exchange.position_stream import LocalPrivateStream
+        try:
+            opened = self._next("open_public_stream")
+        except ReplayExhausted:
+            return None
+        if not opened:
+            return None
+        stream = LocalPrivateStream()
+        stream.recv = lambda timeout=0.5: self._next_ws("ws_public")
+        return stream
+
+    def _next_ws(self, channel: str = "ws"):
+        try:
+            return self._next(channel)
+        except ReplayExhausted:
+            time.sleep(0.05)
+            return None
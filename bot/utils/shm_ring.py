@@ -0,0 +1,224 @@
+# bot/utils/shm_ring.py
+from __future__ import annotations
+import math
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from bot.exchange.types import BookSide, OrderBook
+
+# スナップショットのスカラー項目（固定レイアウト。追加は末尾のみ → MAGIC/バージョンを上げる）
+SNAPSHOT_FIELDS: Tuple[str, ...] = (
+    "ts", "price", "last_close", "rsi", "sma_fast", "sma_slow",
+    "mid", "spread", "spread_bps",
+    "depth_imb_1", "depth_imb_5", "depth_imb_10", "depth_imb_20", "depth_imb_50",
+    "microprice", "weighted_mid", "book_slope_bid", "book_slope_ask", "book_slope",
+    "tick_up_ratio", "tick_down_ratio", "mom_1s", "mom_5s", "volatility", "trend_slope",
+    "liq_ratio", "depth_imbalance", "taker_bias",
+    "t_data",
+    "bb_mid", "bb_upper", "bb_lower", "atr",
+)
+BOOK_LEVELS = 20
+
+MAGIC = b"DOGERING"
+VERSION = 3
+
+_HEADER = np.dtype([
+    ("magic", "S8"), ("version", "<u4"), ("slots", "<u4"), ("levels", "<u4"),
+    ("nfields", "<u4"), ("head", "<i8"), ("pad", "u1", (32,)),
+])
+
+
+def snapshot_dtype(levels: int = BOOK_LEVELS) -> np.dtype:
+    """1スロットのレイアウト。全項目 8 バイトなので float64 の2次元ビューでまとめて書ける"""
+    return np.dtype(
+        [("seq", "<i8")]
+        + [(name, "<f8") for name in SNAPSHOT_FIELDS]
+        + [(name, "<f8", (levels,)) for name in ("bid_px", "bid_qty", "ask_px", "ask_qty")]
+    )
+
+
+def _nbytes(slots: int, levels: int) -> int:
+    return _HEADER.itemsize + slots * snapshot_dtype(levels).itemsize
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # 3.13 未満は attach 側も resource_tracker に登録される（同じ tracker を共有する子プロセスなら重複登録で無害）
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+class SnapshotRing:
+    """
+    共有メモリ上の単一 writer / 複数 reader のスナップショット・リングバッファ。
+      レイアウト: [header 64B][slot 0][slot 1]...（slot = snapshot_dtype）
+      - publish(): スロットの seq を -seq（書き込み中）→ 本体 → seq → header.head の順に更新
+      - reader は seq を本体コピーの前後で確認し、書き換え中/周回済みのスロットを捨てる（seqlock）
+    pickle を介さず numpy の構造化配列として読むので、受け渡しは数マイクロ秒。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        self.name = shm.name
+        self._header = np.ndarray((), dtype=_HEADER, buffer=shm.buf)
+        if not owner and (bytes(self._header["magic"]) != MAGIC or int(self._header["version"]) != VERSION):
+            shm.close()
+            raise ValueError(f"not a snapshot ring: {shm.name}")
+        self.slots = int(self._header["slots"])
+        self.levels = int(self._header["levels"])
+        dt = snapshot_dtype(self.levels)
+        self._ring = np.ndarray((self.slots,), dtype=dt, buffer=shm.buf, offset=_HEADER.itemsize)
+        self._flat = np.ndarray((self.slots, dt.itemsize // 8), dtype="<f8",
+                                buffer=shm.buf, offset=_HEADER.itemsize)
+        self._seqs = self._ring["seq"]
+        self._dtype = dt
+        self._nf = len(SNAPSHOT_FIELDS)
+
+        # writer 側の状態
+        self._seq = int(self._header["head"])
+        self._row = np.empty(dt.itemsize // 8 - 1, dtype=np.float64)
+        # reader 側の統計
+        self.lapped = 0
+        self.torn = 0
+
+    # ---- 生成 / 接続 ----
+    @classmethod
+    def create(cls, slots: int = 1024, levels: int = BOOK_LEVELS, name: Optional[str] = None) -> "SnapshotRing":
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_nbytes(slots, levels))
+        header = np.ndarray((), dtype=_HEADER, buffer=shm.buf)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["slots"] = slots
+        header["levels"] = levels
+        header["nfields"] = len(SNAPSHOT_FIELDS)
+        header["head"] = 0
+        ring = cls(shm, owner=True)
+        ring._seqs[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "SnapshotRing":
+        return cls(_attach(name), owner=False)
+
+    def close(self) -> None:
+        # ビューを先に手放さないと BufferError
+        self._header = self._ring = self._flat = self._seqs = None
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- writer ----
+    @property
+    def head(self) -> int:
+        return int(self._header["head"])
+
+    def publish(self, values: Mapping[str, Any], book=None) -> int:
+        """
+        values: indicators dict（None / 欠損は NaN）
+        book:   OrderBookArrays（上位 levels を格納。不足分は 0）
+        return: 付与した seq（1 始まり）
+        """
+        row = self._row
+        nf, L = self._nf, self.levels
+        for i, name in enumerate(SNAPSHOT_FIELDS):
+            v = values.get(name)
+            row[i] = math.nan if v is None else v
+        row[nf:] = 0.0
+        if book is not None:
+            for j, arr in enumerate((book.bid_px, book.bid_qty, book.ask_px, book.ask_qty)):
+                n = min(len(arr), L)
+                row[nf + j * L: nf + j * L + n] = arr[:n]
+
+        seq = self._seq + 1
+        i = seq % self.slots
+        self._seqs[i] = -seq
+        self._flat[i, 1:] = row
+        self._seqs[i] = seq
+        self._header["head"] = seq
+        self._seq = seq
+        return seq
+
+    # ---- reader ----
+    def read(self, seq: int) -> Optional[np.void]:
+        """seq のスナップショットのコピー。周回で上書き済み / 書き込み中なら None"""
+        i = seq % self.slots
+        if self._seqs[i] != seq:
+            return None
+        # 構造化スロットの copy() は遅いので float64 行としてコピーしてから型付け
+        rec = self._flat[i].copy().view(self._dtype)[0]
+        if self._seqs[i] != seq:
+            self.torn += 1
+            return None
+        return rec
+
+    def latest(self) -> Optional[np.void]:
+        head = self.head
+        while head > 0:
+            rec = self.read(head)
+            if rec is not None:
+                return rec
+            head = self.head
+        return None
+
+    def read_new(self, after_seq: int) -> List[np.void]:
+        """after_seq より新しいスナップショットを古い順に。追いつけなかった分は lapped に数える"""
+        head = self.head
+        if head <= after_seq:
+            return []
+        start = max(after_seq + 1, head - self.slots + 1)
+        self.lapped += start - (after_seq + 1)
+        out = []
+        for seq in range(start, head + 1):
+            rec = self.read(seq)
+            if rec is None:
+                self.lapped += 1
+                continue
+            out.append(rec)
+        return out
+
+    def wait(self, after_seq: int, timeout: float = 1.0, spin_sec: float = 0.0002,
+             max_sleep: float = 0.002) -> List[np.void]:
+        """新しいスナップショットが来るまで待つ（短時間スピン → 段階的に sleep）"""
+        deadline = time.monotonic() + timeout
+        spin_until = time.monotonic() + spin_sec
+        sleep = 0.0001
+        while True:
+            if self.head > after_seq:
+                return self.read_new(after_seq)
+            now = time.monotonic()
+            if now >= deadline:
+                return []
+            if now >= spin_until:
+                time.sleep(min(sleep, deadline - now))
+                sleep = min(sleep * 2, max_sleep)
+
+
+def snapshot_to_indicators(rec: np.void) -> Dict[str, Any]:
+    """構造化レコード → strategy が読む indicators dict（NaN は None に戻す）"""
+    vals = np.frombuffer(rec, dtype="<f8")[1:1 + len(SNAPSHOT_FIELDS)].tolist()
+    out: Dict[str, Any] = {
+        name: (None if v != v else v) for name, v in zip(SNAPSHOT_FIELDS, vals)
+    }
+    out["seq"] = int(rec["seq"])
+    return out
+
+
+def snapshot_book(rec: np.void) -> OrderBook:
+    """レコードの上位板 → OrderBook（数量 0 の埋め草レベルは除く）"""
+    bq, aq = rec["bid_qty"], rec["ask_qty"]
+    return OrderBook(BookSide(rec["bid_px"][bq > 0], bq[bq > 0]),
+                     BookSide(rec["ask_px"][aq > 0], aq[aq > 0]))
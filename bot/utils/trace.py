@@ -0,0 +1,65 @@
+# bot/utils/trace.py
+from __future__ import annotations
+import itertools
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+# シグナル → 約定のレイテンシ追跡。
+# trace（dict）に trace_id と各段の monotonic 時刻（秒）を載せて持ち回し、RAW ジャーナルの列に書き出す。
+#   t_data   : compute_market_features が価格・板を受け取った時刻
+#   t_signal : Strategy01.generate_signal（クローズは判定時）
+#   t_send   : 発注直前
+#   t_ack    : 取引所の応答（DRY_RUN は約定シミュレーション完了）
+#   ref_price: 判断に使った mid（slip_bps = 約定価格との差。不利方向が正）
+# monotonic は Linux ではプロセス間で共通なので、マルチプロセス構成でも差分がそのまま取れる。
+
+TRACE_COLUMNS = ("trace_id", "ref_price", "slip_bps", "t_data", "t_signal", "t_send", "t_ack")
+
+_PREFIX = f"{os.getpid():x}{random.getrandbits(16):04x}"
+_SEQ = itertools.count(1)
+
+
+def new_trace_id() -> str:
+    return f"{_PREFIX}-{next(_SEQ):x}"
+
+
+def now() -> float:
+    return time.monotonic()
+
+
+def from_indicators(indicators: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """indicators の trace_id / t_data / mid から trace を作る（判断時刻 t_signal を刻む）"""
+    ind = indicators or {}
+    return {
+        "trace_id": ind.get("trace_id") or new_trace_id(),
+        "t_data": ind.get("t_data"),
+        "t_signal": now(),
+        "ref_price": ind.get("mid") or ind.get("last_close"),
+    }
+
+
+def slip_bps(side: str, fill_price: Optional[float], ref_price: Optional[float]) -> Optional[float]:
+    """成行の実現スリッページ（bps）。Buy は高く、Sell は安く約定したら正"""
+    if not fill_price or not ref_price or ref_price <= 0:
+        return None
+    sign = 1.0 if side == "Buy" else -1.0
+    return sign * (fill_price - ref_price) / ref_price * 1e4
+
+
+def journal_fields(trace: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """trace → RAW ジャーナルの列（欠損は空欄。時刻は µs 精度）"""
+    trace = trace or {}
+    out: Dict[str, Any] = {}
+    for key in TRACE_COLUMNS:
+        v = trace.get(key)
+        if v is None:
+            out[key] = ""
+        elif key.startswith("t_"):
+            out[key] = f"{v:.6f}"
+        elif key == "slip_bps":
+            out[key] = f"{v:.4f}"
+        else:
+            out[key] = v
+    return out
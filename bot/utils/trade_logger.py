@@ -1,11 +1,166 @@
 # bot/utils/trade_logger.py
 from __future__ import annotations
 import csv
+import gzip
+import io
+import json
 import os
+import queue
+import re
+import threading
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 JST = timezone(timedelta(hours=9))
+DAY_SEC = 86_400
+MANIFEST = "manifest.json"
+
+# trades_YYYYMMDD.csv / trades_raw_YYYYMMDD.csv（圧縮済みは .csv.gz）
+_JOURNAL_NAME = re.compile(r"trades_(raw_)?(\d{8})\.csv(\.gz)?$")
+
+
+def _utc_day(t: float) -> str:
+    return time.strftime("%Y%m%d", time.gmtime(t))
+
+
+def open_journal(path: str):
+    """CSV ジャーナルをテキストで開く（.gz なら展開しながら読む）"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, "r", newline="")
+
+
+def journal_paths(logs_dir: str, kind: str = "raw", since: Optional[str] = None,
+                  until: Optional[str] = None, recursive: bool = False) -> List[str]:
+    """
+    logs_dir 内のジャーナル（kind: "raw" / "daily"）を日付順で返す。圧縮済み（.csv.gz）も含む。
+    since / until は YYYYMMDD（両端含む）。recursive=True ならサブディレクトリ（マルチプロセスの戦略別）も見る。
+    同じ日の .csv と .csv.gz が両方あれば（圧縮途中で落ちた等）.csv を使う。
+    """
+    found: Dict[tuple, str] = {}
+    walk = os.walk(logs_dir) if recursive else [(logs_dir, [], os.listdir(logs_dir) if os.path.isdir(logs_dir) else [])]
+    for d, _, files in walk:
+        for name in files:
+            m = _JOURNAL_NAME.match(name)
+            if not m or (kind == "raw") != bool(m.group(1)):
+                continue
+            day = m.group(2)
+            if (since and day < since) or (until and day > until):
+                continue
+            key = (d, day)
+            if key not in found or not m.group(3):
+                found[key] = os.path.join(d, name)
+    return [found[k] for k in sorted(found, key=lambda k: (k[1], k[0]))]
+
+
+def read_manifest(logs_dir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    圧縮済みジャーナルの索引（ファイル名 → {kind, day, rows, bytes, balance}）。
+    balance は その日の最終残高（raw: balance 列 / daily: balance_virtual 列。無ければ None）。
+    """
+    try:
+        with open(os.path.join(logs_dir, MANIFEST), "r") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+class _Compressor:
+    """
+    締まった日のジャーナルを gzip に置き換えるバックグラウンドスレッド（プロセスに1本）。
+      - tmp へ書いて os.replace → 元の .csv を削除（途中で落ちても .csv が残るだけ。次回起動時にやり直す）
+      - 終わったら logs_dir/manifest.json に行数・サイズ・最終残高を書く
+    """
+
+    def __init__(self):
+        self._q: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._loop, name="journal-compressor", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str) -> None:
+        self._q.put(path)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """キューが空になるまで待つ（timeout 秒で諦める）。return: 全部終わったか"""
+        end = None if timeout is None else time.monotonic() + timeout
+        while self._q.unfinished_tasks:
+            if end is not None and time.monotonic() >= end:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _loop(self) -> None:
+        while True:
+            path = self._q.get()
+            try:
+                self._compress(path)
+            except Exception:
+                self.failed += 1
+            finally:
+                self._q.task_done()
+
+    def _compress(self, path: str) -> None:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return  # 別インスタンスが先に圧縮済み
+        name = os.path.basename(path)
+        m = _JOURNAL_NAME.match(name)
+        kind = "raw" if m.group(1) else "daily"
+        col = "balance" if kind == "raw" else "balance_virtual"
+
+        rows = 0
+        balance = None
+        text = data.decode("utf-8", errors="replace")
+        for r in csv.DictReader(io.StringIO(text)):
+            rows += 1
+            if r.get(col):
+                try:
+                    balance = float(r[col])
+                except ValueError:
+                    pass
+
+        gz = path + ".gz"
+        tmp = f"{gz}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(data)
+        os.replace(tmp, gz)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self._record(os.path.dirname(path), os.path.basename(gz), {
+            "kind": kind, "day": m.group(2), "rows": rows,
+            "bytes": os.path.getsize(gz), "raw_bytes": len(data), "balance": balance,
+        })
+        self.compressed += 1
+
+    def _record(self, logs_dir: str, name: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            files = read_manifest(logs_dir)
+            files[name] = entry
+            path = os.path.join(logs_dir, MANIFEST)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"version": 1, "files": dict(sorted(files.items()))}, f, indent=1)
+            os.replace(tmp, path)
+
+
+_compressor: Optional[_Compressor] = None
+_compressor_lock = threading.Lock()
+
+
+def compressor() -> _Compressor:
+    global _compressor
+    with _compressor_lock:
+        if _compressor is None:
+            _compressor = _Compressor()
+        return _compressor
 
 
 class TradeLogger:
@@ -18,6 +173,10 @@ class TradeLogger:
       2) 生ログ(raw): 指定があれば csv_path（append / read_last）
          なければ logs/trades_raw_YYYYMMDD.csv に出力
 
+    - 日付の切り替え: 次の UTC 0時（エポック秒）を持っておき、書き込みごとに比較1回だけ。
+      越えたらファイルを切り替え、締まった日は（compress=True なら）バックグラウンドで .csv.gz にして
+      logs_dir/manifest.json に載せる。起動時に残っている過去日の .csv も同様に圧縮する。
+
     - order_executor からは append()/read_last() を使う想定
       （self.virtual_balance を read_last() で継承）
     """
@@ -29,7 +188,12 @@ class TradeLogger:
     ]
 
     # RAWログ（生データ）のヘッダ（order_executor 互換）
-    RAW_HEADER = ["ts", "symbol", "side", "qty", "price", "fee", "realized_pnl", "balance", "note"]
+    # trace_id 〜 t_ack はレイテンシ追跡（bot/utils/trace.py。t_* は monotonic 秒、slip_bps は不利方向が正）
+    RAW_HEADER = [
+        "ts", "symbol", "side", "qty", "price", "fee",
+        "trace_id", "ref_price", "slip_bps", "t_data", "t_signal", "t_send", "t_ack",
+        "realized_pnl", "balance", "note",
+    ]
 
     def __init__(
         self,
@@ -37,26 +201,59 @@ class TradeLogger:
         logs_dir: str = "logs",                   # 指定がなければ logs_dir/ に日次rawを作る
         symbol: str = "DOGEUSDT",
         starting_balance: float = 50.0,           # 初期の仮想残高
+        compress: bool = True,                    # 締まった日を gzip にするか
     ):
         self.symbol = symbol
         self.logs_dir = logs_dir
+        self.compress = compress
         os.makedirs(self.logs_dir, exist_ok=True)
 
-        # 日次CSV（集計用）
-        self.filepath = self._filepath_for_today()
-        self._ensure_header()
-
         # RAWログ先の決定
         self.raw_path_fixed = csv_path
-        # 仮想残高の初期化（raw→日次の順に引き継ぎを試みる）
+        self._raw_checked: Optional[str] = None   # ヘッダ確認済みの RAW パス
+
+        # 日次CSV（集計用）・日次RAW のパス（_roll で日付が変わるたびに更新）
+        self._day_end = 0.0
+        self._roll(time.time(), startup=True)
+
+        # 仮想残高の初期化（raw→日次→締まった日 の順に引き継ぎを試みる）
         self.balance_virtual = self._load_last_balance_or_default(starting_balance)
 
+    # ====== 日付の切り替え ======
+
+    def _maybe_roll(self) -> None:
+        now = time.time()
+        if now >= self._day_end:
+            self._roll(now)
+
+    def _roll(self, now: float, startup: bool = False) -> None:
+        prev = [] if startup else [self.filepath, self.raw_path]
+        self.day = _utc_day(now)
+        self._day_end = (now // DAY_SEC + 1) * DAY_SEC
+        self.filepath = os.path.join(self.logs_dir, f"trades_{self.day}.csv")
+        self.raw_path = self.raw_path_fixed or os.path.join(self.logs_dir, f"trades_raw_{self.day}.csv")
+        self._ensure_header()
+        self._raw_ready = False
+
+        if not self.compress:
+            return
+        if startup:
+            # 前回の実行で締まったまま残っている過去日
+            prev = [p for p in journal_paths(self.logs_dir, "daily") + journal_paths(self.logs_dir, "raw")
+                    if p.endswith(".csv") and _JOURNAL_NAME.match(os.path.basename(p)).group(2) < self.day]
+        for p in prev:
+            if p != self.raw_path_fixed and os.path.exists(p):
+                compressor().submit(p)
+
+    def close(self, timeout: float = 5.0) -> bool:
+        """圧縮待ちを書き終えるまで待つ（終了時用）"""
+        return compressor().join(timeout) if _compressor is not None else True
+
     # ====== 日次CSV（集計用） ======
 
     def _filepath_for_today(self) -> str:
-        # ファイル名は UTC ベース
-        today = datetime.utcnow().strftime("%Y%m%d")
-        return os.path.join(self.logs_dir, f"trades_{today}.csv")
+        self._maybe_roll()
+        return self.filepath
 
     def _ensure_header(self) -> None:
         if not os.path.exists(self.filepath) or os.path.getsize(self.filepath) == 0:
@@ -66,9 +263,9 @@ class TradeLogger:
 
     def _load_last_balance_or_default(self, default_balance: float) -> float:
         """
-        raw（固定 or 日次）→ 日次集計 の順に balance を引き継ぐ。
+        raw（固定 or 日次）→ 日次集計 → 締まった日（manifest / 過去日のファイル）の順に balance を引き継ぐ。
         """
-        raw_path = self._raw_path_for_today()
+        raw_path = self.raw_path
 
         # 1) RAW（固定）
         if self.raw_path_fixed and os.path.exists(self.raw_path_fixed):
@@ -99,17 +296,42 @@ class TradeLogger:
         # 3) 日次集計
         if os.path.exists(self.filepath):
             try:
-                last_balance = default_balance
+                last_balance = None
                 with open(self.filepath, "r") as f:
                     reader = csv.DictReader(f)
                     for row in reader:
                         if row.get("balance_virtual"):
                             last_balance = float(row["balance_virtual"])
-                return last_balance
+                if last_balance is not None:
+                    return last_balance
             except Exception:
                 return default_balance
 
-        return default_balance
+        # 4) 締まった日（新しい日から。manifest にあれば開かずに済む）
+        prev = self._last_closed_balance()
+        return default_balance if prev is None else prev
+
+    def _last_closed_balance(self) -> Optional[float]:
+        manifest = read_manifest(self.logs_dir)
+        for kind, col in (("raw", "balance"), ("daily", "balance_virtual")):
+            for path in reversed(journal_paths(self.logs_dir, kind, until=self.day)):
+                name = os.path.basename(path)
+                if name in (os.path.basename(self.filepath), os.path.basename(self.raw_path)):
+                    continue
+                if name in manifest:
+                    bal = manifest[name].get("balance")
+                else:
+                    bal = None
+                    try:
+                        with open_journal(path) as f:
+                            for r in csv.DictReader(f):
+                                if r.get(col):
+                                    bal = float(r[col])
+                    except Exception:
+                        pass
+                if bal is not None:
+                    return float(bal)
+        return None
 
     def _jst_now(self) -> str:
         """JST(+09:00) のISO8601文字列を返す"""
@@ -139,6 +361,7 @@ class TradeLogger:
 
         self.balance_virtual += pnl
 
+        self._maybe_roll()
         with open(self.filepath, "a", newline="") as f:
             writer = csv.writer(f)
             writer.writerow([
@@ -156,6 +379,7 @@ class TradeLogger:
 
     def annotate(self, note: str) -> None:
         """任意の注記行（pnl/balanceは空欄でメモだけ残す）"""
+        self._maybe_roll()
         with open(self.filepath, "a", newline="") as f:
             writer = csv.writer(f)
             writer.writerow([
@@ -166,26 +390,46 @@ class TradeLogger:
     # ====== RAWログ（order_executor 互換） ======
 
     def _raw_path_for_today(self) -> str:
-        if self.raw_path_fixed:
-            return self.raw_path_fixed
-        today = datetime.utcnow().strftime("%Y%m%d")
-        return os.path.join(self.logs_dir, f"trades_raw_{today}.csv")
+        self._maybe_roll()
+        return self.raw_path
 
     def _ensure_raw_header(self) -> None:
-        raw_path = self._raw_path_for_today()
+        """切り替え後の最初の書き込みで1回だけ（毎行のファイル存在確認はしない）"""
+        if self._raw_ready:
+            return
+        raw_path = self.raw_path
         if not os.path.exists(raw_path) or os.path.getsize(raw_path) == 0:
             with open(raw_path, "w", newline="") as f:
                 writer = csv.writer(f)
                 writer.writerow(self.RAW_HEADER)
+        elif raw_path != self._raw_checked:
+            self._migrate_raw_header(raw_path)
+            self._raw_checked = raw_path
+        self._raw_ready = True
+
+    def _migrate_raw_header(self, raw_path: str) -> None:
+        """旧ヘッダの RAW ファイルに追記すると列がずれるため、現ヘッダへ列名で詰め替える（1ファイル1回）"""
+        with open(raw_path, "r", newline="") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames == self.RAW_HEADER:
+                return
+            rows = list(reader)
+        tmp = raw_path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.RAW_HEADER, extrasaction="ignore", restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp, raw_path)
 
     def append(self, row: Dict[str, Any]) -> None:
         """
         order_executor._log_trade() から呼ばれる互換API。
-        受け取った dict をそのまま RAW CSV に落とす。
+        受け取った dict をそのまま RAW CSV に落とす（RAW_HEADER に無いキーは捨て、欠けた列は空欄）。
         期待キー: ts, symbol, side, qty, price, fee, realized_pnl, balance, note
+                  + trace 列（bot.utils.trace.journal_fields）
         """
+        self._maybe_roll()
         self._ensure_raw_header()
-        raw_path = self._raw_path_for_today()
 
         # --- JST変換 ---
         ts = row.get("ts", "")
@@ -202,27 +446,18 @@ class TradeLogger:
             except Exception:
                 pass  # 失敗時は元のまま
 
-        with open(raw_path, "a", newline="") as f:
+        with open(self.raw_path, "a", newline="") as f:
             writer = csv.writer(f)
-            writer.writerow([
-                ts,
-                row.get("symbol", ""),
-                row.get("side", ""),
-                row.get("qty", ""),
-                row.get("price", ""),
-                row.get("fee", ""),
-                row.get("realized_pnl", ""),
-                row.get("balance", ""),
-                row.get("note", ""),
-            ])
+            writer.writerow([ts] + [row.get(k, "") for k in self.RAW_HEADER[1:]])
 
     def read_last(self) -> Optional[Dict[str, float]]:
         """
         order_executor 初期化時の仮想残高引き継ぎ用。
         まず RAW（固定 or 日次）を見て、無ければ日次CSVから balance を拾う。
         """
+        self._maybe_roll()
         # 1) RAW（固定 or 日次）
-        for raw_path in [self.raw_path_fixed, (None if self.raw_path_fixed else self._raw_path_for_today())]:
+        for raw_path in [self.raw_path_fixed, (None if self.raw_path_fixed else self.raw_path)]:
             if raw_path and os.path.exists(raw_path):
                 try:
                     last = None
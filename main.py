@@ -1,48 +1,30 @@
 import time
-import traceback
-import logging
-from dotenv import dotenv_values
+from bot.config import load_config
 from bot.core import BotRunner
+from bot.utils.log_pipeline import setup_logging
 
-class Config:
-    def __init__(self, values: dict):
-        for key, value in values.items():
-            if isinstance(value, str):
-                if value.lower() == "true":
-                    setattr(self, key, True)
-                elif value.lower() == "false":
-                    setattr(self, key, False)
-                else:
-                    try:
-                        num_val = float(value)
-                        setattr(self, key, int(num_val) if num_val.is_integer() else num_val)
-                    except ValueError:
-                        setattr(self, key, value)
-            else:
-                setattr(self, key, value)
-
-# === .envの読み込み ===
-raw_config = dotenv_values("env/.env")
-config = Config(raw_config)
-
-# === ロガー設定 ===
-logging.basicConfig(
-    level=logging.DEBUG,  # ← INFO → DEBUG に変更
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-)
-logger = logging.getLogger("DogeBot")
+# === .envの読み込み（型変換・検証はロード時に一度だけ。不正値なら起動失敗） ===
+config = load_config("env/.env")
 
 # === BotRunner起動 ===
-print("✅ RSI_PERIOD in config:", getattr(config, "RSI_PERIOD", "NOT FOUND"))
-runner = BotRunner(config=config, logger=logger)
+print("✅ RSI_PERIOD in config:", config.RSI_PERIOD)
 
 # === 実行ループ ===
+# （spawn した子プロセスは main を再 import するので、起動処理は必ずこの下で行う）
 if __name__ == "__main__":
+    # === ロガー設定（LOG_LEVEL。出力はバックグラウンドスレッド: コンソール + LOG_JSON_FILE） ===
+    logger = setup_logging(config)
+
+    if config.MULTIPROCESS:
+        from bot.multiproc import run_multiprocess
+        run_multiprocess(config, logger)
+        raise SystemExit(0)
+
+    runner = BotRunner(config=config, logger=logger)
     while True:
         try:
-            print("▶ running...")
             runner.run()
         except Exception as e:
             logger.error("❌ Error: %s", e, exc_info=True)
-            traceback.print_exc()
-        time.sleep(int(getattr(config, "POLL_SEC", 15)))
+            # 待ち時間は runner.run() 内（適応ポーリング）。例外時のみここで間を空ける
+            time.sleep(config.POLL_SEC)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# scripts/generate_report.py
+"""
+trades_raw_*.csv（圧縮済み .csv.gz も）からパフォーマンスレポート（HTML / PDF）を生成する（Stage8 S8-1）。
+
+使い方:
+  python scripts/generate_report.py                       # logs/ 全期間 → docs/report.html
+  python scripts/generate_report.py --since 20251001 --pdf docs/report.pdf
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bot.analytics.performance import Journal, compute_metrics  # noqa: E402
+from bot.analytics.report import render_html, render_pdf  # noqa: E402
+from bot.utils.trade_logger import journal_paths  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description="トレードジャーナルのレポート生成")
+    ap.add_argument("--logs", default=str(ROOT / "logs"))
+    ap.add_argument("--since", help="YYYYMMDD（ファイル名の日付で絞り込み）")
+    ap.add_argument("--until", help="YYYYMMDD")
+    ap.add_argument("--html", default=str(ROOT / "docs" / "report.html"))
+    ap.add_argument("--pdf", help="PDF 出力先（省略時は出力しない）")
+    ap.add_argument("--balance", type=float, help="開始残高（省略時はジャーナルから推定）")
+    args = ap.parse_args()
+
+    paths = journal_paths(args.logs, "raw", since=args.since, until=args.until)
+    if not paths:
+        print(f"⚠ trades_raw_*.csv が見つかりません: {args.logs}")
+        return
+
+    journal = Journal.load(paths)
+    metrics = compute_metrics(journal, starting_balance=args.balance)
+    print(f"✅ {len(paths)} files, {journal.n} rows, {metrics['trades']} closed trades")
+
+    print(f"✅ HTML: {render_html(metrics, args.html)}")
+    if args.pdf:
+        out = render_pdf(metrics, args.pdf)
+        print(f"✅ PDF: {out}" if out else "⚠ matplotlib が無いため PDF は出力しません")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# scripts/import_history.py
+"""
+過去データ（kline CSV）をローカルの MarketDataStore へ一括取り込みする。
+
+CSV 例（ヘッダ必須・列名は大小文字を区別しない）:
+  start,open,high,low,close,volume
+  1700000000000,0.0712,0.0715,0.0711,0.0714,123456
+start/ts/timestamp 列はエポックms・エポック秒・ISO8601 のいずれでも可。
+
+使い方:
+  python scripts/import_history.py data/DOGEUSDT_1m_*.csv --symbol DOGEUSDT --interval 1m
+"""
+import argparse
+import csv
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bot.data.store import KLINE_DTYPE, MarketDataStore  # noqa: E402
+
+CHUNK = 100_000
+
+
+def _to_ms(v: str) -> int:
+    v = v.strip()
+    try:
+        x = float(v)
+        return int(x if x > 1e11 else x * 1000)
+    except ValueError:
+        dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp() * 1000)
+
+
+def import_csv(store: MarketDataStore, path: Path, symbol: str, interval: str) -> int:
+    total = 0
+    buf = np.zeros(CHUNK, dtype=KLINE_DTYPE)
+    n = 0
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        cols = {c.lower().strip(): c for c in (reader.fieldnames or [])}
+        ts_col = next((cols[c] for c in ("start", "ts", "timestamp", "open_time", "time") if c in cols), None)
+        if ts_col is None:
+            raise SystemExit(f"{path}: timestamp column not found")
+        for row in reader:
+            rec = buf[n]
+            rec["ts"] = _to_ms(row[ts_col])
+            for k in ("open", "high", "low", "close", "volume"):
+                rec[k] = float(row.get(cols.get(k, k)) or 0.0)
+            n += 1
+            if n == CHUNK:
+                total += store.append(symbol, f"kline_{interval}", np.sort(buf[:n], order="ts"))
+                n = 0
+    if n:
+        total += store.append(symbol, f"kline_{interval}", np.sort(buf[:n], order="ts"))
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description="kline CSV を MarketDataStore へ取り込み")
+    ap.add_argument("files", nargs="+", type=Path)
+    ap.add_argument("--symbol", default="DOGEUSDT")
+    ap.add_argument("--interval", default="1m")
+    ap.add_argument("--root", default=str(ROOT / "logs" / "market"))
+    args = ap.parse_args()
+
+    store = MarketDataStore(root=args.root)
+    for path in sorted(args.files):
+        n = import_csv(store, path, args.symbol, args.interval)
+        print(f"✅ {path}: {n} rows")
+    if store.dropped:
+        print(f"⚠ skipped {store.dropped} out-of-order/duplicate rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# scripts/latency_report.py
+"""
+RAW ジャーナル（trades_raw_*.csv / .csv.gz）のトレース列から、シグナル → 約定のレイテンシと
+実現スリッページの関係を集計して表示する。
+
+  data→signal : 価格・板の受信 → シグナル生成
+  signal→send : シグナル → 発注
+  send→ack    : 発注 → 取引所応答（DRY_RUN は約定シミュレーション）
+  data→ack    : 合計（この分位バケットごとに平均スリッページを出す）
+
+使い方:
+  python scripts/latency_report.py                     # logs/ 以下（マルチプロセスのサブディレクトリも含む）
+  python scripts/latency_report.py --logs /tmp/doge-load-xxxx --since 20251001 --buckets 10
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bot.analytics.performance import Journal, compute_latency  # noqa: E402
+from bot.utils.trade_logger import journal_paths  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description="レイテンシ × スリッページのレポート")
+    ap.add_argument("--logs", default=str(ROOT / "logs"))
+    ap.add_argument("--since", help="YYYYMMDD（ファイル名の日付で絞り込み）")
+    ap.add_argument("--until", help="YYYYMMDD")
+    ap.add_argument("--buckets", type=int, default=5)
+    args = ap.parse_args()
+
+    paths = journal_paths(args.logs, "raw", since=args.since, until=args.until, recursive=True)
+    if not paths:
+        print(f"⚠ trades_raw_*.csv が見つかりません: {args.logs}")
+        return
+
+    r = compute_latency(Journal.load(paths), n_buckets=args.buckets)
+    print(f"✅ {len(paths)} files, {r['fills']} fills with trace ({r['with_slippage']} with slippage)")
+    if not r["fills"]:
+        return
+
+    print(f"\n{'stage':<16}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (ms)")
+    for name, st in r["stages"].items():
+        print(f"{name:<16}{st['count']:>6}{st['p50']:>10.2f}{st['p95']:>10.2f}{st['p99']:>10.2f}{st['max']:>10.2f}")
+
+    print(f"\nslippage: mean {r['slip_bps_mean']:.2f} bps, p95 {r['slip_bps_p95']:.2f} bps, "
+          f"slope {r['slip_per_ms']:.4f} bps/ms, corr {r['corr']:.3f}")
+    b = r["buckets"]
+    if b:
+        print(f"\n{'data→ack (ms)':<24}{'n':>6}{'avg ms':>10}{'avg slip bps':>14}")
+        edges = b["edges"]
+        for i in range(len(edges) - 1):
+            label = f"{edges[i]:.1f} – {edges[i + 1]:.1f}"
+            print(f"{label:<24}{int(b['count'][i]):>6}{b['latency_ms_mean'][i]:>10.2f}{b['slip_bps_mean'][i]:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# scripts/load_test.py
+"""
+ローカルの fake Bybit（bot/testing/fake_bybit.py）に対して本物の BotRunner を回す負荷試験。
+市場データはシード固定（--seed）または録画（--recording）。N シンボル × M 更新/秒、遅延・エラーを注入し、
+エンドツーエンドの判断レイテンシとスループットを出す。
+
+  cycle    : 1サイクル（設定反映 → REST 取得 → 特徴量 → 判断・発注）の所要時間
+  decision : サーバが板を生成した時刻 → 判断完了までの時間（データの鮮度を含む）
+
+feature_state / order_book がモジュールグローバルのため、シンボルごとに1プロセス（spawn）で回す。
+
+使い方:
+  python scripts/load_test.py --symbols 4 --rate 20 --duration 30 --latency-ms 20 --jitter-ms 10 --error-rate 0.01
+  python scripts/load_test.py --recording logs/recordings --duration 60
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from bot.config import BotConfig, load_config  # noqa: E402
+from bot.core import BotRunner  # noqa: E402
+from bot.exchange.bybit import BybitExchange  # noqa: E402
+from bot.features.change import stage_stats  # noqa: E402
+from bot.testing.fake_bybit import FakeBybitServer, script_from_recording  # noqa: E402
+from bot.utils.recorder import segment_paths  # noqa: E402
+
+
+class _Probe:
+    """取引所ラッパー: 直近に取得した板のサーバ時刻（OrderBook.ts）を覚えておく"""
+
+    def __init__(self, exchange):
+        self._ex = exchange
+        self.book_ts = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self._ex, name)
+
+    def get_orderbook(self):
+        ob = self._ex.get_orderbook()
+        self.book_ts = ob.ts
+        return ob
+
+
+def _bench(config: BotConfig, duration: float, out) -> None:
+    """子プロセス: BotRunner を duration 秒回してサイクルごとの計測値を返す"""
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    logger = logging.getLogger(f"DogeBot.load.{config.SYMBOL}")
+    probe = _Probe(BybitExchange(config, logger))
+    runner = BotRunner(config=config, logger=logger, exchange=probe)
+
+    cycle, decision, errors = [], [], Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        try:
+            runner._apply_config_reload()
+            indicators = runner._collect_indicators()
+            runner._act(indicators)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+            time.sleep(0.01)
+            continue
+        cycle.append(time.perf_counter() - t0)
+        if probe.book_ts:
+            decision.append(time.time() - probe.book_ts)
+        delay = runner.poller.next_interval(indicators, runner.last_position)
+        if delay > 0:
+            time.sleep(delay)
+
+    runner.position_tracker.stop()
+    runner.exit_engine.stop()
+    sched = runner.api_scheduler.stats() if runner.api_scheduler is not None else {}
+    out.put({"symbol": config.SYMBOL, "cycle": cycle, "decision": decision,
+             "errors": dict(errors), "scheduler": sched, "stages": stage_stats.snapshot()})
+
+
+def _pct(xs, q) -> float:
+    return float(np.percentile(xs, q)) * 1e3 if len(xs) else float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="fake Bybit に対する BotRunner の負荷試験")
+    ap.add_argument("--symbols", type=int, default=1, help="シンボル数（1シンボル1プロセス）")
+    ap.add_argument("--rate", type=float, default=10.0, help="シンボルあたりの市場更新回数/秒（0 = 板リクエストごとに1ステップ）")
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="HTTP 503 / retCode 10006 を返す割合")
+    ap.add_argument("--server-rate-limit", type=float, default=0.0, help="サーバ側のレート上限（回/秒、0 = なし）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--recording", default=None, help="MarketRecorder の録画ディレクトリ（全シンボルに同じ台本）")
+    ap.add_argument("--api-rate", type=float, default=None,
+                    help="API_RATE_LIMIT_PER_SEC / API_RATE_BURST の上書き（既定は設定値 = 本番と同じ予算）")
+    ap.add_argument("--poll-sec", type=float, default=0.0, help="固定ポーリング間隔（0 = 待たずに回す）")
+    ap.add_argument("--adaptive", action="store_true", help="適応ポーリング（POLL_ADAPTIVE）で回す")
+    ap.add_argument("--no-ws", action="store_true", help="private WS を使わず REST でポジション照会")
+    ap.add_argument("--aggressive", action="store_true", help="RSI しきい値を緩めて発注経路も負荷に含める")
+    ap.add_argument("--env", default=None, help="ベースにする .env（既定はスキーマの既定値）")
+    args = ap.parse_args()
+
+    base = load_config(args.env) if args.env else BotConfig()
+    symbols = [f"SYM{i:02d}USDT" for i in range(args.symbols)] if args.symbols > 1 else [base.SYMBOL]
+    scripts = None
+    if args.recording:
+        script = script_from_recording(segment_paths(args.recording))
+        if not script:
+            print(f"⚠ 録画から板が取れません: {args.recording}")
+            return
+        scripts = {s: script for s in symbols}
+
+    tmp = tempfile.mkdtemp(prefix="doge-load-")
+    overrides = dict(
+        DRY_RUN=False, POLL_SEC=args.poll_sec, POLL_ADAPTIVE=args.adaptive,
+        CHECKPOINT_ENABLED=False, CONFIG_HOT_RELOAD=False, RECORDER_ENABLED=False,
+        MARKET_STORE_ENABLED=False, DISCORD_WEBHOOK_URL="", POSITION_STREAM=not args.no_ws,
+    )
+    if args.api_rate is not None:
+        overrides.update(API_RATE_LIMIT_PER_SEC=args.api_rate, API_RATE_BURST=max(args.api_rate, 1.0))
+    if args.aggressive:
+        overrides.update(RSI_BUY_THRESHOLD=49.0, RSI_SELL_THRESHOLD=51.0, RSI_EXIT_LONG=50.0,
+                         RSI_EXIT_SHORT=50.0, DEPTH_IMB_THRESHOLD=0.0, TAKER_BIAS_THRESHOLD=0.0)
+
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    with FakeBybitServer(symbols, updates_per_sec=args.rate, latency_ms=args.latency_ms,
+                         jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                         rate_limit_per_sec=args.server_rate_limit, seed=args.seed, scripts=scripts) as srv:
+        procs = []
+        for s in symbols:
+            cfg = base.replace(SYMBOL=s, BYBIT_BASE_URL=srv.url, BYBIT_WS_PRIVATE_URL=srv.ws_url,
+                               BYBIT_WS_PUBLIC_URL=srv.ws_public_url,
+                               TRADE_LOG_DIR=os.path.join(tmp, s), **overrides)
+            p = ctx.Process(target=_bench, args=(cfg, args.duration, out), name=f"load-{s}", daemon=True)
+            p.start()
+            procs.append(p)
+        results = [out.get(timeout=args.duration + 120) for _ in procs]
+        for p in procs:
+            p.join(timeout=10)
+        server = srv.stats()
+
+    print(f"=== load test: {len(symbols)} symbols × {args.rate:g} updates/s, {args.duration:g}s, "
+          f"latency {args.latency_ms:g}±{args.jitter_ms:g}ms, error_rate {args.error_rate:g} ===")
+    print(f"{'symbol':<12}{'cycles':>8}{'cyc/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+          f"{'dec p50':>9}{'dec p99':>9}  errors")
+    all_cycle, all_decision, total = [], [], 0
+    for r in sorted(results, key=lambda r: r["symbol"]):
+        c, d = r["cycle"], r["decision"]
+        all_cycle += c
+        all_decision += d
+        total += len(c)
+        print(f"{r['symbol']:<12}{len(c):>8}{len(c) / args.duration:>8.1f}{_pct(c, 50):>9.2f}{_pct(c, 95):>9.2f}"
+              f"{_pct(c, 99):>9.2f}{_pct(c, 100):>9.2f}{_pct(d, 50):>9.2f}{_pct(d, 99):>9.2f}  {r['errors'] or '-'}")
+    print(f"{'TOTAL':<12}{total:>8}{total / args.duration:>8.1f}{_pct(all_cycle, 50):>9.2f}"
+          f"{_pct(all_cycle, 95):>9.2f}{_pct(all_cycle, 99):>9.2f}{_pct(all_cycle, 100):>9.2f}"
+          f"{_pct(all_decision, 50):>9.2f}{_pct(all_decision, 99):>9.2f}   (ms)")
+
+    for r in sorted(results, key=lambda r: r["symbol"]):
+        for name, st in r["scheduler"].items():
+            if st["calls"] or st["shed"]:
+                print(f"  scheduler {r['symbol']} {name:<8} calls={st['calls']} shed={st['shed']} "
+                      f"coalesced={st['coalesced']} wait p99={st['wait_ms_p99']:.2f}ms max={st['wait_ms_max']:.2f}ms")
+    for r in sorted(results, key=lambda r: r["symbol"]):
+        stages = " ".join(f"{name}={st['reused']}/{st['computed'] + st['reused']} ({st['reused_pct']:.0f}%)"
+                          for name, st in r["stages"].items())
+        print(f"  reused {r['symbol']} {stages or '-'}")
+    print(f"  server: {server}")
+    print(f"  trade logs: {tmp}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# scripts/replay_session.py
+"""
+MarketRecorder の録画（seg_*.rec.gz）を BotRunner に流し込み、当時の判断を再現する。
+取引所レスポンスは記録順にそのまま返るため、戦略への入力はビット単位で一致する。
+DRY_RUN / 約定シミュレータは録画先頭の session に合わせる（実運用の録画は記録した発注応答で再生し、
+約定シミュレータは使わない）。session の無い古い録画は DRY_RUN として再生する。
+
+使い方:
+  python scripts/replay_session.py logs/recordings [--env env/.env] [--debug]
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bot.config import load_config  # noqa: E402
+from bot.core import BotRunner  # noqa: E402
+from bot.utils.recorder import ReplayExchange, ReplayExhausted, segment_paths  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description="録画データで BotRunner を再生")
+    ap.add_argument("rec_dir")
+    ap.add_argument("--env", default=str(ROOT / "env" / ".env"))
+    ap.add_argument("--debug", action="store_true")
+    args = ap.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    logger = logging.getLogger("DogeBot.replay")
+
+    paths = segment_paths(args.rec_dir)
+    if not paths:
+        print(f"⚠ 録画が見つかりません: {args.rec_dir}")
+        return
+
+    # 再生中は録画・チェックポイント・待機・レート制御・ホットリロードを無効化
+    config = load_config(args.env)
+    exchange = ReplayExchange(paths, symbol=config.SYMBOL)
+    session = exchange.session
+    if not session:
+        logger.warning("[replay] recording has no session header; replaying as DRY_RUN")
+    dry_run = bool(session.get("dry_run", True))
+    config = config.replace(
+        DRY_RUN=dry_run, PAPER_MATCHING=dry_run and bool(session.get("paper_matching", config.PAPER_MATCHING)),
+        POLL_SEC=0, POLL_ADAPTIVE=False, API_SCHEDULER=False, RECORDER_ENABLED=False,
+        CHECKPOINT_ENABLED=False, CONFIG_HOT_RELOAD=False,
+    )
+    print(f"=== replay: {'DRY_RUN' if dry_run else 'live (recorded order responses)'} ===")
+    cycles = 0
+    try:
+        runner = BotRunner(config=config, logger=logger, exchange=exchange)
+        while True:
+            runner.run()
+            cycles += 1
+    except ReplayExhausted:
+        pass
+    print(f"✅ replayed {cycles} cycles from {len(paths)} segments")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# scripts/soak_test.py
+"""
+合成マーケット（bot/exchange/synthetic.py）で BotRunner をシミュレーション上の数日〜数週間回す長時間試験。
+ネットワーク・待機なしで回し、シミュレーション1日ごとにスループットとメモリ（RSS）の推移を出す。
+先に生成器だけのスループット（ティック/秒・板/秒）も測る。
+
+  cyc/s : 実時間1秒あたりのサイクル数      speed : シミュレーション時間 / 実時間
+  rss   : 常駐メモリ（MB。日をまたいで増え続けるならリーク）
+
+使い方:
+  python scripts/soak_test.py --days 14 --cycle-sec 15 --seed 0
+  python scripts/soak_test.py --days 7 --aggressive --bench-ticks 0
+"""
+import argparse
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from bot.config import BotConfig, load_config  # noqa: E402
+from bot.core import BotRunner  # noqa: E402
+from bot.exchange.synthetic import SyntheticMarket  # noqa: E402
+from bot.features.change import stage_stats  # noqa: E402
+from bot.features.features import feature_state  # noqa: E402
+
+_DAY = 86_400.0
+
+
+def _rss_mb() -> float:
+    """現在の RSS（/proc が無ければピーク値）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _bench_generator(seed: int, total: int, block: int) -> None:
+    market = SyntheticMarket(seed=seed)
+    market.generate(block)
+    sim0 = market.t
+    n, t0 = 0, time.perf_counter()
+    while n < total:
+        blk = market.generate(block)
+        n += len(blk)
+    dt = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    market.books(blk, np.arange(min(len(blk), 100_000)))
+    books = min(len(blk), 100_000) / (time.perf_counter() - t1)
+    print(f"=== generator: {n:,} ticks in {dt:.2f}s = {n / dt / 1e6:.2f}M ticks/s, "
+          f"L2 {market.levels} levels {books / 1e3:.0f}k books/s, block {blk.nbytes / 1e6:.1f}MB "
+          f"({(market.t - sim0) / _DAY:.1f} sim days) ===")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="合成マーケットで BotRunner を長時間回す")
+    ap.add_argument("--days", type=float, default=7.0, help="シミュレーション日数")
+    ap.add_argument("--cycle-sec", type=float, default=15.0, help="1サイクルで進めるシミュレーション秒数")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--levels", type=int, default=50)
+    ap.add_argument("--imbalance", type=float, default=0.5)
+    ap.add_argument("--report-hours", type=float, default=24.0, help="途中経過を出す間隔（シミュレーション時間）")
+    ap.add_argument("--bench-ticks", type=int, default=10_000_000, help="生成器だけのベンチのティック数（0 = しない）")
+    ap.add_argument("--aggressive", action="store_true", help="RSI しきい値を緩めて発注・決済経路も回す")
+    ap.add_argument("--dry-run", action="store_true", help="DRY_RUN（約定シミュレータ）で回す")
+    ap.add_argument("--env", default=None, help="ベースにする .env（既定はスキーマの既定値）")
+    args = ap.parse_args()
+
+    if args.bench_ticks > 0:
+        _bench_generator(args.seed, args.bench_ticks, 1_000_000)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    logger = logging.getLogger("DogeBot.soak")
+    tmp = tempfile.mkdtemp(prefix="doge-soak-")
+    base = load_config(args.env) if args.env else BotConfig()
+    overrides = dict(
+        EXCHANGE_BACKEND="synthetic", SYNTH_SEED=args.seed, SYNTH_CYCLE_SEC=args.cycle_sec,
+        SYNTH_BOOK_LEVELS=args.levels, SYNTH_IMBALANCE=args.imbalance,
+        DRY_RUN=args.dry_run, POLL_SEC=0, POLL_ADAPTIVE=False, API_SCHEDULER=False,
+        CHECKPOINT_ENABLED=False, CONFIG_HOT_RELOAD=False, RECORDER_ENABLED=False,
+        MARKET_STORE_ENABLED=False, DISCORD_WEBHOOK_URL="", TRADE_LOG_DIR=tmp,
+    )
+    if args.aggressive:
+        overrides.update(RSI_BUY_THRESHOLD=40.0, RSI_SELL_THRESHOLD=60.0, RSI_EXIT_LONG=50.0,
+                         RSI_EXIT_SHORT=50.0, DEPTH_IMB_THRESHOLD=0.0, TAKER_BIAS_THRESHOLD=0.0)
+    config = base.replace(**overrides)
+
+    runner = BotRunner(config=config, logger=logger)
+    ex = runner.exchange
+    sim_start = ex.clock()
+    end = sim_start + args.days * _DAY
+    step = args.report_hours * 3600.0
+    next_report = sim_start + step
+    cycles = entries = 0
+    was_in = runner.position_handler.in_position
+    rss0 = _rss_mb()
+    t0 = last_t = time.perf_counter()
+    last_cycles = 0
+
+    print(f"=== soak: {args.days:g} sim days × {args.cycle_sec:g}s/cycle, seed {args.seed}, "
+          f"{'DRY_RUN' if args.dry_run else 'live (synthetic fills)'} ===")
+    print(f"{'sim day':>8}{'cycles':>10}{'cyc/s':>9}{'speed':>9}{'ticks':>13}{'entries':>9}{'exits':>7}"
+          f"{'feat':>7}{'rss MB':>9}")
+    try:
+        while ex.clock() < end:
+            runner.run()
+            cycles += 1
+            now_in = runner.position_handler.in_position
+            entries += now_in and not was_in
+            was_in = now_in
+            if ex.clock() >= next_report:
+                wall = time.perf_counter()
+                rate = (cycles - last_cycles) / (wall - last_t)
+                print(f"{(ex.clock() - sim_start) / _DAY:>8.2f}{cycles:>10}{rate:>9.0f}"
+                      f"{rate * args.cycle_sec:>8.0f}x{ex.ticks:>13,}{entries:>9}{runner.exit_engine.fired:>7}"
+                      f"{len(feature_state):>7}{_rss_mb():>9.1f}")
+                next_report += step
+                last_t, last_cycles = wall, cycles
+    finally:
+        runner.position_tracker.stop()
+        runner.exit_engine.stop()
+
+    wall = time.perf_counter() - t0
+    sim = ex.clock() - sim_start
+    print(f"TOTAL {cycles} cycles in {wall:.1f}s = {cycles / wall:.0f} cyc/s, {sim / wall:.0f}x real time, "
+          f"rss {rss0:.1f} → {_rss_mb():.1f} MB")
+    stages = " ".join(f"{name}={st['reused']}/{st['computed'] + st['reused']} ({st['reused_pct']:.0f}%)"
+                      for name, st in stage_stats.snapshot().items())
+    print(f"  reused {stages or '-'}")
+    print(f"  exchange: {ex.stats()}")
+    print(f"  trade logs: {tmp}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 import os
 from pathlib import Path
+import sys
 import datetime as dt
-import requests
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bot.utils.notifier import DiscordNotifier, PRIORITY_LOW  # noqa: E402
 LOGS = ROOT / "logs"
 DOCS = ROOT / "docs"
 
@@ -36,13 +39,14 @@ def extract_summary(log_file: Path, max_lines=2000):
     return "\n".join(summary)
 
 def post_discord(webhook, content):
-    try:
-        resp = requests.post(webhook, json={"content": content}, timeout=10)
-        resp.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"⚠ Discord送信失敗: {e}")
+    # 共通の通知サービス経由（レート制限・再送を任せ、送り切ってから終了）
+    notifier = DiscordNotifier(webhook, coalesce_sec=0)
+    notifier.send(content, priority=PRIORITY_LOW)
+    notifier.close(timeout=30)
+    if notifier.sent == 0:
+        print(f"⚠ Discord送信失敗 (failed={notifier.failed})")
         return False
+    return True
 
 def main():
     env = load_env()
@@ -1,29 +1,71 @@
 # test_runner.py
+import argparse
+import logging
+
+import numpy as np
+
+from bot.config import BotConfig, load_config
+from bot.exchange.paper import PaperMatchingEngine
+from bot.exchange.types import BookSide, OrderBook
 from bot.strategies.strategy01 import Strategy01
-from bot.utils.order_executor import OrderExecutor
-from bot.utils.position_handler import PositionHandler
-from bot.features.indicators import compute_indicators
+from bot.features.indicators import load_indicators_from_env
 from bot.exchange.bybit import BybitExchange
+from bot.testing.fake_bybit import FakeBybitServer
 
-# モック環境やダミーデータを使って簡単に呼び出す
-def main():
-    print("✅ test_runner 起動")
 
-    exchange = BybitExchange()
-    strategy = Strategy01(exchange)
-    position_handler = PositionHandler(exchange)
-    order_executor = OrderExecutor(exchange)
+# 1サイクル分の取得 → 特徴量 → 判定を通しで呼ぶ簡易チェック
+def run_once(config, logger):
+    exchange = BybitExchange(config, logger)
+    strategy = Strategy01(config, logger)
+    indicators = load_indicators_from_env(config)(exchange.fetch_ohlcv("1m", limit=100), exchange=exchange)
+    position = exchange.get_current_position()
+
+    print(f"📈 rsi={indicators.get('rsi')} last_close={indicators.get('last_close')} position={position}")
+    print(f"🚦 should_open_position 結果: {strategy.should_open_position(indicators, position)}")
+    print(f"🚦 should_close_position 結果: {strategy.should_close_position(indicators, position)}")
+
 
-    # テスト用ダミーデータ（空のkline等）
-    dummy_klines = []
-    dummy_orderbook = {}
-    dummy_tape = []
+# 小数の数量の板を部分約定 → 全量スイープ（丸めで累積数量の末尾を超えても落ちず、板の価格で約定すること）
+def check_paper_sweep(rounds: int = 2000, seed: int = 0) -> int:
+    rng = np.random.default_rng(seed)
+    bad = 0
+    for _ in range(rounds):
+        qty = np.round(rng.random(4) * 100, 3) + 0.1
+        ask_px = 0.1 + np.arange(4) * 1e-5
+        engine = PaperMatchingEngine()
+        engine.on_book(OrderBook(BookSide(ask_px - 1e-5, qty.copy()), BookSide(ask_px, qty)), ts=0.0)
+        try:
+            engine.submit_market("Buy", float(rng.random() * qty.sum()), ts=0.0)
+            res = engine.submit_market("Buy", 1e9, ts=0.0)
+            if not ask_px[0] - 1e-12 <= res["avg_price"] <= ask_px[-1] + 1e-12:
+                bad += 1
+        except IndexError:
+            bad += 1
+    print(f"{'✅' if not bad else '❌'} paper full-book sweep: {bad}/{rounds} failed")
+    return bad
 
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--env", default=None, help=".env（省略時はスキーマ既定値 = ダミー取引所）")
+    ap.add_argument("--fake", action="store_true", help="ローカルの fake Bybit サーバに向けて実行")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("DogeBot.test_runner")
+    print("✅ test_runner 起動")
+
+    check_paper_sweep()
+    config = load_config(args.env) if args.env else BotConfig()
     try:
-        result = strategy.should_open_position(dummy_klines, dummy_orderbook, dummy_tape)
-        print(f"🚦 should_open_position 結果: {result}")
+        if args.fake:
+            with FakeBybitServer([config.SYMBOL], updates_per_sec=0) as srv:
+                run_once(config.replace(BYBIT_BASE_URL=srv.url, DRY_RUN=True), logger)
+        else:
+            run_once(config, logger)
     except Exception as e:
-        print(f"❌ エラー発生: {e}")
+        print(f"❌ エラー発生: {e!r}")
+
 
 if __name__ == "__main__":
     main()